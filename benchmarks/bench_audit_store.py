@@ -0,0 +1,77 @@
+"""Measure AuditStore history and stats queries over a large action log.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_audit_store [action_count]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from utils.audit_store import AuditStore
+
+ACTIONS = ("kick", "ban", "unban", "tempban", "mute", "unmute", "timeout")
+
+
+def populate(path, count, guilds=20, moderators=50, users=200_000):
+    """Write ``count`` historical actions straight into a fresh database."""
+    store = AuditStore(path)
+    store.load_sync()
+    now = time.time()
+    for start in range(0, count, 100_000):
+        rows = []
+        for _ in range(min(100_000, count - start)):
+            actor_id = random.randint(1, moderators)
+            target_id = random.randint(10 ** 6, 10 ** 6 + users)
+            rows.append((random.randint(1, guilds), random.choice(ACTIONS), actor_id, f"mod{actor_id}",
+                         target_id, f"user{target_id}", "spam", now - random.uniform(0, 365 * 86400)))
+        store._write(rows)
+    store._db.close()
+
+
+def timed(samples, query):
+    start = time.perf_counter()
+    for _ in range(samples):
+        result = query()
+    return (time.perf_counter() - start) / samples * 1000, result
+
+
+async def measure(path):
+    store = AuditStore(path)
+    await store.load()
+    week_ago = time.time() - 7 * 86400
+
+    history_ms, page = timed(200, lambda: store._history(1, random.randint(10 ** 6, 10 ** 6 + 200_000), None, None, None, 11))
+    actor_ms, page = timed(200, lambda: store._history(1, None, 7, week_ago, None, 11))
+    deep_ms, _ = timed(200, lambda: store._history(1, None, 7, None, page[-1].id if page else None, 11))
+    stats_ms, stats = timed(20, lambda: store._stats(1, week_ago, None))
+    print(f"history of one user: {history_ms:.2f} ms/page")
+    print(f"one moderator's week: {actor_ms:.2f} ms/page, next page: {deep_ms:.2f} ms")
+    print(f"weekly stats: {stats_ms:.2f} ms over {sum(sum(counts.values()) for counts in stats.values())} action(s)")
+
+    start = time.perf_counter()
+    store.record_many(1, "ban", 7, range(10 ** 9, 10 ** 9 + 5000), "raid")
+    queued = time.perf_counter() - start
+    start = time.perf_counter()
+    written = await store.flush()
+    flushed = time.perf_counter() - start
+    print(f"queue a {written}-account mass ban: {queued * 1000:.1f} ms, batched flush: {flushed * 1000:.1f} ms")
+    await store.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "audit.db")
+        start = time.perf_counter()
+        populate(path, count)
+        print(f"log: {count} actions, {os.path.getsize(path) / 1024 / 1024:.1f} MiB on disk, "
+              f"written in {time.perf_counter() - start:.1f}s")
+        asyncio.run(measure(path))
+
+
+if __name__ == "__main__":
+    main()
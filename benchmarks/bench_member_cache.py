@@ -0,0 +1,104 @@
+"""Process RSS against member count for the full and lean member cache modes.
+
+Each measurement runs a fresh bot process against utils.fake_gateway, waits until it
+is ready and its statistics counters are seeded (from the cache in full mode, from an
+uncached chunk in lean mode), then reports its resident memory. Linux only, since RSS
+is read from /proc. Run from the repository root:
+
+    python -m benchmarks.bench_member_cache [total_members ...]
+"""
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import time
+
+GUILDS = 5
+PORT = 8797
+
+
+def _status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def rss_mb():
+    return _status_mb("VmRSS")
+
+
+def peak_mb():
+    # VmHWM starts fresh at exec, unlike ru_maxrss which inherits the parent's peak
+    return _status_mb("VmHWM")
+
+
+async def child(mode):
+    """Run one bot until its counters are seeded and print its memory use as JSON."""
+    import discord
+    from discord.ext import commands
+
+    from utils.member_cache import all_members, member_cache_options
+    from utils.stats_counter import StatsCounterStore
+
+    discord.http.Route.BASE = f"http://127.0.0.1:{PORT}/api/v10"
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = discord.gateway.yarl.URL(f"ws://127.0.0.1:{PORT}/gateway")
+
+    intents = discord.Intents.default()
+    intents.members = True
+    bot = commands.Bot(command_prefix="!", intents=intents, **member_cache_options(mode))
+    counters = StatsCounterStore()
+    baseline = rss_mb()
+    started = time.perf_counter()
+    result = {}
+
+    @bot.event
+    async def on_ready():
+        ready = time.perf_counter() - started
+        for guild in bot.guilds:
+            counters.seed(guild, await all_members(guild))
+        gc.collect()
+        result.update(
+            mode=mode,
+            members=sum(counters.get(guild.id).total_members for guild in bot.guilds),
+            cached=sum(len(guild.members) for guild in bot.guilds),
+            ready_s=round(ready, 2),
+            seeded_s=round(time.perf_counter() - started, 2),
+            rss_mb=round(rss_mb(), 1),
+            peak_mb=round(peak_mb(), 1),
+            baseline_mb=round(baseline, 1),
+        )
+        await bot.close()
+
+    await bot.start("fake-token")
+    print(json.dumps(result))
+
+
+async def parent(totals):
+    from utils.fake_gateway import FakeGateway, FakeGuildData
+
+    print(f"{'members':>8} {'mode':>5} {'cached':>8} {'ready':>7} {'seeded':>7} {'RSS':>9} {'peak':>9}")
+    for total in totals:
+        gateway = FakeGateway(FakeGuildData(GUILDS, total // GUILDS, 30), port=PORT)
+        await gateway.start()
+        try:
+            for mode in ("full", "lean"):
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable, "-m", "benchmarks.bench_member_cache", "--child", mode,
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                )
+                output, _ = await process.communicate()
+                row = json.loads(output.decode().strip().splitlines()[-1])
+                print(f"{row['members']:>8} {mode:>5} {row['cached']:>8} {row['ready_s']:>6}s {row['seeded_s']:>6}s "
+                      f"{row['rss_mb']:>6} MB {row['peak_mb']:>6} MB")
+        finally:
+            await gateway.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        asyncio.run(child(sys.argv[2]))
+    else:
+        asyncio.run(parent([int(arg) for arg in sys.argv[1:]] or [10000, 50000, 100000]))
@@ -0,0 +1,115 @@
+"""Name lookups through the NameIndex vs the discord.utils.get scans they replace.
+
+The fake guild's ``categories``, ``text_channels`` and ``roles`` properties filter and
+sort on every access, as discord.Guild's do. Run from the repository root:
+
+    python -m benchmarks.bench_name_index [channels] [roles]
+"""
+import sys
+import timeit
+
+import discord
+
+from utils.guild_config import GuildConfig
+from utils.name_index import CATEGORY, NameIndex
+
+
+class FakeItem:
+    def __init__(self, guild, item_id, name, type=None, position=0):
+        self.guild = guild
+        self.id = item_id
+        self.name = name
+        self.type = type
+        self.position = position
+
+
+class FakeGuild:
+    def __init__(self, channel_count, role_count):
+        self.id = 1
+        self._channels = {}
+        self._roles = {}
+        categories = max(channel_count // 25, 3)
+        for n in range(channel_count):
+            is_category = n < categories
+            channel = FakeItem(self, 1000 + n, f"category-{n}" if is_category else f"channel-{n}",
+                               discord.ChannelType.category if is_category else discord.ChannelType.text, n)
+            self._channels[channel.id] = channel
+        # The names the cogs actually look for sit at the end, as they would in an established guild
+        for offset, name in enumerate(("Server Stats", "Tickets", "Closed Tickets")):
+            channel = FakeItem(self, 900000 + offset, name, discord.ChannelType.category, channel_count + offset)
+            self._channels[channel.id] = channel
+        for offset, slug in enumerate(("total-members", "actual-users", "total-bots", "active-tickets",
+                                       "total-tickets", "members-joined-this-month")):
+            channel = FakeItem(self, 910000 + offset, slug, discord.ChannelType.text, channel_count + 10 + offset)
+            self._channels[channel.id] = channel
+        for n in range(role_count):
+            role = FakeItem(self, 5000 + n, "Muted" if n == role_count - 1 else f"role-{n}", position=n)
+            self._roles[role.id] = role
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    @property
+    def categories(self):
+        result = [c for c in self._channels.values() if c.type == discord.ChannelType.category]
+        result.sort(key=lambda c: (c.position, c.id))
+        return result
+
+    @property
+    def text_channels(self):
+        result = [c for c in self._channels.values() if c.type == discord.ChannelType.text]
+        result.sort(key=lambda c: (c.position, c.id))
+        return result
+
+    @property
+    def roles(self):
+        return sorted(self._roles.values(), key=lambda r: r.position)
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+
+def report(label, scan, indexed, number):
+    scan_time = timeit.timeit(scan, number=number) / number * 1e6
+    index_time = timeit.timeit(indexed, number=number) / number * 1e6
+    print(f"{label:<34} scan {scan_time:8.2f} us   index {index_time:6.2f} us   {scan_time / index_time:6.0f}x")
+
+
+def main():
+    channel_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    role_count = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    guild = FakeGuild(channel_count, role_count)
+    index = NameIndex()
+    index.build(guild)
+    config = GuildConfig("/nonexistent/bench_name_index.json")
+    config._data = {guild.id: {}}
+    config._save = lambda guild_id: None  # Keep the benchmark off the disk
+    slugs = ("total-members", "actual-users", "total-bots", "active-tickets",
+             "total-tickets", "members-joined-this-month")
+
+    build = timeit.timeit(lambda: index.build(guild), number=200) / 200 * 1e3
+    print(f"-- {channel_count} channels, {role_count} roles (full index build {build:.2f} ms)")
+    number = 2000
+    report('category "Tickets" (ticket click)',
+           lambda: discord.utils.get(guild.categories, name="Tickets"),
+           lambda: index.category(guild, "Tickets"), number)
+    report("category by stored id",
+           lambda: discord.utils.get(guild.categories, name="Closed Tickets"),
+           lambda: index.resolve(guild, CATEGORY, "Closed Tickets", config, "closed_category"), number)
+    report("6 stat channels by name",
+           lambda: [discord.utils.get(guild.text_channels, name=slug) for slug in slugs],
+           lambda: [index.text_channel(guild, slug) for slug in slugs], number)
+    report('role "Muted" (mute/unmute)',
+           lambda: discord.utils.get(guild.roles, name="Muted"),
+           lambda: index.role(guild, "Muted"), number)
+    report("missing category (not set up yet)",
+           lambda: discord.utils.get(guild.categories, name="Transcripts"),
+           lambda: index.category(guild, "Transcripts"), number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Ticket creation latency: the original sequential flow vs the provisioning pipeline.
+
+Every REST call goes through a mocked HTTP layer that sleeps for a sampled round-trip
+time and serialises guild-wide buckets (channel create, role create) the way Discord
+does. Run from the repository root:
+
+    python -m benchmarks.bench_ticket_provisioning [tickets] [rtt_ms]
+"""
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import discord
+
+from utils.guild_config import GuildConfig
+from utils.ticket_provisioning import TicketProvisioner
+
+_ids = itertools.count(10 ** 17)
+
+
+class FakeHTTP:
+    """Latency and per-bucket serialisation for mocked REST calls."""
+
+    SERIAL_BUCKETS = ("POST /guilds/{guild_id}/channels", "POST /guilds/{guild_id}/roles")
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.calls = 0
+        self._buckets = {bucket: asyncio.Lock() for bucket in self.SERIAL_BUCKETS}
+
+    async def call(self, route):
+        self.calls += 1
+        delay = random.lognormvariate(0, 0.25) * self.rtt
+        lock = self._buckets.get(route)
+        if lock is None:
+            await asyncio.sleep(delay)
+            return
+        async with lock:
+            await asyncio.sleep(delay)
+
+
+class FakeObject:
+    def __init__(self, http, name=""):
+        self.http = http
+        self.id = next(_ids)
+        self.name = name
+
+
+class FakeChannel(FakeObject):
+    def __init__(self, http, guild, name, category=None, type=discord.ChannelType.text):
+        super().__init__(http, name)
+        self.guild = guild
+        self.category = category
+        self.type = type
+        self.position = len(guild.channels)
+        self.mention = f"<#{self.id}>"
+
+    async def set_permissions(self, target, **kwargs):
+        await self.http.call("PUT /channels/{channel_id}/permissions/{overwrite_id}")
+
+    async def edit(self, **kwargs):
+        await self.http.call("PATCH /channels/{channel_id}")
+        self.name = kwargs.get("name", self.name)
+        self.category = kwargs.get("category", self.category)
+
+    async def send(self, **kwargs):
+        await self.http.call("POST /channels/{channel_id}/messages")
+
+
+class FakeMember(FakeObject):
+    async def add_roles(self, *roles):
+        await self.http.call("PUT /guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+
+
+class FakeGuild(FakeObject):
+    def __init__(self, http):
+        super().__init__(http, "bench")
+        self.default_role = FakeObject(http, "@everyone")
+        self.me = FakeMember(http, "bot")
+        self.categories = []
+        self.roles = [self.default_role]
+        self._channels = {}
+
+    @property
+    def channels(self):
+        # The name index builds itself from these when the pool category is looked up by name
+        return list(self._channels.values())
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def create_category(self, name, **kwargs):
+        await self.http.call("POST /guilds/{guild_id}/channels")
+        category = FakeChannel(self.http, self, name, type=discord.ChannelType.category)
+        category.text_channels = []
+        self.categories.append(category)
+        self._channels[category.id] = category
+        return category
+
+    async def create_text_channel(self, name, category=None, **kwargs):
+        await self.http.call("POST /guilds/{guild_id}/channels")
+        channel = FakeChannel(self.http, self, name, category)
+        self._channels[channel.id] = channel
+        if category is not None:
+            category.text_channels.append(channel)
+        return channel
+
+    async def create_role(self, name):
+        await self.http.call("POST /guilds/{guild_id}/roles")
+        role = FakeObject(self.http, name)
+        self.roles.append(role)
+        return role
+
+
+class FakeFollowup:
+    def __init__(self, http):
+        self.http = http
+
+    async def send(self, **kwargs):
+        await self.http.call("POST /webhooks/{application_id}/{interaction_token}")
+
+
+async def original_flow(guild, category, user, followup):
+    """The button callback before the pipeline: six dependent round trips."""
+    channel = await guild.create_text_channel(f"ticket-{user.name}", category=category)
+    role = await guild.create_role(f"Ticket-{user.name}")
+    await channel.set_permissions(guild.default_role, read_messages=False)
+    await channel.set_permissions(role, read_messages=True, send_messages=True)
+    await user.add_roles(role)
+    await followup.send(embed=None)
+    await channel.send(embed=None, view=None)
+
+
+async def pipeline_flow(provisioner, guild, category, user, followup):
+    """The provisioning pipeline: one create with overwrites, then the two replies together."""
+    channel = await provisioner.provision(guild, category, user)
+    await asyncio.gather(followup.send(embed=None), channel.send(embed=None, view=None))
+
+
+async def storm(label, tickets, rtt, flow_factory, prewarm=0):
+    http = FakeHTTP(rtt)
+    guild = FakeGuild(http)
+    category = await guild.create_category("Tickets")
+    followup = FakeFollowup(http)
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = GuildConfig(os.path.join(directory, "tickets.json"))
+        config.set(guild.id, "ticket_pool_size", prewarm)
+        provisioner = TicketProvisioner(config)
+        if prewarm:
+            provisioner.refill(guild)
+            await provisioner._refills[guild.id]
+
+        http.calls = 0
+        flow = flow_factory(provisioner)
+        latencies = []
+
+        async def click(n, delay):
+            # Clicks arrive spread over one RTT, like a burst from a panel
+            await asyncio.sleep(delay)
+            user = FakeMember(http, f"user{n}")
+            start = time.perf_counter()
+            await flow(guild, category, user, followup)
+            latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(click(n, random.uniform(0, rtt)) for n in range(tickets)))
+        task = provisioner._refills.get(guild.id)
+        if task:
+            task.cancel()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+    print(f"{label:<28} p50 {p50:7.0f} ms   p99 {p99:7.0f} ms   {http.calls / tickets:.1f} calls/ticket")
+
+
+async def main():
+    tickets = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 80.0) / 1000
+    random.seed(1)
+
+    for count, label in ((1, "single click"), (tickets, f"storm of {tickets} clicks")):
+        print(f"-- {label}, {rtt * 1000:.0f} ms RTT")
+        await storm("original (sequential)", count, rtt, lambda provisioner: original_flow)
+        await storm("pipeline", count, rtt,
+                    lambda provisioner: lambda *args: pipeline_flow(provisioner, *args))
+        await storm("pipeline + warm pool of 10", count, rtt,
+                    lambda provisioner: lambda *args: pipeline_flow(provisioner, *args), prewarm=10)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
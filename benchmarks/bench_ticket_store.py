@@ -0,0 +1,77 @@
+"""Measure TicketStore warm-load time over a large ticket history.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ticket_store [ticket_count]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from utils.ticket_store import COLUMNS, Ticket, TicketStore
+
+
+def populate(path, count):
+    """Write ``count`` historical tickets straight into a fresh database."""
+    store = TicketStore(path)
+    store.load_sync()
+    now = time.time()
+    rows = []
+    for channel_id in range(1, count + 1):
+        # Most history is deleted tickets, with a tail of closed and still-open ones
+        status = random.choices(("deleted", "closed", "open"), weights=(80, 15, 5))[0]
+        created_at = now - random.uniform(0, 365 * 86400)
+        closed_at = None if status == "open" else created_at + random.uniform(60, 86400)
+        rows.append(Ticket(channel_id, random.randint(1, 50), random.randint(1, count // 2),
+                           random.randint(1, 10 ** 6), status, created_at, closed_at).as_row())
+    store._write(rows)
+    store._db.close()
+
+
+async def measure_writes(path, count):
+    store = TicketStore(path)
+    await store.load()
+    start = time.perf_counter()
+    for channel_id in range(10 ** 9, 10 ** 9 + count):
+        store.add(Ticket(channel_id, 1, channel_id))
+    queued = time.perf_counter() - start
+    start = time.perf_counter()
+    written = await store.flush()
+    flushed = time.perf_counter() - start
+    await store.close()
+    return queued, flushed, written
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tickets.db")
+        populate(path, count)
+        size = os.path.getsize(path)
+
+        store = TicketStore(path)
+        start = time.perf_counter()
+        indexed = store.load_sync()
+        elapsed = time.perf_counter() - start
+
+        lookups = list(store._by_channel)[:10_000]
+        start = time.perf_counter()
+        for channel_id in lookups:
+            store.get(channel_id)
+        lookup_time = time.perf_counter() - start
+        store._db.close()
+
+        print(f"history: {count} tickets, {size / 1024 / 1024:.1f} MiB on disk ({len(COLUMNS)} columns)")
+        print(f"warm load: {elapsed * 1000:.1f} ms, {indexed} live tickets indexed")
+        if lookups:
+            print(f"lookup by channel: {lookup_time / len(lookups) * 1e9:.0f} ns")
+
+        queued, flushed, written = asyncio.run(measure_writes(path, 10_000))
+        print(f"queue {written} new tickets: {queued * 1000:.1f} ms, batched flush: {flushed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare the legacy plain-text transcript format with the structured, compressed one.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_transcripts [message_count]
+"""
+import asyncio
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from utils.transcripts import TranscriptReader, TranscriptWriter, migrate_text_log
+
+CHANNEL_ID = 1251412440566992977
+WORDS = ["".join(random.choices(string.ascii_lowercase, k=random.randint(2, 9))) for _ in range(2000)]
+
+
+def synthetic_messages(count):
+    authors = [(random.getrandbits(60), f"user{n}") for n in range(12)]
+    now = time.time() - count * 5
+    for n in range(count):
+        author_id, author = random.choice(authors)
+        content = " ".join(random.choices(WORDS, k=random.randint(3, 40)))
+        yield {
+            "type": "message",
+            "id": (1 << 40) + n,
+            "author_id": author_id,
+            "author": author,
+            "content": content,
+            "created_at": now + n * 5,
+        }
+
+
+async def write_structured(directory, messages):
+    writer = TranscriptWriter(directory)
+    writer.start()
+    for record in messages:
+        await writer.write(CHANNEL_ID, record)
+    await writer.close()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    messages = list(synthetic_messages(count))
+    target = messages[count // 2]["id"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, f"legacy-{CHANNEL_ID}.txt")
+        with open(legacy_path, "w", encoding="utf-8") as f:
+            for record in messages:
+                f.write(f"{record['author']}: {record['content']}\n")
+
+        asyncio.run(write_structured(directory, messages))
+        reader = TranscriptReader(directory, CHANNEL_ID)
+        structured_size = os.path.getsize(reader.data_path) + os.path.getsize(reader.index_path)
+        legacy_size = os.path.getsize(legacy_path)
+
+        def read_legacy():
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                return f.readlines()
+
+        def find_legacy(needle):
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if needle in line:
+                        return line
+
+        _, legacy_full = timed(read_legacy)
+        _, structured_full = timed(lambda: list(TranscriptReader(directory, CHANNEL_ID)))
+        _, legacy_lookup = timed(find_legacy, messages[count // 2]["content"])
+        _, structured_lookup = timed(lambda: TranscriptReader(directory, CHANNEL_ID).get(target))
+        _, structured_page = timed(lambda: TranscriptReader(directory, CHANNEL_ID).page(count // 40))
+
+        migrate_dir = os.path.join(directory, "migrated")
+        os.makedirs(migrate_dir)
+        _, migrate_time = timed(migrate_text_log, legacy_path, migrate_dir, CHANNEL_ID)
+
+        print(f"{count} messages")
+        print(f"size:          legacy {legacy_size / 1024:.0f} KiB, structured {structured_size / 1024:.0f} KiB "
+              f"(records also keep ids, author ids and timestamps)")
+        print(f"full read:     legacy {legacy_full:.1f} ms, structured {structured_full:.1f} ms")
+        print(f"one message:   legacy scan {legacy_lookup:.1f} ms, structured indexed {structured_lookup:.1f} ms")
+        print(f"one page (20): structured {structured_page:.1f} ms")
+        print(f"migration:     {migrate_time:.1f} ms for the legacy log")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""Offline load test: the production cogs against utils.fake_gateway under synthetic load.
+
+Starts the fake gateway and REST API with Discord-style rate limits, runs a bot with the
+same extensions as main.py in this process, and drives each scenario through the gateway:
+
+    flood       MESSAGE_CREATE floods into open ticket channels (Tickets.on_message)
+    tickets     a storm of Create Ticket button presses (Tickets.open_ticket)
+    stats       update_stats passes and reconciles over large guilds while members churn
+    moderation  !masskick and !massban over a wave of raid accounts
+
+Every scenario reports throughput, latency percentiles, event loop lag and RSS. Use
+--json to keep the numbers for comparison between runs. Run from the repository root:
+
+    python -m benchmarks.loadtest [scenario ...] [--members 100000] [--messages 20000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import discord
+import yarl
+from discord.ext import commands
+
+from benchmarks.bench_member_cache import peak_mb, rss_mb
+from utils.fake_gateway import FakeGateway, FakeGuildData, RateLimiter
+from utils.log_pipeline import setup_logging, stop_logging
+from utils.ticket_store import Ticket
+
+EXTENSIONS = ["cogs.Metrics", "cogs.Moderation", "cogs.Tickets", "cogs.Statistics"]
+SCENARIOS = ("flood", "tickets", "stats", "moderation")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class LagSampler:
+    """Records how late the event loop wakes a short sleep, sample by sample."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - start - self.interval, 0.0))
+
+
+class Result:
+    """Latencies and timings of one scenario, plus whatever else it wants to report."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.operations = 0
+        self.elapsed = 0.0
+        self.lag = []
+        self.extra = {}
+
+    def summary(self):
+        return {
+            "scenario": self.name,
+            "operations": self.operations,
+            "seconds": round(self.elapsed, 3),
+            "per_second": round(self.operations / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(self.latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 2),
+            "max_ms": round(max(self.latencies, default=0.0) * 1000, 2),
+            "lag_p99_ms": round(percentile(self.lag, 0.99) * 1000, 2),
+            "lag_max_ms": round(max(self.lag, default=0.0) * 1000, 2),
+            "rss_mb": round(rss_mb(), 1),
+            **self.extra,
+        }
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.data = FakeGuildData(args.guilds, args.members, args.channels)
+        self.limiter = RateLimiter(scale=args.rate_limit_scale) if args.rate_limit_scale else None
+        self.fake = FakeGateway(self.data, port=args.port, rate_limiter=self.limiter, rest_latency=args.rest_latency / 1000)
+        self.bot = None
+        self.lag = LagSampler()
+        self.results = []
+
+    # -- setup -------------------------------------------------------------
+
+    async def start(self):
+        await self.fake.start()
+        discord.http.Route.BASE = self.fake.api_base
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(self.fake.gateway_url)
+
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.members = True
+        # Fail fast on long waits (the hidden rename limit) rather than sleeping through the run
+        self.bot = commands.Bot(command_prefix="!", intents=intents, max_ratelimit_timeout=30.0)
+
+        async def setup_hook():
+            await asyncio.gather(*(self.bot.load_extension(extension) for extension in EXTENSIONS))
+
+        self.bot.setup_hook = setup_hook
+        started = time.perf_counter()
+        await self.bot.login("fake-token")
+        self._runner = asyncio.create_task(self.bot.connect())
+        await self.bot.wait_until_ready()
+        print(f"ready in {time.perf_counter() - started:.1f}s with {len(self.bot.guilds)} guild(s), "
+              f"{sum(guild.member_count for guild in self.bot.guilds)} member(s), RSS {rss_mb():.0f} MB")
+
+    async def close(self):
+        await self.bot.close()
+        await self._runner
+        await self.fake.close()
+
+    def guild(self, index=0):
+        return self.bot.get_guild(int(self.data.guilds[index]["id"]))
+
+    def owner(self, guild):
+        return self.fake.guild(guild.id)["owner_id"]
+
+    def humans(self, guild, count):
+        """Ids of the first ``count`` members who aren't bots or the owner."""
+        owner_id = self.owner(guild)
+        ids = []
+        for user_id, member in self.fake.members(guild.id).items():
+            if not member["user"]["bot"] and user_id != owner_id:
+                ids.append(user_id)
+                if len(ids) == count:
+                    break
+        return ids
+
+    async def command(self, guild, channel, text):
+        """Send a prefix command as the guild owner and wait until it finishes."""
+        done = asyncio.get_running_loop().create_future()
+
+        async def finished(ctx, *args):
+            if ctx.message.id == message_id and not done.done():
+                done.set_result(args[0] if args else None)
+
+        self.bot.add_listener(finished, "on_command_completion")
+        self.bot.add_listener(finished, "on_command_error")
+        owner = self.fake.members(guild.id)[self.owner(guild)]["user"]
+        payload = self.fake.message_payload(channel.id, owner, text, guild_id=guild.id)
+        message_id = int(payload["id"])
+        try:
+            await self.fake.dispatch(guild.id, "MESSAGE_CREATE", payload)
+            error = await asyncio.wait_for(done, timeout=self.args.timeout)
+        finally:
+            self.bot.remove_listener(finished, "on_command_completion")
+            self.bot.remove_listener(finished, "on_command_error")
+        if error is not None:
+            raise RuntimeError(f"{text!r} failed: {error}")
+
+    def _rate_limited(self):
+        return dict(self.limiter.limited) if self.limiter else {}
+
+    async def run(self, name):
+        result = Result(name)
+        limited = self._rate_limited()
+        self.lag.start()
+        started = time.perf_counter()
+        try:
+            await getattr(self, f"scenario_{name}")(result)
+        finally:
+            result.elapsed = result.elapsed or time.perf_counter() - started
+            self.lag.stop()
+            result.lag = self.lag.samples
+        now = self._rate_limited()
+        result.extra["429s"] = sum(now.values()) - sum(limited.values())
+        self.results.append(result)
+        self.print_row(result.summary())
+
+    # -- scenarios ---------------------------------------------------------
+
+    async def scenario_flood(self, result):
+        """Messages from many members into open ticket channels at --flood-rate per second."""
+        guild = self.guild()
+        cog = self.bot.get_cog("Tickets")
+        channels = [channel for channel in guild.text_channels][:self.args.flood_channels]
+        for channel in channels:
+            cog.tickets.add(Ticket(channel.id, guild.id, int(self.owner(guild))))
+        authors = [self.fake.members(guild.id)[user_id]["user"] for user_id in self.humans(guild, 500)]
+
+        sent = {}
+        delivered = asyncio.Event()
+
+        async def on_message(message):
+            sent_at = sent.pop(message.id, None)
+            if sent_at is not None:
+                result.latencies.append(time.perf_counter() - sent_at)
+                if not sent and result.operations == self.args.messages:
+                    delivered.set()
+
+        self.bot.add_listener(on_message)
+        started = time.perf_counter()
+        try:
+            for n in range(self.args.messages):
+                if self.args.flood_rate:
+                    ahead = started + n / self.args.flood_rate - time.perf_counter()
+                    if ahead > 0:
+                        await asyncio.sleep(ahead)
+                payload = self.fake.message_payload(channels[n % len(channels)].id, authors[n % len(authors)],
+                                                    f"flood message {n} " + "x" * random.randint(0, 200), guild_id=guild.id)
+                sent[int(payload["id"])] = time.perf_counter()
+                result.operations += 1
+                await self.fake.dispatch(guild.id, "MESSAGE_CREATE", payload)
+            await asyncio.wait_for(delivered.wait(), timeout=self.args.timeout)
+            await cog.transcripts.flush()
+        finally:
+            self.bot.remove_listener(on_message)
+        result.elapsed = time.perf_counter() - started
+        transcripts = cog.transcripts.stats()
+        result.extra["transcript_flushes"] = transcripts["flushes"]
+        result.extra["backpressure_waits"] = transcripts["backpressure_waits"]
+        for channel in channels:
+            cog.tickets.delete(channel.id)
+
+    async def scenario_tickets(self, result):
+        """Create Ticket presses from distinct members at once; latency is press to the bot's reply."""
+        guild = self.guild()
+        channel = guild.text_channels[0]
+        cog = self.bot.get_cog("Tickets")
+        if self.args.ticket_pool:
+            cog.config.set(guild.id, "ticket_pool_size", self.args.ticket_pool)
+            cog.provisioner.refill(guild)
+            await asyncio.sleep(1)
+
+        pressed = {}
+        replied = {}
+        done = asyncio.Event()
+
+        def on_request(method, path, body):
+            # The "Ticket Created" reply is the interaction's followup
+            if method == "POST" and path.startswith("/webhooks/"):
+                token = path.split("/")[3]
+                if token in pressed and token not in replied:
+                    replied[token] = time.perf_counter()
+                    if len(replied) == len(pressed):
+                        done.set()
+
+        self.fake.listeners.append(on_request)
+        creates_before = sum(1 for method, path in self.fake.requests if method == "POST" and path.endswith("/channels"))
+        started = time.perf_counter()
+        try:
+            for user_id in self.humans(guild, self.args.tickets):
+                payload = self.fake.component_interaction(guild.id, channel.id, user_id, "ticket:create")
+                pressed[payload["token"]] = time.perf_counter()
+                await self.fake.dispatch(guild.id, "INTERACTION_CREATE", payload)
+            await asyncio.wait_for(done.wait(), timeout=self.args.timeout)
+        finally:
+            self.fake.listeners.remove(on_request)
+        result.elapsed = time.perf_counter() - started
+        result.operations = len(replied)
+        result.latencies = [replied[token] - pressed[token] for token in replied]
+        result.extra["channel_creates"] = sum(1 for method, path in self.fake.requests
+                                              if method == "POST" and path.endswith("/channels")) - creates_before
+        result.extra["open_tickets"] = len(cog.tickets.guild_tickets(guild.id))
+
+    async def scenario_stats(self, result):
+        """Statistics updates over every guild while members join and leave between passes."""
+        cog = self.bot.get_cog("Statistics")
+        guilds = [self.guild(index) for index in range(len(self.data.guilds))]
+        for guild in guilds:
+            if not cog.config.get(guild.id, "stats_channels"):
+                await self.command(guild, guild.text_channels[0], "!create_stats")
+
+        reconciles = []
+        started = time.perf_counter()
+        for tick in range(self.args.ticks):
+            for guild in guilds:
+                for n in range(self.args.churn):
+                    await self.fake.add_member(guild.id, f"churn{tick}-{n}")
+                for user_id in self.humans(guild, self.args.churn // 2):
+                    await self.fake.remove_member(guild.id, user_id)
+            await asyncio.sleep(0)
+
+            for guild in guilds:
+                start = time.perf_counter()
+                cog._update_guild(guild)
+                result.latencies.append(time.perf_counter() - start)
+                result.operations += 1
+            # The full update_stats tick, for whichever guilds the staggered schedule has due
+            await cog.update_stats.coro(cog)
+
+            if tick % 5 == 0:
+                for guild in guilds:
+                    start = time.perf_counter()
+                    cog.counters.reconcile(guild)
+                    reconciles.append(time.perf_counter() - start)
+            await asyncio.sleep(self.args.tick_interval)
+        result.elapsed = time.perf_counter() - started
+        result.extra["reconcile_p50_ms"] = round(percentile(reconciles, 0.5) * 1000, 2)
+        result.extra["rename_queue"] = cog.renames.stats()
+
+    async def scenario_moderation(self, result):
+        """A raid of fresh accounts removed with !masskick, then another with !massban."""
+        guild = self.guild()
+        channel = guild.text_channels[0]
+        removals = []
+
+        def on_request(method, path, body):
+            if (method == "DELETE" and "/members/" in path) or (method == "POST" and path.endswith("/bulk-ban")):
+                removals.append((time.perf_counter(), len(body.get("user_ids", ())) or 1))
+
+        self.fake.listeners.append(on_request)
+        started = time.perf_counter()
+        try:
+            for command in ("masskick", "massban"):
+                for n in range(self.args.raid):
+                    await self.fake.add_member(guild.id, f"raider-{command}-{n}")
+                await asyncio.sleep(0.5)  # Let the joins reach the member cache
+                issued = time.perf_counter()
+                removals.clear()
+                await self.command(guild, channel, f"!{command} --joined 10m --regex ^raider-{command}- --reason loadtest")
+                for at, count in removals:
+                    result.latencies.extend([at - issued] * count)
+                    result.operations += count
+                result.extra[f"{command}_seconds"] = round(time.perf_counter() - issued, 2)
+        finally:
+            self.fake.listeners.remove(on_request)
+        result.elapsed = time.perf_counter() - started
+
+    # -- output ------------------------------------------------------------
+
+    COLUMNS = ("scenario", "operations", "seconds", "per_second", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+               "lag_p99_ms", "lag_max_ms", "rss_mb", "429s")
+
+    def print_header(self):
+        print(" ".join(f"{column:>11}" for column in self.COLUMNS))
+
+    def print_row(self, summary):
+        print(" ".join(f"{summary.get(column, ''):>11}" for column in self.COLUMNS))
+        extra = {key: value for key, value in summary.items() if key not in self.COLUMNS}
+        if extra:
+            print(f"{'':>11} {json.dumps(extra)}")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        # The cogs keep their state under the working directory
+        os.chdir(directory)
+        os.environ["METRICS_PORT"] = "0"
+        setup_logging(directory=os.path.join(directory, "logs"), console=False)
+        test = LoadTest(args)
+        await test.start()
+        try:
+            test.print_header()
+            for name in args.scenarios or SCENARIOS:
+                await test.run(name)
+        finally:
+            await test.close()
+            stop_logging()
+        print(f"peak RSS {peak_mb():.0f} MB")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump([result.summary() for result in test.results], f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Drive synthetic load through the cogs against a fake Discord.")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--guilds", type=int, default=2)
+    parser.add_argument("--members", type=int, default=100_000, help="members per guild")
+    parser.add_argument("--channels", type=int, default=50, help="channels per guild")
+    parser.add_argument("--messages", type=int, default=20_000, help="flood: messages to send")
+    parser.add_argument("--flood-rate", type=float, default=2000, help="flood: messages per second (0: no pacing)")
+    parser.add_argument("--flood-channels", type=int, default=20, help="flood: ticket channels to spread them over")
+    parser.add_argument("--tickets", type=int, default=30, help="tickets: Create Ticket presses")
+    parser.add_argument("--ticket-pool", type=int, default=0, help="tickets: warm pool size (0 disables)")
+    parser.add_argument("--ticks", type=int, default=20, help="stats: update passes")
+    parser.add_argument("--tick-interval", type=float, default=0.5, help="stats: seconds between passes")
+    parser.add_argument("--churn", type=int, default=200, help="stats: joins per guild per pass (and half as many leaves)")
+    parser.add_argument("--raid", type=int, default=100, help="moderation: raid accounts per command")
+    parser.add_argument("--rest-latency", type=float, default=30.0, help="simulated REST round trip in ms")
+    parser.add_argument("--rate-limit-scale", type=float, default=1.0,
+                        help="multiplier on rate limit windows; 0 turns rate limits off")
+    parser.add_argument("--timeout", type=float, default=300.0, help="give up on a scenario after this many seconds")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
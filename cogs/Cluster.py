@@ -0,0 +1,90 @@
+import discord
+from discord.ext import commands
+import logging
+import os
+import time
+
+from utils.cluster import DEFAULT_IPC_PORT, LAUNCHER, IPCClient
+
+logger = logging.getLogger(__name__)
+
+class Cluster(commands.Cog):
+    """Cross-cluster commands over the launcher's IPC hub. Only loaded in cluster mode."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.cluster_id = int(os.getenv("CLUSTER_ID", "0"))
+        self.ipc = IPCClient(self.cluster_id, port=int(os.getenv("IPC_PORT", DEFAULT_IPC_PORT)))
+        self.ipc.handler("stats")(self.local_stats)
+        self.ipc.handler("ping")(self.ping)
+        self.started_at = time.monotonic()
+
+    async def cog_load(self):
+        self.ipc.start()
+
+    async def cog_unload(self):
+        await self.ipc.close()
+
+    async def ping(self, data):
+        return {"pid": os.getpid()}
+
+    async def local_stats(self, data):
+        """This cluster's share of the bot, answered over IPC."""
+        latencies = getattr(self.bot, "latencies", None) or [(0, self.bot.latency)]
+        return {
+            "shards": list(getattr(self.bot, "shard_ids", None) or [0]),
+            "guilds": len(self.bot.guilds),
+            "members": sum(guild.member_count or 0 for guild in self.bot.guilds),
+            "latency_ms": {str(shard_id): round(latency * 1000) for shard_id, latency in latencies
+                           if latency == latency and latency != float("inf")},
+            "uptime": round(time.monotonic() - self.started_at),
+        }
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def clusters(self, ctx):
+        """Show every cluster's shards, guilds and latency."""
+        try:
+            results = await self.ipc.request("stats")
+            processes = (await self.ipc.request("status", target=LAUNCHER)).get(LAUNCHER, {})
+        except (ConnectionError, RuntimeError, TimeoutError) as e:
+            await ctx.send(f"Could not reach the other clusters: {e}")
+            return
+
+        embed = discord.Embed(title="Clusters", color=discord.Color.blue())
+        for cluster_id, process in sorted(processes.items(), key=lambda item: int(item[0])):
+            stats = results.get(cluster_id)
+            marker = " (this one)" if int(cluster_id) == self.cluster_id else ""
+            if stats is None or "error" in stats:
+                value = f"Not responding ({process.get('state')}, {process.get('restarts', 0)} restarts)"
+            else:
+                latency = max(stats["latency_ms"].values(), default=0)
+                value = (f"Shards {stats['shards'][0]}-{stats['shards'][-1]}, {stats['guilds']} guilds, "
+                         f"{stats['members']} members, {latency} ms, up {stats['uptime'] // 60} min, "
+                         f"{process.get('restarts', 0)} restarts")
+            embed.add_field(name=f"Cluster {cluster_id}{marker}", value=value, inline=False)
+
+        answered = [stats for stats in results.values() if "error" not in stats]
+        embed.set_footer(text=f"{len(answered)}/{len(processes) or len(results)} clusters responding, "
+                              f"{sum(stats['guilds'] for stats in answered)} guilds, "
+                              f"{sum(stats['members'] for stats in answered)} members")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.is_owner()
+    async def cluster_restart(self, ctx, cluster_id: int):
+        """Restart a single cluster; the others keep running."""
+        try:
+            result = await self.ipc.request("restart", {"cluster_id": cluster_id}, target=LAUNCHER)
+        except (ConnectionError, RuntimeError, TimeoutError) as e:
+            await ctx.send(f"Could not reach the launcher: {e}")
+            return
+        outcome = result.get(LAUNCHER, {})
+        if "error" in outcome:
+            await ctx.send(outcome["error"])
+            return
+        await ctx.send(f"Restarting cluster {cluster_id}.")
+        logger.info(f"{ctx.author} restarted cluster {cluster_id}.")
+
+async def setup(bot):
+    await bot.add_cog(Cluster(bot))
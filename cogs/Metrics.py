@@ -0,0 +1,124 @@
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+import logging
+import os
+import time
+
+from utils.metrics import (LoopLagMonitor, RateLimitMetricsHandler, instrument_http, metrics,
+                           start_metrics_server)
+from utils.rest_scheduler import rest
+
+logger = logging.getLogger(__name__)
+
+class Metrics(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.loop_lag = LoopLagMonitor()
+        self.rate_limit_handler = RateLimitMetricsHandler()
+        self.server = None
+
+    async def cog_load(self):
+        instrument_http(self.bot.http)
+        logging.getLogger("discord.http").addHandler(self.rate_limit_handler)
+        self.loop_lag.start()
+        self.update_gateway_latency.start()
+
+        # Local Prometheus endpoint; set METRICS_PORT=0 to turn it off
+        port = int(os.getenv("METRICS_PORT", "9108"))
+        if port:
+            host = os.getenv("METRICS_HOST", "127.0.0.1")
+            try:
+                self.server = await start_metrics_server(host, port)
+            except OSError as e:
+                logger.error(f"Could not start metrics server on {host}:{port}: {e}")
+
+    async def cog_unload(self):
+        logging.getLogger("discord.http").removeHandler(self.rate_limit_handler)
+        self.loop_lag.stop()
+        self.update_gateway_latency.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    @tasks.loop(seconds=15)
+    async def update_gateway_latency(self):
+        """Publish heartbeat latency for each shard (or the single connection)."""
+        latencies = getattr(self.bot, "latencies", None) or [(None, self.bot.latency)]
+        for shard_id, latency in latencies:
+            if latency == latency and latency != float("inf"):  # Skip NaN/inf before the first heartbeat
+                metrics.set_gauge("discord_gateway_latency_seconds", latency, (("shard", shard_id if shard_id is not None else 0),))
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    def _observe_command(self, ctx, outcome):
+        started = getattr(ctx, "metrics_started", None)
+        if started is None or ctx.command is None:
+            return
+        labels = (("command", ctx.command.qualified_name), ("outcome", outcome))
+        metrics.observe("discord_command_seconds", time.perf_counter() - started, labels)
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        self._observe_command(ctx, "ok")
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        self._observe_command(ctx, "error")
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction, command):
+        # Measured from the interaction's creation, so it includes gateway delivery
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        labels = (("command", f"/{command.qualified_name}"), ("outcome", "ok"))
+        metrics.observe("discord_command_seconds", elapsed, labels)
+
+    @app_commands.command(name="metrics", description="Show REST, rate limit and latency metrics (Admin only)")
+    async def show_metrics(self, interaction: discord.Interaction):
+        """Summarise the bot's hot-path metrics."""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have the required permissions to use this command.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="Bot Metrics", color=discord.Color.blue())
+
+        # Busiest REST routes with latency percentiles
+        routes = metrics.histograms.get("discord_rest_request_seconds", {})
+        busiest = sorted(routes.items(), key=lambda item: item[1].count, reverse=True)[:8]
+        route_lines = [
+            f"`{dict(labels)['route']}` {histogram.count}x p50 {histogram.quantile(0.5) * 1000:.0f}ms p99 {histogram.quantile(0.99) * 1000:.0f}ms"
+            for labels, histogram in busiest
+        ]
+        embed.add_field(name="REST routes", value="\n".join(route_lines) or "No requests yet", inline=False)
+
+        rate_limits = metrics.total("discord_rest_ratelimits_total")
+        embed.add_field(name="429s retried", value=str(rate_limits))
+
+        # Outbound work waiting behind each priority class's concurrency limit
+        embed.add_field(name="REST queue", value="\n".join(
+            f"{name}: {state['in_flight']}/{state['limit']} running, {state['queued']} waiting" for name, state in rest.stats().items()
+        ))
+
+        lag = metrics.histograms.get("event_loop_lag_seconds", {}).get(())
+        if lag:
+            embed.add_field(name="Event loop lag", value=f"last {self.loop_lag.last_lag * 1000:.1f}ms, p99 {lag.quantile(0.99) * 1000:.1f}ms")
+
+        latencies = getattr(self.bot, "latencies", None) or [(None, self.bot.latency)]
+        embed.add_field(name="Gateway latency", value=", ".join(
+            f"{shard_id if shard_id is not None else 0}: {latency * 1000:.0f}ms" for shard_id, latency in latencies
+        ))
+
+        command_series = metrics.histograms.get("discord_command_seconds", {})
+        slowest = sorted(command_series.items(), key=lambda item: item[1].quantile(0.99), reverse=True)[:5]
+        command_lines = [
+            f"`{dict(labels)['command']}` ({dict(labels)['outcome']}) {histogram.count}x p99 {histogram.quantile(0.99) * 1000:.0f}ms"
+            for labels, histogram in slowest
+        ]
+        embed.add_field(name="Slowest commands", value="\n".join(command_lines) or "No commands yet", inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Metrics(bot))
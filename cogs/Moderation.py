@@ -1,22 +1,225 @@
 import discord
 from discord.ext import commands
 import asyncio
+import datetime
 import logging
+import time
+from typing import Optional
+
+from utils.audit_store import AuditStore
+from utils.cluster import owns_guild
+from utils.bulk_moderation import BulkRequest, BulkRunner, parse_duration, resolve_targets
+from utils.expiry_scheduler import ExpiryScheduler
+from utils.guild_config import GuildConfig
+from utils.log_pipeline import audit
+from utils.member_cache import all_members, get_members
+from utils.name_index import ROLE, names
+from utils.overwrite_provisioner import MUTED_ROLE_NAME, OverwriteProvisioner
+from utils.rest_scheduler import MODERATION, rest
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+PAGE_SIZE = 10
+
+
+def format_entry(entry):
+    reason = f" - {entry.reason}" if entry.reason else ""
+    actor = f"<@{entry.actor_id}>" if entry.actor_id else (entry.actor or "unknown")
+    target = f"<@{entry.target_id}>" if entry.target_id else (entry.target or "")
+    return f"<t:{int(entry.created_at)}:R> **{entry.action}** {target} by {actor}{reason}"
+
+
+class HistoryView(discord.ui.View):
+    """Older/Newer buttons over one audit query, paged by id so every page is an index lookup."""
+
+    def __init__(self, store, author_id, title, guild_id, totals=None, **query):
+        super().__init__(timeout=180)
+        self.store = store
+        self.author_id = author_id
+        self.title = title
+        self.guild_id = guild_id
+        self.totals = totals
+        self.query = query
+        self.cursors = [None]  # The ``before`` id of every page reached so far
+        self.page = 0
+        self.message = None
+
+    async def render(self):
+        entries = await self.store.history(self.guild_id, before=self.cursors[self.page], limit=PAGE_SIZE + 1,
+                                           **self.query)
+        has_older = len(entries) > PAGE_SIZE
+        entries = entries[:PAGE_SIZE]
+        if has_older and len(self.cursors) == self.page + 1:
+            self.cursors.append(entries[-1].id)
+        self.newer.disabled = self.page == 0
+        self.older.disabled = not has_older
+
+        embed = discord.Embed(title=self.title, color=discord.Color.blurple())
+        embed.description = "\n".join(format_entry(entry) for entry in entries) or "No moderation actions found."
+        if self.totals:
+            embed.add_field(name="Totals", value=self.totals, inline=False)
+        embed.set_footer(text=f"Page {self.page + 1}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Only the moderator who ran this command can page through it.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Newer", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Pending unmutes/unbans survive restarts and share a single timer task
+        self.expirations = ExpiryScheduler("data/moderation.db", wait_until_ready=bot.wait_until_ready,
+                                           owns=lambda guild_id: owns_guild(bot, guild_id))
+        self.expirations.register("unmute", self._expire_mute)
+        self.expirations.register("unban", self._expire_ban)
+        # Every action, indexed by target, moderator and time for !history and !modstats
+        self.audit_log = AuditStore("data/moderation_audit.db")
+        self.config = GuildConfig("data/moderation.json")
+        self.provisioner = OverwriteProvisioner(self.config)  # Applies Muted overwrites in the background
+        names.attach(bot)  # Shared name -> id index, so finding the Muted role doesn't scan every role
+
+    async def cog_load(self):
+        await self.expirations.load()
+        await self.audit_log.load()
+        self._resume_task = asyncio.create_task(self._resume_provisioning())
+
+    async def _resume_provisioning(self):
+        """Restart Muted role setup in guilds where it was interrupted."""
+        await self.bot.wait_until_ready()
+        for guild in self.bot.guilds:
+            if self.config.get(guild.id, "muted_provisioning") != "pending":
+                continue
+            mute_role = self._mute_role(guild)
+            if mute_role:
+                self.provisioner.start(guild, mute_role)
+                logger.info(f"Resumed Muted role provisioning in {guild.name}.")
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        """Keep new channels covered by the Muted role."""
+        if self.config.get(channel.guild.id, "muted_provisioning") is None:
+            return
+        mute_role = self._mute_role(channel.guild)
+        if not mute_role:
+            return
+        try:
+            await self.provisioner.apply(channel, mute_role)
+        except discord.HTTPException as e:
+            logger.error(f"Failed to set Muted overwrite on new channel {channel}: {e}")
+
+    async def cog_unload(self):
+        await self.expirations.close()
+        await self.audit_log.close()
+        await self.config.close()
+
+    def _audit(self, ctx, message, action, target, reason, **fields):
+        """Record a moderation command in the audit index and log it, timed from the invoking message."""
+        if target is not None:
+            self.audit_log.record(ctx.guild.id, action, ctx.author, target, reason)
+        latency = (discord.utils.utcnow() - ctx.message.created_at).total_seconds()
+        audit(logger, message, action=action, actor=ctx.author, target=target, reason=reason,
+              latency=latency, guild_id=ctx.guild.id, **fields)
+
+    def _mute_role(self, guild):
+        """Return the guild's Muted role, found by its stored id or else by name."""
+        return names.resolve(guild, ROLE, MUTED_ROLE_NAME, self.config, "muted_role")
+
+    async def _create_mute_role(self, guild):
+        mute_role = await rest.run(MODERATION, lambda: guild.create_role(name=MUTED_ROLE_NAME), guild_id=guild.id)
+        self.config.set(guild.id, "muted_role", mute_role.id)
+        return mute_role
+
+    async def _notify(self, entry, embed):
+        """Send an expiration notice to the channel the punishment was issued from, if it still exists."""
+        channel = self.bot.get_channel(entry.payload.get("channel_id", 0))
+        if channel:
+            try:
+                await rest.run(MODERATION, lambda: channel.send(embed=embed), guild_id=entry.guild_id)
+            except discord.HTTPException as e:
+                logger.error(f"Failed to send expiration notice in {channel}: {e}")
+
+    async def _expire_mute(self, entry):
+        """Remove the Muted role once a timed mute runs out."""
+        guild = self.bot.get_guild(entry.guild_id)
+        if not guild:
+            return
+        mute_role = self._mute_role(guild)
+        member = guild.get_member(entry.target_id)
+        if member is None:
+            try:
+                member = await rest.run(MODERATION, lambda: guild.fetch_member(entry.target_id), guild_id=guild.id)
+            except discord.NotFound:
+                # The member left; the role goes with them
+                return
+        if mute_role not in member.roles:
+            return
+
+        duration = entry.payload.get("duration")
+        await rest.run(MODERATION, lambda: member.remove_roles(mute_role, reason="Mute expired"), guild_id=guild.id)
+        embed = discord.Embed(
+            title="Member Unmuted",
+            description=f"{member.mention} has been unmuted after {duration} minutes.",
+            color=discord.Color.green()
+        )
+        await self._notify(entry, embed)
+
+        # Log the unmute action
+        self.audit_log.record(entry.guild_id, "mute_expired", entry.payload.get("moderator"), member)
+        audit(logger, f"{entry.payload.get('moderator')} unmuted {member} after {duration} minutes.",
+              action="mute_expired", actor=entry.payload.get("moderator"), target=member,
+              guild_id=entry.guild_id, duration_minutes=duration)
+
+    async def _expire_ban(self, entry):
+        """Lift a temporary ban once it runs out."""
+        guild = self.bot.get_guild(entry.guild_id)
+        if not guild:
+            return
+        try:
+            await rest.run(MODERATION, lambda: guild.unban(discord.Object(id=entry.target_id), reason="Temporary ban expired"),
+                           guild_id=guild.id)
+        except discord.NotFound:
+            # Already unbanned by hand
+            return
+
+        duration = entry.payload.get("duration")
+        embed = discord.Embed(
+            title="Member Unbanned",
+            description=f"<@{entry.target_id}> has been unbanned after {duration} minutes.",
+            color=discord.Color.green()
+        )
+        await self._notify(entry, embed)
+        self.audit_log.record(entry.guild_id, "ban_expired", entry.payload.get("moderator"), entry.target_id)
+        audit(logger, f"Temporary ban of {entry.target_id} by {entry.payload.get('moderator')} expired after {duration} minutes.",
+              action="ban_expired", actor=entry.payload.get("moderator"), target=entry.target_id,
+              guild_id=entry.guild_id, duration_minutes=duration)
 
     @commands.command()
     @commands.has_permissions(kick_members=True)
     async def kick(self, ctx, member: discord.Member, *, reason=None):
         """Kick a member from the server."""
         try:
-            await member.kick(reason=reason)
+            await rest.run(MODERATION, lambda: member.kick(reason=reason), guild_id=ctx.guild.id)
             embed = discord.Embed(
                 title="Member Kicked",
                 description=f"{member.mention} has been kicked from the server. Reason: {reason}",
@@ -25,7 +228,7 @@ class Moderation(commands.Cog):
             await ctx.send(embed=embed)
 
             # Log the kick action
-            logger.info(f"{ctx.author} kicked {member} from the server. Reason: {reason}")
+            self._audit(ctx, f"{ctx.author} kicked {member} from the server. Reason: {reason}", "kick", member, reason)
 
         except discord.Forbidden:
             await ctx.send("I do not have permission to kick this member.")
@@ -42,7 +245,7 @@ class Moderation(commands.Cog):
     async def ban(self, ctx, member: discord.Member, *, reason=None):
         """Ban a member from the server."""
         try:
-            await member.ban(reason=reason)
+            await rest.run(MODERATION, lambda: member.ban(reason=reason), guild_id=ctx.guild.id)
             embed = discord.Embed(
                 title="Member Banned",
                 description=f"{member.mention} has been banned from the server. Reason: {reason}",
@@ -51,7 +254,7 @@ class Moderation(commands.Cog):
             await ctx.send(embed=embed)
 
             # Log the ban action
-            logger.info(f"{ctx.author} banned {member} from the server. Reason: {reason}")
+            self._audit(ctx, f"{ctx.author} banned {member} from the server. Reason: {reason}", "ban", member, reason)
 
         except discord.Forbidden:
             await ctx.send("I do not have permission to ban this member.")
@@ -69,7 +272,8 @@ class Moderation(commands.Cog):
         """Unban a member from the server."""
         try:
             # Unban the member
-            await ctx.guild.unban(user, reason=reason)
+            await rest.run(MODERATION, lambda: ctx.guild.unban(user, reason=reason), guild_id=ctx.guild.id)
+            await self.expirations.cancel("unban", ctx.guild.id, user.id)
             embed = discord.Embed(
                 title="Member Unbanned",
                 description=f"{user.mention} has been unbanned from the server. Reason: {reason}",
@@ -78,7 +282,7 @@ class Moderation(commands.Cog):
             await ctx.send(embed=embed)
 
             # Log the unban action
-            logger.info(f"{ctx.author} unbanned {user} from the server. Reason: {reason}")
+            self._audit(ctx, f"{ctx.author} unbanned {user} from the server. Reason: {reason}", "unban", user, reason)
 
         except discord.Forbidden:
             await ctx.send("I do not have permission to unban this member.")
@@ -90,21 +294,52 @@ class Moderation(commands.Cog):
             await ctx.send(f"An unexpected error occurred: {e}")
             logger.error(f"Unexpected error while unbanning {user}: {e}")
 
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def tempban(self, ctx, member: discord.Member, duration: int, *, reason=None):
+        """Ban a member for a specified duration in minutes."""
+        try:
+            await rest.run(MODERATION, lambda: member.ban(reason=reason), guild_id=ctx.guild.id)
+            await self.expirations.schedule_in(
+                "unban", ctx.guild.id, member.id, duration * 60,
+                {"channel_id": ctx.channel.id, "duration": duration, "moderator": str(ctx.author)}
+            )
+            embed = discord.Embed(
+                title="Member Banned",
+                description=f"{member.mention} has been banned for {duration} minutes. Reason: {reason}",
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+
+            # Log the temporary ban action
+            self._audit(ctx, f"{ctx.author} banned {member} for {duration} minutes. Reason: {reason}", "tempban", member,
+                        reason, duration_minutes=duration)
+
+        except discord.Forbidden:
+            await ctx.send("I do not have permission to ban this member.")
+            logger.error(f"Failed to ban {member}: Insufficient permissions.")
+        except discord.HTTPException as e:
+            await ctx.send(f"An error occurred: {e}")
+            logger.error(f"Error during temporary ban of {member}: {e}")
+        except Exception as e:
+            await ctx.send(f"An unexpected error occurred: {e}")
+            logger.error(f"Unexpected error while temporarily banning {member}: {e}")
+
 
     @commands.command()
     @commands.has_permissions(manage_roles=True)
     async def mute(self, ctx, member: discord.Member, duration: int, *, reason=None):
         """Mute a member for a specified duration in minutes."""
         try:
-            # Create a mute role if it doesn't exist
-            mute_role = discord.utils.get(ctx.guild.roles, name="Muted")
+            # Create a mute role if it doesn't exist; its channel overwrites are applied in the background
+            mute_role = self._mute_role(ctx.guild)
             if not mute_role:
-                mute_role = await ctx.guild.create_role(name="Muted")
-                for channel in ctx.guild.text_channels:
-                    await channel.set_permissions(mute_role, speak=False, send_messages=False, read_messages=True)
+                mute_role = await self._create_mute_role(ctx.guild)
+                self.provisioner.start(ctx.guild, mute_role)
+                await ctx.send("Created the Muted role. Channel permissions are being set up in the background; use `!mute_setup` to follow progress.")
 
             # Add the mute role to the member
-            await member.add_roles(mute_role, reason=reason)
+            await rest.run(MODERATION, lambda: member.add_roles(mute_role, reason=reason), guild_id=ctx.guild.id)
             embed = discord.Embed(
                 title="Member Muted",
                 description=f"{member.mention} has been muted for {duration} minutes. Reason: {reason}",
@@ -113,22 +348,14 @@ class Moderation(commands.Cog):
             await ctx.send(embed=embed)
 
             # Log the mute action
-            logger.info(f"{ctx.author} muted {member} for {duration} minutes. Reason: {reason}")
-
-            # Wait for the specified duration (in seconds)
-            await asyncio.sleep(duration * 60)
+            self._audit(ctx, f"{ctx.author} muted {member} for {duration} minutes. Reason: {reason}", "mute", member,
+                        reason, duration_minutes=duration)
 
-            # Remove the mute role after the duration
-            await member.remove_roles(mute_role)
-            embed = discord.Embed(
-                title="Member Unmuted",
-                description=f"{member.mention} has been unmuted after {duration} minutes.",
-                color=discord.Color.green()
+            # Hand the unmute to the persistent scheduler instead of keeping this command alive
+            await self.expirations.schedule_in(
+                "unmute", ctx.guild.id, member.id, duration * 60,
+                {"channel_id": ctx.channel.id, "duration": duration, "moderator": str(ctx.author)}
             )
-            await ctx.send(embed=embed)
-
-            # Log the unmute action
-            logger.info(f"{ctx.author} unmuted {member} after {duration} minutes.")
 
         except discord.Forbidden:
             await ctx.send("I do not have permission to mute this member.")
@@ -140,14 +367,114 @@ class Moderation(commands.Cog):
             await ctx.send(f"An unexpected error occurred: {e}")
             logger.error(f"Unexpected error while muting {member}: {e}")
 
+    async def _prepare_bulk(self, ctx, args):
+        """Parse a bulk command's targets from its arguments and any attached id lists."""
+        try:
+            request = BulkRequest.parse(args)
+        except ValueError as e:
+            await ctx.send(f"Invalid arguments: {e}")
+            return None, []
+
+        for attachment in ctx.message.attachments:
+            request.add_ids_from_text((await attachment.read()).decode("utf-8", errors="ignore"))
+
+        # Without a member cache, explicit targets are fetched and filters need the full member list
+        members = await get_members(ctx.guild, request.ids)
+        candidates = await all_members(ctx.guild) if request.has_filters else None
+        targets = resolve_targets(ctx.guild, request, ctx.author, members, candidates)
+        if not targets:
+            await ctx.send("No members matched.")
+            return request, []
+
+        if request.dry_run:
+            preview = "\n".join(str(target) if isinstance(target, discord.Member) else str(target.id) for target in targets[:20])
+            more = f"\n...and {len(targets) - 20} more" if len(targets) > 20 else ""
+            await ctx.send(f"Dry run: {len(targets)} member(s) would be affected.\n```\n{preview}{more}\n```")
+            return request, []
+        return request, targets
+
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def massban(self, ctx, *, args=""):
+        """Ban many members at once by id, attached id list, or filters (--joined 10m, --regex, --dry-run, --reason)."""
+        request, targets = await self._prepare_bulk(ctx, args)
+        if not targets:
+            return
+
+        runner = BulkRunner("ban", len(targets), guild_id=ctx.guild.id)
+        status = await ctx.send(f"Banning {len(targets)} member(s)...")
+        if hasattr(ctx.guild, "bulk_ban"):
+            work = runner.bulk_ban(ctx.guild, targets, request.reason)
+        else:
+            work = runner.each(targets, lambda target: ctx.guild.ban(target, reason=request.reason))
+        await runner.run(status, work)
+        self.audit_log.record_many(ctx.guild.id, "ban", ctx.author, runner.done, request.reason)
+        self._audit(ctx, f"{ctx.author} mass banned {runner.succeeded} member(s). Reason: {request.reason}", "massban",
+                    None, request.reason, succeeded=runner.succeeded, failed=runner.failed)
+
+    @commands.command()
+    @commands.has_permissions(kick_members=True)
+    async def masskick(self, ctx, *, args=""):
+        """Kick many members at once by id, attached id list, or filters (--joined 10m, --regex, --dry-run, --reason)."""
+        request, targets = await self._prepare_bulk(ctx, args)
+        # Only members still in the guild can be kicked
+        targets = [target for target in targets if isinstance(target, discord.Member)]
+        if not targets:
+            return
+
+        runner = BulkRunner("kick", len(targets), guild_id=ctx.guild.id)
+        status = await ctx.send(f"Kicking {len(targets)} member(s)...")
+        await runner.run(status, runner.each(targets, lambda member: member.kick(reason=request.reason)))
+        self.audit_log.record_many(ctx.guild.id, "kick", ctx.author, runner.done, request.reason)
+        self._audit(ctx, f"{ctx.author} mass kicked {runner.succeeded} member(s). Reason: {request.reason}", "masskick",
+                    None, request.reason, succeeded=runner.succeeded, failed=runner.failed)
+
+    @commands.command()
+    @commands.has_permissions(moderate_members=True)
+    async def masstimeout(self, ctx, duration, *, args=""):
+        """Time out many members at once, e.g. `!masstimeout 1h --joined 10m --reason raid`."""
+        try:
+            seconds = parse_duration(duration)
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        request, targets = await self._prepare_bulk(ctx, args)
+        targets = [target for target in targets if isinstance(target, discord.Member)]
+        if not targets:
+            return
+
+        until = datetime.timedelta(seconds=seconds)
+        runner = BulkRunner("timeout", len(targets), guild_id=ctx.guild.id)
+        status = await ctx.send(f"Timing out {len(targets)} member(s)...")
+        await runner.run(status, runner.each(targets, lambda member: member.timeout(until, reason=request.reason)))
+        self.audit_log.record_many(ctx.guild.id, "timeout", ctx.author, runner.done, request.reason)
+        self._audit(ctx, f"{ctx.author} mass timed out {runner.succeeded} member(s) for {duration}. Reason: {request.reason}",
+                    "masstimeout", None, request.reason, succeeded=runner.succeeded, failed=runner.failed, duration=duration)
+
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def mute_setup(self, ctx):
+        """Set up (or resume setting up) the Muted role's channel permissions and report progress."""
+        mute_role = self._mute_role(ctx.guild)
+        if not mute_role:
+            mute_role = await self._create_mute_role(ctx.guild)
+
+        job = self.provisioner.start(ctx.guild, mute_role)
+        status = await ctx.send(f"Muted role setup {job.summary()}")
+        while job.running:
+            await asyncio.sleep(5)
+            await status.edit(content=f"Muted role setup {job.summary()}")
+        await status.edit(content=f"Muted role setup {job.summary()}")
+
     @commands.command()
     @commands.has_permissions(manage_roles=True)
     async def unmute(self, ctx, member: discord.Member, *, reason=None):
         """Unmute a member."""
         try:
-            mute_role = discord.utils.get(ctx.guild.roles, name="Muted")
+            mute_role = self._mute_role(ctx.guild)
             if mute_role in member.roles:
-                await member.remove_roles(mute_role, reason=reason)
+                await rest.run(MODERATION, lambda: member.remove_roles(mute_role, reason=reason), guild_id=ctx.guild.id)
+                await self.expirations.cancel("unmute", ctx.guild.id, member.id)
                 embed = discord.Embed(
                     title="Member Unmuted",
                     description=f"{member.mention} has been unmuted. Reason: {reason}",
@@ -156,7 +483,7 @@ class Moderation(commands.Cog):
                 await ctx.send(embed=embed)
 
                 # Log the unmute action
-                logger.info(f"{ctx.author} unmuted {member}. Reason: {reason}")
+                self._audit(ctx, f"{ctx.author} unmuted {member}. Reason: {reason}", "unmute", member, reason)
             else:
                 await ctx.send(f"{member.mention} is not muted.")
         except discord.Forbidden:
@@ -169,5 +496,39 @@ class Moderation(commands.Cog):
             await ctx.send(f"An unexpected error occurred: {e}")
             logger.error(f"Unexpected error while unmuting {member}: {e}")
 
+    @commands.command()
+    @commands.has_permissions(kick_members=True)
+    async def history(self, ctx, user: discord.User):
+        """Show every moderation action taken against a user, newest first."""
+        view = HistoryView(self.audit_log, ctx.author.id, f"Moderation history for {user}", ctx.guild.id, target_id=user.id)
+        view.message = await ctx.send(embed=await view.render(), view=view)
+
+    @commands.command()
+    @commands.has_permissions(kick_members=True)
+    async def modstats(self, ctx, moderator: Optional[discord.User] = None, days: int = 7):
+        """Count actions per moderator over the last few days, or list one moderator's actions."""
+        since = time.time() - days * 86400
+        stats = await self.audit_log.stats(ctx.guild.id, since, moderator.id if moderator else None)
+
+        if moderator is not None:
+            counts = stats.get(moderator.id, {})
+            summary = ", ".join(f"{action}: {count}" for action, count in sorted(counts.items())) or "no actions"
+            view = HistoryView(self.audit_log, ctx.author.id, f"Actions by {moderator} in the last {days} day(s)",
+                               ctx.guild.id, totals=summary, actor_id=moderator.id, since=since)
+            view.message = await ctx.send(embed=await view.render(), view=view)
+            return
+
+        embed = discord.Embed(title=f"Moderation stats for the last {days} day(s)", color=discord.Color.blurple())
+        ranked = sorted(stats.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        for actor_id, counts in ranked[:25]:  # Embeds hold at most 25 fields
+            embed.add_field(
+                name=f"{sum(counts.values())} action(s)",
+                value=(f"<@{actor_id}>" if actor_id else "Scheduled expirations") + "\n" +
+                      ", ".join(f"{action}: {count}" for action, count in sorted(counts.items())),
+            )
+        if not ranked:
+            embed.description = "No moderation actions found."
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
@@ -1,19 +1,155 @@
 import discord
 from discord.ext import commands, tasks
-import datetime
+import asyncio
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from utils.guild_config import GuildConfig
+from utils.guild_scheduler import StaggeredScheduler
+from utils.name_index import CATEGORY, names
+from utils.rename_scheduler import RenameScheduler
+from utils.rest_scheduler import STATS, rest
+from utils.stats_counter import StatsCounterStore
+
 logger = logging.getLogger(__name__)
 
+# (channel slug, display label, counter attribute) for every statistics channel
+STAT_CHANNELS = (
+    ("total-members", "Total Members", "total_members"),
+    ("actual-users", "Actual Users", "actual_users"),
+    ("total-bots", "Total Bots", "total_bots"),
+    ("active-tickets", "Active Tickets", "active_tickets"),
+    ("total-tickets", "Total Tickets", "total_tickets"),
+    ("members-joined-this-month", "Members Joined This Month", "joined_this_month"),
+)
+
+STATS_PERIOD = 30  # Seconds between updates of any one guild
+RECONCILE_PERIOD = 600  # Seconds between rescans of any one guild
+
 class Statistics(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.config = GuildConfig("data/statistics.json")  # Stat channel ids per guild
+        self.counters = StatsCounterStore()  # Event-maintained counters read by update_stats
+        self.renames = RenameScheduler()  # Only sends renames that change a name, within Discord's budget
+        self.update_schedule = StaggeredScheduler(STATS_PERIOD)  # Spreads guild updates across the period
+        self.reconcile_schedule = StaggeredScheduler(RECONCILE_PERIOD)
+        self._seeding = set()  # Guilds being counted from an uncached chunk
+        self._chunk_limit = asyncio.Semaphore(2)  # Uncached chunks are heavy; only run a couple at once
+        names.attach(bot)  # Shared name -> id index used instead of scanning guild channels
+        self.renames.start()
         self.update_stats.start()  # Start the background task to update stats periodically
+        self.reconcile_stats.start()  # Periodically rescan to correct any drift in the counters
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.update_stats.cancel()  # Cancel the task if the cog is unloaded
+        self.reconcile_stats.cancel()
+        await self.renames.stop()
+        await self.config.close()
+
+    def _schedule_guilds(self):
+        """Schedule every guild that has statistics channels configured."""
+        configured = [guild.id for guild in self.bot.guilds if self._stat_channel_ids(guild)]
+        self.update_schedule.sync(configured)
+        self.reconcile_schedule.sync(configured)
+
+    def _shard_ready(self, guild):
+        """Whether the shard owning this guild is connected (always true without sharding)."""
+        get_shard = getattr(self.bot, "get_shard", None)
+        if get_shard is None:
+            return True
+        shard = get_shard(guild.shard_id)
+        return shard is not None and not shard.is_closed()
+
+    def _stat_channel_ids(self, guild):
+        """Return the configured stat channel ids, adopting existing channels by name once."""
+        channel_ids = self.config.get(guild.id, "stats_channels")
+        if channel_ids is not None:
+            return channel_ids
+
+        # Guilds set up before channel ids were stored still have the original channel names
+        channel_ids = {}
+        for slug, _, _ in STAT_CHANNELS:
+            channel = names.text_channel(guild, slug)
+            if channel:
+                channel_ids[slug] = channel.id
+        if channel_ids:
+            self.config.set(guild.id, "stats_channels", channel_ids)
+            logger.info(f"Adopted existing statistics channels in {guild.name}.")
+        return channel_ids
+
+    def _seed(self, guild):
+        """Seed a guild's counters from the member cache, or from an uncached chunk without one."""
+        if guild.chunked:
+            self.counters.seed(guild)
+        elif guild.id not in self._seeding:
+            self._seeding.add(guild.id)
+            asyncio.create_task(self._seed_uncached(guild))
+
+    async def _seed_uncached(self, guild, reconcile=False):
+        try:
+            async with self._chunk_limit:
+                # The members are counted and then dropped, so they never stay in memory
+                members = await guild.chunk(cache=False)
+            if reconcile:
+                self._log_drift(guild, self.counters.reconcile(guild, members))
+            else:
+                self.counters.seed(guild, members)
+        except Exception as e:
+            logger.error(f"Failed to count members of {guild.name}: {e}")
+        finally:
+            self._seeding.discard(guild.id)
+
+    def _log_drift(self, guild, drift):
+        if drift:
+            logger.warning(f"Corrected statistics drift in {guild.name}: {drift}")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Seed the counters for every guild once the member cache is filled."""
+        for guild in self.bot.guilds:
+            self._seed(guild)
+        self._schedule_guilds()
+        logger.info(f"Seeding statistics counters for {len(self.bot.guilds)} guild(s).")
+
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id):
+        """Reseed guilds on a shard that started a new session, since events may have been missed."""
+        for guild in self.bot.guilds:
+            if guild.shard_id == shard_id:
+                self._seed(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self._seed(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.counters.discard(guild.id)
+        self.update_schedule.remove(guild.id)
+        self.reconcile_schedule.remove(guild.id)
+        rest.cancel_guild(guild.id, STATS)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.counters.member_joined(member)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        # The raw event fires even when the member wasn't cached
+        self.counters.member_removed(payload.guild_id, payload.user)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.counters.channel_created(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.counters.channel_deleted(channel)
+        self.renames.forget(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.counters.channel_updated(before, after)
 
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -21,21 +157,26 @@ class Statistics(commands.Cog):
         """Create statistics channels for the server."""
         try:
             # Create the statistics category if it doesn't exist
-            category = discord.utils.get(ctx.guild.categories, name="Server Stats")
+            category = names.resolve(ctx.guild, CATEGORY, "Server Stats", self.config, "stats_category")
             if not category:
-                category = await ctx.guild.create_category("Server Stats")
+                category = await rest.run(STATS, lambda: ctx.guild.create_category("Server Stats"), guild_id=ctx.guild.id)
+                self.config.set(ctx.guild.id, "stats_category", category.id)
                 logger.info(f"Created new category: Server Stats")
 
             # Create channels for each stat (if they don't exist)
-            await self._create_or_get_channel(ctx, category, "total-members", "Total Members: 0")
-            await self._create_or_get_channel(ctx, category, "actual-users", "Actual Users: 0")
-            await self._create_or_get_channel(ctx, category, "total-bots", "Total Bots: 0")
-            await self._create_or_get_channel(ctx, category, "active-tickets", "Active Tickets: 0")
-            await self._create_or_get_channel(ctx, category, "total-tickets", "Total Tickets: 0")
-            await self._create_or_get_channel(ctx, category, "members-joined-this-month", "Members Joined This Month: 0")
+            channel_ids = {}
+            for slug, label, _ in STAT_CHANNELS:
+                channel = await self._create_or_get_channel(ctx, category, slug, f"{label}: 0")
+                if channel:
+                    channel_ids[slug] = channel.id
+
+            # Remember the channels by id so later renames don't lose track of them
+            self.config.set(ctx.guild.id, "stats_channels", channel_ids)
+            self.update_schedule.add(ctx.guild.id)
+            self.reconcile_schedule.add(ctx.guild.id)
 
             await ctx.send("Server statistics channels have been created successfully!")
-            logger.info("Statistics channels have been created.")
+            logger.info(f"Statistics channels have been created in {ctx.guild.name}.")
 
         except Exception as e:
             await ctx.send(f"An error occurred while creating statistics channels: {e}")
@@ -43,88 +184,108 @@ class Statistics(commands.Cog):
 
     async def _create_or_get_channel(self, ctx, category, channel_name, default_name):
         """Create a channel or get the existing one."""
-        existing_channel = discord.utils.get(ctx.guild.text_channels, name=channel_name)
+        existing_channel = names.text_channel(ctx.guild, channel_name)
         if not existing_channel:
             try:
-                existing_channel = await ctx.guild.create_text_channel(channel_name, category=category)
+                existing_channel = await rest.run(STATS, lambda: ctx.guild.create_text_channel(channel_name, category=category),
+                                                  guild_id=ctx.guild.id)
                 logger.info(f"Created new channel: {channel_name}")
             except discord.Forbidden:
                 logger.error(f"Permission error creating channel {channel_name}")
                 await ctx.send(f"Permission error: Cannot create channel {channel_name}. Please ensure I have the correct permissions.")
-                return
+                return None
             except Exception as e:
                 logger.error(f"Unexpected error creating channel {channel_name}: {e}")
                 await ctx.send(f"An unexpected error occurred while creating channel {channel_name}: {e}")
-                return
+                return None
 
         # Update the channel with the correct stats (without doubling the name)
         if not existing_channel.name.startswith(channel_name):
-            await existing_channel.edit(name=f"{channel_name}: {default_name}")
-            logger.info(f"Updated channel {channel_name} with default name: {default_name}")
+            self.renames.submit(existing_channel, f"{channel_name}: {default_name}")
+            logger.info(f"Queued default name for channel {channel_name}: {default_name}")
+        return existing_channel
 
-    @tasks.loop(seconds=3)
-    async def update_stats(self):
-        """Periodically update the statistics channels."""
-        guild = self.bot.get_guild(1251412440566992977)  # Replace with your server ID
-        if not guild:
-            logger.error("Unable to find the guild. Make sure the bot is in the server.")
+    def _update_guild(self, guild):
+        """Submit fresh statistics channel names for one guild."""
+        # Seed lazily if the cog was loaded after READY or the month has rolled over
+        if self.counters.needs_reseed(guild.id):
+            self._seed(guild)
+        counters = self.counters.get(guild.id)
+        if counters is None:
+            # Still being counted from an uncached chunk
             return
 
-        try:
-            # Get the total number of members, bots, and actual users
-            total_members = len(guild.members)
-            total_bots = len([member for member in guild.members if member.bot])
-            actual_users = total_members - total_bots
-
-            # Get the "Tickets" and "Closed Tickets" categories
-            tickets_category = discord.utils.get(guild.categories, name="Tickets")
-            closed_tickets_category = discord.utils.get(guild.categories, name="Closed Tickets")
-
-            # Calculate active tickets (channels under "Tickets" category with members)
-            active_tickets = 0
-            if tickets_category:
-                active_tickets = len([channel for channel in tickets_category.text_channels if len(channel.members) > 0])
-
-            # Calculate total tickets (channels under both "Tickets" and "Closed Tickets" categories)
-            total_tickets = 0
-            if tickets_category:
-                total_tickets += len(tickets_category.text_channels)
-            if closed_tickets_category:
-                total_tickets += len(closed_tickets_category.text_channels)
-
-            # Calculate how many members joined this month
-            current_month = datetime.datetime.now().month
-            members_joined_this_month = len([member for member in guild.members if member.joined_at and member.joined_at.month == current_month])
-
-            # Update channel names with the statistics
-            total_members_channel = discord.utils.get(guild.text_channels, name="total-members")
-            if total_members_channel:
-                await total_members_channel.edit(name=f"Total Members: {total_members}")
-
-            actual_users_channel = discord.utils.get(guild.text_channels, name="actual-users")
-            if actual_users_channel:
-                await actual_users_channel.edit(name=f"Actual Users: {actual_users}")
-
-            total_bots_channel = discord.utils.get(guild.text_channels, name="total-bots")
-            if total_bots_channel:
-                await total_bots_channel.edit(name=f"Total Bots: {total_bots}")
-
-            active_tickets_channel = discord.utils.get(guild.text_channels, name="active-tickets")
-            if active_tickets_channel:
-                await active_tickets_channel.edit(name=f"Active Tickets: {active_tickets}")
-
-            total_tickets_channel = discord.utils.get(guild.text_channels, name="total-tickets")
-            if total_tickets_channel:
-                await total_tickets_channel.edit(name=f"Total Tickets: {total_tickets}")
-
-            joined_this_month_channel = discord.utils.get(guild.text_channels, name="members-joined-this-month")
-            if joined_this_month_channel:
-                await joined_this_month_channel.edit(name=f"Members Joined This Month: {members_joined_this_month}")
-
-            logger.info("Updated server statistics channels.")
+        channel_ids = self._stat_channel_ids(guild)
+        for slug, label, attribute in STAT_CHANNELS:
+            channel = guild.get_channel(channel_ids.get(slug, 0))
+            if channel:
+                self.renames.submit(channel, f"{label}: {getattr(counters, attribute)}")
 
-        except Exception as e:
-            logger.error(f"Error updating stats: {e}")
+    @tasks.loop(seconds=1)
+    async def update_stats(self):
+        """Update the statistics channels of the guilds whose slot in the period has come up."""
+        for guild_id in self.update_schedule.due():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                self.update_schedule.remove(guild_id)
+                continue
+            if guild.unavailable or not self._shard_ready(guild):
+                continue
+
+            try:
+                self._update_guild(guild)
+            except Exception as e:
+                logger.error(f"Error updating stats for {guild.name}: {e}")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def stats_status(self, ctx):
+        """Show the state of the statistics channel rename queue."""
+        stats = self.renames.stats()
+        stats["scheduled_guilds"] = len(self.update_schedule)
+        embed = discord.Embed(title="Statistics Rename Queue", color=discord.Color.blue())
+        for key, value in stats.items():
+            embed.add_field(name=key.replace("_", " ").title(), value=str(value))
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def stats_full_reconcile(self, ctx, enabled: bool):
+        """Recount every member on each rescan when the member list isn't cached (costly on large servers)."""
+        self.config.set(ctx.guild.id, "stats_full_reconcile", enabled)
+        if enabled:
+            await ctx.send("Statistics will be fully recounted from the member list on every rescan.")
+        else:
+            await ctx.send("Statistics rescans will only check member totals and tickets.")
+
+    @update_stats.before_loop
+    async def before_update_stats(self):
+        await self.bot.wait_until_ready()
+        self._schedule_guilds()
+
+    @tasks.loop(seconds=5)
+    async def reconcile_stats(self):
+        """Rescan due guilds and correct counters that drifted from missed events."""
+        for guild_id in self.reconcile_schedule.due():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None or guild.unavailable or not self._shard_ready(guild):
+                continue
+            try:
+                if guild.chunked:
+                    self._log_drift(guild, self.counters.reconcile(guild))
+                elif not self.config.get(guild.id, "stats_full_reconcile", False):
+                    # Member total and tickets only; bots and monthly joins are re-derived when the month rolls over
+                    self._log_drift(guild, self.counters.reconcile(guild))
+                elif guild.id not in self._seeding:
+                    # Bots and monthly joins can only be re-derived from the members themselves
+                    self._seeding.add(guild.id)
+                    asyncio.create_task(self._seed_uncached(guild, reconcile=True))
+            except Exception as e:
+                logger.error(f"Error reconciling stats for {guild.name}: {e}")
+
+    @reconcile_stats.before_loop
+    async def before_reconcile_stats(self):
+        await self.bot.wait_until_ready()
 
 async def setup(bot):
     await bot.add_cog(Statistics(bot))
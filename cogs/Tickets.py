@@ -1,24 +1,108 @@
 import discord
 from discord.ext import commands
-from discord.ui import Button, View
-import os, aiofiles
+from discord.ui import Button, DynamicItem, View
+import asyncio, io, os, time
+
+from utils.cluster import owns_guild
+from utils.expiry_scheduler import ExpiryScheduler
+from utils.metrics import metrics
+from utils.guild_config import GuildConfig
+from utils.name_index import CATEGORY, names
+from utils.rest_scheduler import INTERACTION, TICKETS, rest
+from utils.ticket_provisioning import TicketProvisioner, closed_overwrites
+from utils.ticket_store import Ticket, TicketStore
+from utils.transcripts import TranscriptWriter, message_record, render_record
+
+class CreateTicketButton(DynamicItem[Button], template=r"ticket:create"):
+    """The Create Ticket button on a ticket panel. It carries no state of its own."""
+
+    def __init__(self):
+        super().__init__(Button(label="Create Ticket", style=discord.ButtonStyle.primary, custom_id="ticket:create"))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls()
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("Tickets")
+        if cog is None:
+            return
+        with metrics.timer("discord_interaction_seconds", (("component", "ticket_create"),)):
+            await cog.open_ticket(interaction)
+
+
+class TicketActionButton(DynamicItem[Button], template=r"ticket:(?P<action>close|delete):(?P<channel_id>\d+)"):
+    """A Close or Delete button in a ticket's admin controls, keyed by the ticket's channel id."""
+
+    LABELS = {"close": "Close Ticket", "delete": "Delete Ticket"}
+
+    def __init__(self, action, channel_id):
+        self.action = action
+        self.channel_id = channel_id
+        super().__init__(Button(
+            label=self.LABELS[action],
+            style=discord.ButtonStyle.danger,
+            custom_id=f"ticket:{action}:{channel_id}",
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["channel_id"]))
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to use this button.", ephemeral=True)
+            return False
+        return True
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("Tickets")
+        if cog is None:
+            return
+        handler = cog.close_ticket if self.action == "close" else cog.delete_ticket
+        with metrics.timer("discord_interaction_seconds", (("component", f"ticket_{self.action}"),)):
+            await handler(interaction, self.channel_id)
+
 
 class Tickets(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.ticket_roles = {}
-        self.user_tickets = {}
+        self.tickets = TicketStore("data/tickets.db")  # Persistent ticket state indexed by channel, opener and guild
+        self.config = GuildConfig("data/tickets.json")  # Staff roles and warm pool size per guild
+        self.provisioner = TicketProvisioner(self.config)
+        # Tickets left without messages for the guild's ticket_autoclose_hours are closed on a shared timer
+        self.expirations = ExpiryScheduler("data/ticket_expirations.db", wait_until_ready=bot.wait_until_ready,
+                                           owns=lambda guild_id: owns_guild(bot, guild_id))
+        self.expirations.register("ticket_close", self._expire_ticket)
+        names.attach(bot)  # Categories are found by stored id, or by name through the shared index
+        self._provisioning = set()  # (guild_id, user_id) of tickets being created right now
+        self._category_locks = {}  # (guild_id, config key) -> lock held while that category is created
         self.ticket_logs = "ticket_logs"  # Directory to store ticket logs
 
         # Ensure the logs directory exists
         if not os.path.exists(self.ticket_logs):
             os.makedirs(self.ticket_logs)
+        self.transcripts = TranscriptWriter(self.ticket_logs)  # Batches compressed transcript records to disk
+
+    async def cog_load(self):
+        await self.tickets.load()
+        await self.expirations.load()
+        self.transcripts.start()
+        # Buttons route by custom_id, so panels and admin controls keep working across restarts
+        self.bot.add_dynamic_items(CreateTicketButton, TicketActionButton)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(CreateTicketButton, TicketActionButton)
+        await self.expirations.close()
+        await self.transcripts.close()
+        await self.tickets.close()
+        await self.config.close()
 
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def ticket(self, ctx):
         """Command to start the ticket creation process."""
-        if ctx.author.id in self.user_tickets:
+        if self.tickets.open_ticket_for(ctx.guild.id, ctx.author.id):
             await ctx.send("You already have an open ticket. Please close it before creating a new one.")
             return
 
@@ -27,128 +111,289 @@ class Tickets(commands.Cog):
             description="Click the button below to create a ticket.",
             color=discord.Color.blue()
         )
-        button = Button(label="Create Ticket", style=discord.ButtonStyle.primary)
-
-        async def button_callback(interaction: discord.Interaction):
-            await interaction.response.defer(ephemeral=True)
-
-            guild = interaction.guild
-            ticket_category = discord.utils.get(guild.categories, name="Tickets")
-            if not ticket_category:
-                ticket_category = await guild.create_category("Tickets")
-
-            # Check if user already has a ticket
-            if ctx.author.id in self.user_tickets:
-                await interaction.response.send_message("You already have an open ticket. Please close it first.", ephemeral=True)
-                return
-
-            # Create ticket channel
-            ticket_channel = await guild.create_text_channel(
-                name=f"ticket-{interaction.user.name}",
-                category=ticket_category
-            )
-
-            # Create a role for the ticket
-            ticket_role = await guild.create_role(name=f"Ticket-{interaction.user.name}")
-            self.ticket_roles[ticket_channel.id] = ticket_role.id
-            self.user_tickets[ctx.author.id] = ticket_channel.id
-
-            # Assign role permissions
-            await ticket_channel.set_permissions(guild.default_role, read_messages=False)
-            await ticket_channel.set_permissions(ticket_role, read_messages=True, send_messages=True)
-            await interaction.user.add_roles(ticket_role)
-
-            embed = discord.Embed(
-                title="Ticket Created",
-                description=f"Your ticket has been created: {ticket_channel.mention}",
-                color=discord.Color.green()
-            )
-            
-            await interaction.followup.send(embed=embed, ephemeral=True)
-
-            # Send admin controls embed
-            admin_embed = discord.Embed(
-                title="Admin Controls",
-                description="Use the buttons below to manage this ticket.",
-                color=discord.Color.red()
-            )
-            close_button = Button(label="Close Ticket", style=discord.ButtonStyle.danger)
-            delete_button = Button(label="Delete Ticket", style=discord.ButtonStyle.danger)
-
-            async def close_callback(interaction2: discord.Interaction):
-                if not interaction2.user.guild_permissions.administrator:
-                    await interaction2.response.send_message("You do not have permission to use this button.", ephemeral=True)
-                    return
-                
-                # Create or get the "Closed Tickets" category
-                closed_category = discord.utils.get(interaction2.guild.categories, name="Closed Tickets")
-                if not closed_category:
-                    closed_category = await interaction2.guild.create_category("Closed Tickets")
-                
-                # Move the ticket channel to the "Closed Tickets" category
-                await ticket_channel.edit(category=closed_category)
-                
-                # Set the ticket role permissions to prevent further messages
-                await ticket_channel.set_permissions(ticket_role, read_messages=False)
-                await interaction2.response.send_message("Ticket closed and moved to 'Closed Tickets'.", ephemeral=True)
-
-                # Remove the ticket role from the user
-                await interaction2.user.remove_roles(ticket_role)
-
-
-            async def delete_callback(interaction3: discord.Interaction):
-                if not interaction3.user.guild_permissions.administrator:
-                    await interaction3.response.send_message("You do not have permission to use this button.", ephemeral=True)
-                    return
-
-                # Remove role from the user
-                if ticket_role in interaction3.user.roles:
-                    await interaction3.user.remove_roles(ticket_role)
-
-                # Delete the ticket channel and role
-                await ticket_channel.delete()
-                if ticket_role:
-                    await ticket_role.delete()
-
-                # Clean up data
-                self.ticket_roles.pop(ticket_channel.id, None)
-                self.user_tickets.pop(ctx.author.id, None)
-
-            close_button.callback = close_callback
-            delete_button.callback = delete_callback
-
-            admin_view = View()
-            admin_view.add_item(close_button)
-            admin_view.add_item(delete_button)
-
-            await ticket_channel.send(embed=admin_embed, view=admin_view)
-
-        button.callback = button_callback
         view = View(timeout=None)
-        view.add_item(button)
+        view.add_item(CreateTicketButton())
         await ctx.send(embed=embed, view=view)
 
+    async def _category(self, guild, name, key):
+        """Return the guild's ticket category stored under ``key``, creating it if needed."""
+        category = names.resolve(guild, CATEGORY, name, self.config, key)
+        if category:
+            return category
+        # Concurrent first tickets wait for one create instead of each making their own category
+        async with self._category_locks.setdefault((guild.id, key), asyncio.Lock()):
+            category = names.resolve(guild, CATEGORY, name, self.config, key)
+            if not category:
+                category = await rest.run(TICKETS, lambda: guild.create_category(name), guild_id=guild.id)
+                self.config.set(guild.id, key, category.id)
+        return category
+
+    async def open_ticket(self, interaction: discord.Interaction):
+        """Create a ticket for whoever pressed a panel's Create Ticket button."""
+        await interaction.response.defer(ephemeral=True)
+        guild = interaction.guild
+        opener = interaction.user
+
+        # Check if user already has a ticket, or is already getting one from a double click
+        key = (guild.id, opener.id)
+        if self.tickets.open_ticket_for(guild.id, opener.id) or key in self._provisioning:
+            await rest.run(INTERACTION, lambda: interaction.followup.send("You already have an open ticket. Please close it first.", ephemeral=True),
+                           guild_id=guild.id)
+            return
+
+        self._provisioning.add(key)
+        try:
+            ticket_category = await self._category(guild, "Tickets", "ticket_category")
+
+            # One request creates the channel with the opener and staff already let in
+            staff_roles = [role for role in map(guild.get_role, self.config.get(guild.id, "ticket_staff_roles", [])) if role]
+            ticket_channel = await self.provisioner.provision(guild, ticket_category, opener, staff_roles)
+            self.tickets.add(Ticket(ticket_channel.id, guild.id, opener.id))
+            await self._schedule_autoclose(guild.id, ticket_channel.id, time.time())
+        except discord.HTTPException as e:
+            await rest.run(INTERACTION, lambda: interaction.followup.send(f"Couldn't create your ticket: {e}", ephemeral=True),
+                           guild_id=guild.id)
+            return
+        finally:
+            self._provisioning.discard(key)
+
+        embed = discord.Embed(
+            title="Ticket Created",
+            description=f"Your ticket has been created: {ticket_channel.mention}",
+            color=discord.Color.green()
+        )
+
+        # Send admin controls embed
+        admin_embed = discord.Embed(
+            title="Admin Controls",
+            description="Use the buttons below to manage this ticket.",
+            color=discord.Color.red()
+        )
+        admin_view = View(timeout=None)
+        admin_view.add_item(TicketActionButton("close", ticket_channel.id))
+        admin_view.add_item(TicketActionButton("delete", ticket_channel.id))
+
+        # The reply to the opener and the admin controls don't depend on each other
+        await asyncio.gather(
+            rest.run(INTERACTION, lambda: interaction.followup.send(embed=embed, ephemeral=True), guild_id=guild.id),
+            rest.run(TICKETS, lambda: ticket_channel.send(embed=admin_embed, view=admin_view), guild_id=guild.id),
+        )
+
+    async def close_ticket(self, interaction: discord.Interaction, channel_id: int):
+        """Move a ticket to "Closed Tickets" and lock everyone it let in back out."""
+        ticket = self.tickets.get(channel_id)
+        ticket_channel = interaction.guild.get_channel(channel_id)
+        if not ticket or not ticket_channel:
+            await interaction.response.send_message("This ticket no longer exists.", ephemeral=True)
+            return
+        if ticket.status == "closed":
+            await interaction.response.send_message("This ticket is already closed.", ephemeral=True)
+            return
+
+        # Acknowledge within Discord's three seconds; the move below may wait behind other ticket work
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        await self._close(interaction.guild, ticket, ticket_channel)
+        await rest.run(INTERACTION, lambda: interaction.followup.send("Ticket closed and moved to 'Closed Tickets'.", ephemeral=True),
+                       guild_id=interaction.guild.id)
+
+    async def _close(self, guild, ticket, ticket_channel):
+        # Create or get the "Closed Tickets" category
+        closed_category = await self._category(guild, "Closed Tickets", "closed_category")
+
+        # Move the channel and lock the opener out in a single edit
+        overwrites = closed_overwrites(ticket_channel, ticket)
+        await rest.run(TICKETS, lambda: ticket_channel.edit(category=closed_category, overwrites=overwrites),
+                       guild_id=guild.id)
+        self.tickets.close_ticket(ticket_channel.id)
+        await self.expirations.cancel("ticket_close", guild.id, ticket_channel.id)
+        await self.transcripts.close_channel(ticket_channel.id)
+
+    async def _schedule_autoclose(self, guild_id, channel_id, last_activity):
+        """Schedule a ticket to close once it has gone the guild's auto-close period without messages."""
+        hours = self.config.get(guild_id, "ticket_autoclose_hours", 0)
+        if hours:
+            await self.expirations.schedule("ticket_close", guild_id, channel_id, last_activity + hours * 3600)
+
+    async def _expire_ticket(self, entry):
+        """Close an idle ticket, or push its deadline back if it saw messages since it was scheduled."""
+        guild = self.bot.get_guild(entry.guild_id)
+        ticket = self.tickets.get(entry.target_id)
+        ticket_channel = guild.get_channel(entry.target_id) if guild else None
+        if not ticket_channel or not ticket or ticket.status == "closed":
+            return
+        hours = self.config.get(guild.id, "ticket_autoclose_hours", 0)
+        if not hours:
+            return
+
+        # The channel's last message id is kept current from gateway events, so no per-message bookkeeping
+        last_activity = ticket.created_at
+        if ticket_channel.last_message_id:
+            last_activity = max(last_activity, discord.utils.snowflake_time(ticket_channel.last_message_id).timestamp())
+        if last_activity + hours * 3600 > time.time():
+            await self._schedule_autoclose(guild.id, ticket_channel.id, last_activity)
+            return
+
+        await self._close(guild, ticket, ticket_channel)
+        await rest.run(TICKETS, lambda: ticket_channel.send(f"This ticket was closed after {hours} hour(s) without messages."),
+                       guild_id=guild.id)
+
+    async def delete_ticket(self, interaction: discord.Interaction, channel_id: int):
+        """Delete a ticket's channel, keeping its transcript."""
+        ticket = self.tickets.get(channel_id)
+        ticket_channel = interaction.guild.get_channel(channel_id)
+        if not ticket or not ticket_channel:
+            await interaction.response.send_message("This ticket no longer exists.", ephemeral=True)
+            return
+
+        # Acknowledge the click now; the channel it came from is about to disappear
+        await interaction.response.defer()
+
+        # Make sure the transcript is on disk before the channel goes away
+        await self.transcripts.close_channel(channel_id)
+
+        # Delete the ticket channel, and the per-ticket role of tickets opened before roles were dropped
+        ticket_role = interaction.guild.get_role(ticket.role_id) if ticket.role_id else None
+        deletions = [ticket_channel.delete] + ([ticket_role.delete] if ticket_role else [])
+        await asyncio.gather(*(rest.run(TICKETS, delete, guild_id=interaction.guild.id) for delete in deletions))
+
+        # Clean up data
+        self.tickets.delete(channel_id)
+        await self.expirations.cancel("ticket_close", interaction.guild.id, channel_id)
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def add_user(self, ctx, member: discord.Member):
-        """Add a user to the ticket by giving them the ticket role."""
-        ticket_role_id = self.ticket_roles.get(ctx.channel.id)
-        if not ticket_role_id:
+        """Add a user to the ticket."""
+        ticket = self.tickets.get(ctx.channel.id)
+        if not ticket:
             await ctx.send("This command can only be used in a ticket channel.")
             return
 
-        ticket_role = ctx.guild.get_role(ticket_role_id)
-        await member.add_roles(ticket_role)
+        # Tickets opened before per-ticket roles were dropped still grant access through the role
+        ticket_role = ctx.guild.get_role(ticket.role_id) if ticket.role_id else None
+        if ticket_role:
+            await rest.run(TICKETS, lambda: member.add_roles(ticket_role), guild_id=ctx.guild.id)
+        else:
+            await rest.run(TICKETS, lambda: ctx.channel.set_permissions(member, read_messages=True, send_messages=True),
+                           guild_id=ctx.guild.id)
         await ctx.send(f"{member.mention} has been added to the ticket.")
 
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def ticket_staff(self, ctx, *roles: discord.Role):
+        """Set the roles that can see every new ticket (no roles clears the list)."""
+        self.config.set(ctx.guild.id, "ticket_staff_roles", [role.id for role in roles])
+        role_names = ", ".join(role.name for role in roles) or "none"
+        await ctx.send(f"Ticket staff roles set to: {role_names}")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def ticket_pool(self, ctx, size: int):
+        """Keep this many hidden ticket channels ready so tickets open faster during storms (0 disables)."""
+        size = max(0, min(size, 10))
+        self.config.set(ctx.guild.id, "ticket_pool_size", size)
+        self.provisioner.refill(ctx.guild)
+        await ctx.send(f"Ticket pool size set to {size}.")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def ticket_autoclose(self, ctx, hours: int):
+        """Close tickets automatically after this many hours without messages (0 disables)."""
+        hours = max(0, hours)
+        self.config.set(ctx.guild.id, "ticket_autoclose_hours", hours)
+        open_tickets = [ticket for ticket in self.tickets.guild_tickets(ctx.guild.id) if ticket.status == "open"]
+        for ticket in open_tickets:
+            if hours:
+                await self._schedule_autoclose(ctx.guild.id, ticket.channel_id, time.time())
+            else:
+                await self.expirations.cancel("ticket_close", ctx.guild.id, ticket.channel_id)
+        if hours:
+            await ctx.send(f"Tickets will close after {hours} hour(s) without messages ({len(open_tickets)} open ticket(s) scheduled).")
+        else:
+            await ctx.send("Ticket auto-close disabled.")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        # Nothing left to create or reply to in a guild the bot is no longer in
+        rest.cancel_guild(guild.id, TICKETS)
+
     @commands.Cog.listener()
     async def on_message(self, message):
         """Log messages sent in ticket channels."""
-        if message.channel.id in self.ticket_roles:
-            log_entry = f"{message.author}: {message.content}"
-            log_file_path = os.path.join(self.ticket_logs, f"ticket-{message.channel.id}.txt")
-            async with aiofiles.open(log_file_path, mode="a") as log_file:
-                await log_file.write(log_entry + "\n")
+        if message.channel.id in self.tickets:
+            await self.transcripts.write(message.channel.id, message_record(message))
+
+    @commands.Cog.listener()
+    async def on_message_edit(self, before, after):
+        """Log edits so transcripts keep every version of a message."""
+        if after.channel.id in self.tickets and before.content != after.content:
+            await self.transcripts.write(after.channel.id, message_record(after, kind="edit"))
+
+    @commands.Cog.listener()
+    async def on_message_delete(self, message):
+        if message.channel.id in self.tickets:
+            await self.transcripts.write(message.channel.id, message_record(message, kind="delete"))
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def transcript(self, ctx, channel_id: int, page: int = 1):
+        """Show a page of a ticket's transcript."""
+        if await self.tickets.guild_of(channel_id) != ctx.guild.id:
+            await ctx.send("No transcript found for that ticket.")
+            return
+        await self.transcripts.flush(channel_id)
+        reader = await asyncio.to_thread(self.transcripts.reader, channel_id)
+        if not len(reader):
+            await ctx.send("No transcript found for that ticket.")
+            return
+
+        page = min(max(page, 1), reader.page_count())
+        records = await asyncio.to_thread(reader.page, page)
+        embed = discord.Embed(
+            title=f"Transcript for ticket {channel_id}",
+            description="\n".join(render_record(record) for record in records)[:4000],
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"Page {page}/{reader.page_count()}")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def transcript_search(self, ctx, channel_id: int, *, query):
+        """Search a ticket's transcript for messages containing some text."""
+        if await self.tickets.guild_of(channel_id) != ctx.guild.id:
+            await ctx.send("No transcript found for that ticket.")
+            return
+        await self.transcripts.flush(channel_id)
+        reader = await asyncio.to_thread(self.transcripts.reader, channel_id)
+        matches = await asyncio.to_thread(reader.search, query, 20)
+        if not matches:
+            await ctx.send("No matching messages found.")
+            return
+
+        embed = discord.Embed(
+            title=f"Transcript matches for \"{query}\"",
+            description="\n".join(render_record(record) for record in matches)[:4000],
+            color=discord.Color.blue()
+        )
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def export_transcript(self, ctx, channel_id: int):
+        """Export a ticket's full transcript as a text file."""
+        if await self.tickets.guild_of(channel_id) != ctx.guild.id:
+            await ctx.send("No transcript found for that ticket.")
+            return
+        await self.transcripts.flush(channel_id)
+        reader = await asyncio.to_thread(self.transcripts.reader, channel_id)
+        if not len(reader):
+            await ctx.send("No transcript found for that ticket.")
+            return
+
+        text = await asyncio.to_thread(reader.export_text)
+        file = discord.File(io.BytesIO(text.encode("utf-8")), filename=f"ticket-{channel_id}.txt")
+        await ctx.send(file=file)
 
 async def setup(bot):
     await bot.add_cog(Tickets(bot))
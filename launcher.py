@@ -0,0 +1,222 @@
+"""Run the bot as several processes ("clusters"), each owning a contiguous range of shards.
+
+Every cluster is main.py running an AutoShardedBot over its own shard ids, so
+update_stats, transcript I/O and command handling are spread over one event loop per
+cluster. The launcher restarts a cluster that exits without touching the others, and
+hosts the IPC hub the clusters use for cross-cluster commands (see cogs/Cluster.py).
+
+    python launcher.py --clusters 2 --shards 8
+    python launcher.py --clusters 2 --shards 4 --fake-gateway --fake-guilds 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+import dotenv
+
+from utils.cluster import DEFAULT_IPC_PORT, IPCHub, shard_ranges
+from utils.log_pipeline import setup_logging
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(ROOT, "main.py")
+IDENTIFY_INTERVAL = 5.0  # Discord allows one IDENTIFY per 5 seconds per max_concurrency bucket
+STABLE_AFTER = 60.0  # A cluster that ran this long gets its restart backoff reset
+
+logger = logging.getLogger("launcher")
+
+
+class ClusterProcess:
+    """One supervised bot process and the shards it runs."""
+
+    def __init__(self, cluster_id, shard_ids, shard_count, env):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.env = env
+        self.process = None
+        self.restarts = 0
+        self.started_at = None
+        self._stopping = False
+        self._restart_requested = False
+        self._task = None
+
+    @property
+    def state(self):
+        if self.process is not None and self.process.returncode is None:
+            return "running"
+        return "stopped" if self._stopping else "restarting"
+
+    def status(self):
+        return {
+            "state": self.state,
+            "pid": self.process.pid if self.process else None,
+            "shards": self.shard_ids,
+            "restarts": self.restarts,
+            "uptime": round(time.monotonic() - self.started_at) if self.started_at and self.state == "running" else 0,
+        }
+
+    def start(self):
+        self._task = asyncio.create_task(self._supervise())
+
+    async def _spawn(self):
+        env = dict(os.environ, **self.env,
+                   CLUSTER_ID=str(self.cluster_id),
+                   SHARD_IDS=",".join(map(str, self.shard_ids)),
+                   SHARD_COUNT=str(self.shard_count))
+        self.process = await asyncio.create_subprocess_exec(sys.executable, MAIN, cwd=ROOT, env=env)
+        self.started_at = time.monotonic()
+        logger.info(f"Cluster {self.cluster_id} started (pid {self.process.pid}, shards {self.shard_ids})")
+
+    async def _supervise(self):
+        backoff = 1.0
+        while not self._stopping:
+            await self._spawn()
+            code = await self.process.wait()
+            if self._stopping:
+                break
+            if self._restart_requested:
+                self._restart_requested = False
+                backoff = 1.0
+            else:
+                if time.monotonic() - self.started_at > STABLE_AFTER:
+                    backoff = 1.0
+                logger.warning(f"Cluster {self.cluster_id} exited with code {code}; restarting in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+            self.restarts += 1
+        logger.info(f"Cluster {self.cluster_id} stopped.")
+
+    def _interrupt(self):
+        # SIGINT lets discord.py close the bot and unload cogs, which flushes their stores
+        if self.process is None or self.process.returncode is not None:
+            return
+        try:
+            if sys.platform == "win32":
+                self.process.terminate()
+            else:
+                self.process.send_signal(signal.SIGINT)
+        except ProcessLookupError:
+            pass
+
+    async def _wait_or_kill(self, timeout):
+        try:
+            await asyncio.wait_for(asyncio.shield(self.process.wait()), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Cluster {self.cluster_id} did not exit in {timeout:.0f}s; killing it")
+            self.process.kill()
+            await self.process.wait()
+
+    async def restart(self, timeout=30.0):
+        """Stop this cluster's process; the supervisor starts a fresh one immediately."""
+        if self.process is None or self.process.returncode is not None:
+            return
+        self._restart_requested = True
+        self._interrupt()
+        await self._wait_or_kill(timeout)
+
+    async def stop(self, timeout=30.0):
+        self._stopping = True
+        if self.process is not None and self.process.returncode is None:
+            self._interrupt()
+            await self._wait_or_kill(timeout)
+        if self._task is not None:
+            await self._task
+
+
+async def recommended_shards(token, api_base):
+    """Ask Discord how many shards the bot should run."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{api_base}/gateway/bot", headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+async def run(args):
+    env = {"IPC_PORT": str(args.ipc_port)}
+    fake = None
+    if args.fake_gateway:
+        from utils.fake_gateway import FakeGateway, FakeGuildData
+        fake = FakeGateway(FakeGuildData(args.fake_guilds, args.fake_members), port=args.fake_port,
+                           shard_count=args.shards or 2)
+        await fake.start()
+        env.update(DISCORD_API_BASE=fake.api_base, DISCORD_GATEWAY_URL=fake.gateway_url)
+        env.setdefault("BOT_TOKEN", os.getenv("BOT_TOKEN") or "fake-token")
+
+    shard_count = args.shards
+    if not shard_count:
+        api_base = env.get("DISCORD_API_BASE") or os.getenv("DISCORD_API_BASE") or "https://discord.com/api/v10"
+        shard_count = await recommended_shards(env.get("BOT_TOKEN") or os.getenv("BOT_TOKEN"), api_base)
+        logger.info(f"Discord recommends {shard_count} shard(s).")
+
+    hub = IPCHub(port=args.ipc_port)
+    ranges = shard_ranges(shard_count, args.clusters)
+    clusters = {}
+    for cluster_id, shard_ids in enumerate(ranges):
+        cluster_env = dict(env)
+        # Each cluster serves its own metrics port, counting up from METRICS_PORT
+        metrics_port = int(os.getenv("METRICS_PORT", "9108"))
+        cluster_env["METRICS_PORT"] = str(metrics_port + cluster_id if metrics_port else 0)
+        clusters[cluster_id] = ClusterProcess(cluster_id, shard_ids, shard_count, cluster_env)
+
+    @hub.handler("status")
+    async def status(data):
+        return {str(cluster_id): cluster.status() for cluster_id, cluster in clusters.items()}
+
+    @hub.handler("restart")
+    async def restart(data):
+        cluster = clusters.get((data or {}).get("cluster_id"))
+        if cluster is None:
+            return {"error": "No such cluster."}
+        asyncio.create_task(cluster.restart())
+        return {"restarting": cluster.cluster_id}
+
+    await hub.start()
+    stop = asyncio.Event()
+    if sys.platform != "win32":
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+
+    logger.info(f"Launching {len(clusters)} cluster(s) for {shard_count} shard(s): {ranges}")
+    for cluster_id, cluster in clusters.items():
+        cluster.start()
+        # Clusters don't share an identify queue, so give each one time to identify its shards
+        if cluster_id < len(clusters) - 1 and not fake:
+            try:
+                await asyncio.wait_for(stop.wait(), IDENTIFY_INTERVAL * len(cluster.shard_ids))
+            except asyncio.TimeoutError:
+                pass
+        if stop.is_set():
+            break
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Stopping clusters...")
+        await asyncio.gather(*(cluster.stop() for cluster in clusters.values()))
+        await hub.close()
+        if fake is not None:
+            await fake.close()
+
+
+def main():
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description="Run the bot as several shard clusters.")
+    parser.add_argument("--clusters", type=int, default=int(os.getenv("CLUSTERS", "2")))
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SHARDS", "0")),
+                        help="total shard count (default: Discord's recommendation)")
+    parser.add_argument("--ipc-port", type=int, default=int(os.getenv("IPC_PORT", DEFAULT_IPC_PORT)))
+    parser.add_argument("--fake-gateway", action="store_true", help="run against utils.fake_gateway")
+    parser.add_argument("--fake-port", type=int, default=8765)
+    parser.add_argument("--fake-guilds", type=int, default=50)
+    parser.add_argument("--fake-members", type=int, default=200)
+    setup_logging(filename="launcher.log")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
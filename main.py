@@ -1,20 +1,39 @@
+import time
+STARTED = time.perf_counter()  # Startup timing counts from here, before the heavy imports
+
 import discord
 from discord.ext import commands
+import asyncio
 import logging
 import os, dotenv
+import yarl
 from discord import app_commands
 
+from utils.log_pipeline import setup_logging
+from utils.member_cache import member_cache_options
+from utils.metrics import metrics
+from utils.rest_scheduler import INTERACTION, rest
+from utils.startup import StartupTimer, sync_tree_if_changed
+
 # Load environment variables
 dotenv.load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
-# Logging setup
-if not os.path.exists("logs"):
-    os.mkdir("logs")
-logging.basicConfig(
-    filename="logs/ticket_bot.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
+# Set by launcher.py when running as one cluster of several
+CLUSTER_ID = os.getenv("CLUSTER_ID")
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = os.getenv("SHARD_IDS")
+
+# Point the bot at utils.fake_gateway for local testing
+if os.getenv("DISCORD_API_BASE"):
+    discord.http.Route.BASE = os.getenv("DISCORD_API_BASE")
+if os.getenv("DISCORD_GATEWAY_URL"):
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(os.getenv("DISCORD_GATEWAY_URL"))
+
+# Logging setup: the one place logging is configured; records are written off the event loop
+setup_logging(
+    filename=f"ticket_bot-cluster{CLUSTER_ID}.log" if CLUSTER_ID else "ticket_bot.log",
+    audit_filename=f"moderation-cluster{CLUSTER_ID}.jsonl" if CLUSTER_ID else "moderation.jsonl",
 )
 
 intents = discord.Intents.default()
@@ -23,17 +42,64 @@ intents.message_content = True
 intents.guilds = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# MEMBER_CACHE=lean keeps member events but caches no members and skips startup chunking
+cache_options = member_cache_options()
+
+# Longer rate limit waits raise discord.RateLimited instead of holding a scheduler slot
+# (a channel rename can be told to wait ten minutes)
+MAX_RATELIMIT_TIMEOUT = 30.0
+
+if SHARD_COUNT:
+    # This process runs only its own range of the shards
+    bot = commands.AutoShardedBot(
+        command_prefix="!",
+        intents=intents,
+        shard_count=int(SHARD_COUNT),
+        shard_ids=[int(shard_id) for shard_id in SHARD_IDS.split(",")] if SHARD_IDS else None,
+        max_ratelimit_timeout=MAX_RATELIMIT_TIMEOUT,
+        **cache_options,
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, max_ratelimit_timeout=MAX_RATELIMIT_TIMEOUT, **cache_options)
+
+EXTENSIONS = ["cogs.Metrics", "cogs.Moderation", "cogs.Tickets", "cogs.Statistics"]
+if os.getenv("IPC_PORT"):
+    EXTENSIONS.append("cogs.Cluster")
+
+startup = StartupTimer(STARTED)
+
+async def setup_hook():
+    """Runs once after login and before connecting, unlike on_ready which fires again on every reconnect."""
+    startup.mark("login")
+    # The cogs don't depend on each other, so their stores load side by side
+    await asyncio.gather(*(bot.load_extension(extension) for extension in EXTENSIONS))
+    startup.mark("extensions")
+
+    # Commands are global, so one cluster syncing is enough
+    if CLUSTER_ID in (None, "0"):
+        try:
+            await sync_tree_if_changed(bot.tree)
+        except discord.HTTPException as e:
+            logging.error(f"Failed to sync the command tree: {e}")
+    startup.mark("tree sync")
+
+bot.setup_hook = setup_hook
+
+@bot.event
+async def on_connect():
+    # Dispatched when the first READY payload arrives
+    startup.mark("first READY")
 
 @bot.event
 async def on_ready():
+    # on_ready waits for every guild to arrive (and be chunked), so this phase is the cache fill
+    if not startup.mark("cache fill"):
+        return
     print(f"Logged in as {bot.user}")
+    logging.info(startup.report())
+    for phase, seconds in startup.phases.items():
+        metrics.set_gauge("startup_phase_seconds", round(seconds, 4), (("phase", phase),))
 
-    await bot.load_extension("cogs.Moderation")
-    await bot.load_extension("cogs.Tickets")
-    await bot.load_extension("cogs.Statistics")
-    await bot.tree.sync()
-    
 @bot.tree.command(name="sendembed", description="Send an embed to a specified channel (Admin only)")
 @app_commands.describe(channel="The channel to send the embed to", title="The title of the embed", description="The description of the embed")
 async def send_embed(interaction: discord.Interaction, channel: discord.TextChannel, title: str, description: str):
@@ -52,10 +118,14 @@ async def send_embed(interaction: discord.Interaction, channel: discord.TextChan
     embed = discord.Embed(title=title, description=description, color=discord.Color.blue())
     embed.set_footer(text=f"Sent by {interaction.user}")
 
+    # Acknowledge first: the send is scheduled and may not finish within Discord's three seconds
+    await interaction.response.defer(ephemeral=True, thinking=True)
     try:
-        await channel.send(embed=embed)
-        await interaction.response.send_message(f"Embed sent to {channel.mention}!", ephemeral=True)
+        await rest.run(INTERACTION, lambda: channel.send(embed=embed), guild_id=interaction.guild_id)
+        await interaction.followup.send(f"Embed sent to {channel.mention}!", ephemeral=True)
     except Exception as e:
-        await interaction.response.send_message(f"Failed to send embed: {e}", ephemeral=True)
+        await interaction.followup.send(f"Failed to send embed: {e}", ephemeral=True)
 
-bot.run(BOT_TOKEN)
+startup.mark("imports")
+# Logging is already set up; don't let discord.py add its own handler on top
+bot.run(BOT_TOKEN, log_handler=None)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+
+from utils.write_behind import WriteBehind, connect
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    actor_id INTEGER,
+    actor TEXT,
+    target_id INTEGER,
+    target TEXT,
+    reason TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_actions_guild_target ON actions (guild_id, target_id);
+CREATE INDEX IF NOT EXISTS idx_actions_guild_actor ON actions (guild_id, actor_id);
+CREATE INDEX IF NOT EXISTS idx_actions_guild_time ON actions (guild_id, created_at, actor_id, action);
+"""
+
+COLUMNS = ("guild_id", "action", "actor_id", "actor", "target_id", "target", "reason", "created_at")
+
+
+class AuditEntry:
+    """One moderation action as stored in the audit index."""
+
+    __slots__ = ("id",) + COLUMNS
+
+    def __init__(self, id, guild_id, action, actor_id, actor, target_id, target, reason, created_at):
+        self.id = id
+        self.guild_id = guild_id
+        self.action = action
+        self.actor_id = actor_id
+        self.actor = actor
+        self.target_id = target_id
+        self.target = target
+        self.reason = reason
+        self.created_at = created_at
+
+
+class AuditStore(WriteBehind):
+    """Every moderation action in SQLite, indexed for per-user and per-moderator history.
+
+    ``record`` only queues the row; a background task writes queued rows in one
+    transaction every ``flush_interval`` seconds or once ``flush_threshold`` are waiting,
+    so a mass ban of a few thousand accounts costs a handful of writes. Queries flush
+    first so they always see actions that were just recorded.
+
+    History is paged by id (newest first) rather than by offset, so every page is an index
+    range scan however deep it is. The (guild_id, target_id) and (guild_id, actor_id)
+    indexes end in the rowid, which makes them ordered by id within a target or actor.
+    """
+
+    def __init__(self, path, flush_interval=1.0, flush_threshold=500):
+        super().__init__(flush_interval)
+        self.path = path
+        self.flush_threshold = flush_threshold
+        self._pending = []
+        self._db = None
+        self._db_lock = asyncio.Lock()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def load_sync(self):
+        if self._db is None:
+            self._db = connect(self.path, SCHEMA)
+
+    async def load(self):
+        await asyncio.to_thread(self.load_sync)
+        self.start()
+
+    async def close(self):
+        await self.stop()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # -- writes ------------------------------------------------------------
+
+    def record(self, guild_id, action, actor=None, target=None, reason=None, created_at=None):
+        """Queue an action. ``actor`` and ``target`` may be users, plain ids or display strings."""
+        self._pending.append((
+            guild_id, action,
+            _id_of(actor), str(actor) if actor is not None else None,
+            _id_of(target), str(target) if target is not None else None,
+            reason, time.time() if created_at is None else created_at,
+        ))
+        if len(self._pending) >= self.flush_threshold:
+            self.request_flush()
+
+    def record_many(self, guild_id, action, actor, targets, reason=None):
+        """Queue the same action against many targets, e.g. every account a mass ban removed."""
+        now = time.time()
+        for target in targets:
+            self.record(guild_id, action, actor, target, reason, now)
+
+    def _write(self, rows):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._db:
+            self._db.executemany(f"INSERT INTO actions ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows)
+
+    async def flush(self):
+        """Write every queued action in a single transaction."""
+        if not self._pending or self._db is None:
+            return 0
+        rows, self._pending = self._pending, []
+        async with self._db_lock:
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except Exception as e:
+                self._pending[:0] = rows
+                logger.error(f"Failed to persist {len(rows)} moderation action(s): {e}")
+                return 0
+        return len(rows)
+
+    # -- queries -----------------------------------------------------------
+
+    def _history(self, guild_id, target_id, actor_id, since, before, limit):
+        clauses = ["guild_id = ?"]
+        params = [guild_id]
+        if target_id is not None:
+            clauses.append("target_id = ?")
+            params.append(target_id)
+        if actor_id is not None:
+            clauses.append("actor_id = ?")
+            params.append(actor_id)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        params.append(limit)
+        rows = self._db.execute(
+            f"SELECT id, {', '.join(COLUMNS)} FROM actions WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?",
+            params,
+        ).fetchall()
+        return [AuditEntry(*row) for row in rows]
+
+    async def history(self, guild_id, target_id=None, actor_id=None, since=None, before=None, limit=10):
+        """Actions in a guild, newest first, optionally only against a target or by an actor.
+
+        Pass the smallest ``id`` of one page as ``before`` to get the next one.
+        """
+        await self.flush()
+        async with self._db_lock:
+            return await asyncio.to_thread(self._history, guild_id, target_id, actor_id, since, before, limit)
+
+    def _stats(self, guild_id, since, actor_id):
+        # Only indexed columns, so this is answered from idx_actions_guild_time without touching the table
+        query = "SELECT actor_id, action, COUNT(*) FROM actions WHERE guild_id = ? AND created_at >= ?"
+        params = [guild_id, since]
+        if actor_id is not None:
+            query += " AND actor_id = ?"
+            params.append(actor_id)
+        query += " GROUP BY actor_id, action"
+        stats = {}
+        for actor_id, action, count in self._db.execute(query, params):
+            stats.setdefault(actor_id, {})[action] = count
+        return stats
+
+    async def stats(self, guild_id, since, actor_id=None):
+        """Action counts per moderator since a timestamp: ``{actor_id: {action: count}}``."""
+        await self.flush()
+        async with self._db_lock:
+            return await asyncio.to_thread(self._stats, guild_id, since, actor_id)
+
+
+def _id_of(value):
+    if isinstance(value, int):
+        return value
+    return getattr(value, "id", None)
@@ -0,0 +1,202 @@
+import asyncio
+import datetime
+import logging
+import re
+import shlex
+import time
+
+import discord
+
+from utils.metrics import metrics
+from utils.rest_scheduler import MODERATION, rest
+
+logger = logging.getLogger(__name__)
+
+BULK_BAN_CHUNK = 200  # Discord's limit for a single bulk-ban request
+ID_PATTERN = re.compile(r"\d{15,20}")
+DURATION_PATTERN = re.compile(r"^(\d+)([smhd]?)$")
+DURATION_UNITS = {"": 60, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text):
+    """Parse '90', '15m', '2h' or '1d' into seconds (a bare number means minutes)."""
+    match = DURATION_PATTERN.match(text.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {text}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+class BulkRequest:
+    """Targets and options parsed from a bulk moderation command."""
+
+    __slots__ = ("ids", "joined_within", "name_pattern", "dry_run", "reason")
+
+    def __init__(self):
+        self.ids = set()
+        self.joined_within = None
+        self.name_pattern = None
+        self.dry_run = False
+        self.reason = None
+
+    @property
+    def has_filters(self):
+        return self.joined_within is not None or self.name_pattern is not None
+
+    @classmethod
+    def parse(cls, text):
+        """Parse ``<ids/mentions> [--joined 10m] [--regex pattern] [--dry-run] [--reason text]``."""
+        request = cls()
+        tokens = shlex.split(text or "")
+        position = 0
+        while position < len(tokens):
+            token = tokens[position]
+            if token == "--dry-run":
+                request.dry_run = True
+            elif token == "--joined" and position + 1 < len(tokens):
+                position += 1
+                request.joined_within = parse_duration(tokens[position])
+            elif token == "--regex" and position + 1 < len(tokens):
+                position += 1
+                try:
+                    request.name_pattern = re.compile(tokens[position], re.IGNORECASE)
+                except re.error as e:
+                    raise ValueError(f"Invalid regex: {e}") from e
+            elif token == "--reason":
+                request.reason = " ".join(tokens[position + 1:]) or None
+                break
+            else:
+                request.ids.update(int(match) for match in ID_PATTERN.findall(token))
+            position += 1
+        return request
+
+    def add_ids_from_text(self, text):
+        """Add every snowflake found in ``text``, e.g. the contents of an uploaded id list."""
+        self.ids.update(int(match) for match in ID_PATTERN.findall(text))
+
+
+def resolve_targets(guild, request, moderator, members=None, candidates=None):
+    """Turn a BulkRequest into the list of users to act on.
+
+    ``members`` maps explicit ids to fetched members (see utils.member_cache.get_members);
+    ids that aren't members are kept as plain objects, which is useful for banning
+    accounts that already left. Filters select from ``candidates``, which defaults to the
+    member cache. The bot, the guild owner, the moderator and anyone at or above the
+    moderator's top role are never targeted.
+    """
+    members = members or {}
+    targets = {}
+    for user_id in request.ids:
+        targets[user_id] = members.get(user_id) or guild.get_member(user_id) or discord.Object(id=user_id)
+
+    if request.has_filters:
+        cutoff = None
+        if request.joined_within is not None:
+            cutoff = discord.utils.utcnow() - datetime.timedelta(seconds=request.joined_within)
+        for member in guild.members if candidates is None else candidates:
+            if cutoff is not None and (member.joined_at is None or member.joined_at < cutoff):
+                continue
+            if request.name_pattern is not None and not (
+                request.name_pattern.search(member.name) or request.name_pattern.search(member.display_name)
+            ):
+                continue
+            targets[member.id] = member
+
+    protected = {guild.owner_id, guild.me.id, moderator.id}
+    resolved = []
+    for user_id, target in targets.items():
+        if user_id in protected:
+            continue
+        if isinstance(target, discord.Member) and moderator.id != guild.owner_id and target.top_role >= moderator.top_role:
+            continue
+        resolved.append(target)
+    return resolved
+
+
+class BulkRunner:
+    """Runs one moderation action over many targets and reports progress in a single message."""
+
+    def __init__(self, action, total, concurrency=5, status_interval=3.0, guild_id=None):
+        self.action = action
+        self.total = total
+        self.guild_id = guild_id  # Lets the REST scheduler cancel the run if the bot leaves the guild
+        self.concurrency = concurrency
+        self.status_interval = status_interval
+        self.succeeded = 0
+        self.failed = 0
+        self.done = []  # Targets the action succeeded for
+        self.started_at = None
+        self.finished_at = None
+        self._rate_limits_at_start = 0
+        self._rate_limits_at_end = None
+
+    @property
+    def processed(self):
+        return self.succeeded + self.failed
+
+    @property
+    def rate_limits(self):
+        """429s discord.py retried between the start and end of this run."""
+        end = self._rate_limits_at_end
+        if end is None:
+            end = metrics.total("discord_rest_ratelimits_total")
+        return end - self._rate_limits_at_start
+
+    def report(self):
+        elapsed = max((self.finished_at or time.monotonic()) - self.started_at, 1e-6)
+        state = "Finished" if self.finished_at else "Running"
+        return (f"{state} {self.action}: {self.succeeded}/{self.total} succeeded, {self.failed} failed "
+                f"in {elapsed:.1f}s ({self.processed / elapsed:.1f} actions/sec, {self.rate_limits} rate limits hit)")
+
+    async def _report_progress(self, status):
+        while True:
+            await asyncio.sleep(self.status_interval)
+            try:
+                await status.edit(content=self.report())
+            except discord.HTTPException:
+                pass
+
+    async def run(self, status, work):
+        """Await ``work`` (a coroutine that updates the counters) while keeping ``status`` current."""
+        self.started_at = time.monotonic()
+        self._rate_limits_at_start = metrics.total("discord_rest_ratelimits_total")
+        reporter = asyncio.create_task(self._report_progress(status))
+        try:
+            await work
+        finally:
+            self.finished_at = time.monotonic()
+            self._rate_limits_at_end = metrics.total("discord_rest_ratelimits_total")
+            reporter.cancel()
+            try:
+                await status.edit(content=self.report())
+            except discord.HTTPException:
+                pass
+        logger.info(self.report())
+
+    async def each(self, targets, action):
+        """Apply ``action`` to every target with at most ``concurrency`` requests in flight."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(target):
+            async with semaphore:
+                try:
+                    await rest.run(MODERATION, lambda: action(target), guild_id=self.guild_id)
+                    self.succeeded += 1
+                    self.done.append(target)
+                except (discord.HTTPException, discord.RateLimited) as e:
+                    self.failed += 1
+                    logger.error(f"Bulk {self.action} failed for {target.id}: {e}")
+
+        await asyncio.gather(*(run_one(target) for target in targets))
+
+    async def bulk_ban(self, guild, targets, reason):
+        """Ban targets through the bulk-ban endpoint, up to 200 per request."""
+        for start in range(0, len(targets), BULK_BAN_CHUNK):
+            chunk = targets[start:start + BULK_BAN_CHUNK]
+            try:
+                result = await rest.run(MODERATION, lambda: guild.bulk_ban(chunk, reason=reason), guild_id=guild.id)
+                self.succeeded += len(result.banned)
+                self.done.extend(result.banned)
+                self.failed += len(result.failed)
+            except (discord.HTTPException, discord.RateLimited) as e:
+                self.failed += len(chunk)
+                logger.error(f"Bulk ban request for {len(chunk)} users failed: {e}")
@@ -0,0 +1,290 @@
+"""Cluster helpers: shard ranges and a small local IPC channel between bot processes.
+
+The launcher runs an ``IPCHub`` on localhost and every cluster connects to it with an
+``IPCClient``. Messages are newline-delimited JSON. A request is fanned out by the hub to
+the clusters it targets, and their answers come back as one ``{cluster_id: result}``
+mapping; clusters that are down or too slow are simply missing from it. Clients
+reconnect on their own, so restarting the hub or a cluster never takes the others down.
+
+Query a running launcher from a shell with:
+
+    python -m utils.cluster stats [--port 7700]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IPC_PORT = 7700
+LAUNCHER = "launcher"
+
+
+def shard_ranges(shard_count, cluster_count):
+    """Split shard ids 0..shard_count-1 into ``cluster_count`` contiguous, near-equal ranges."""
+    cluster_count = max(1, min(cluster_count, shard_count))
+    base, extra = divmod(shard_count, cluster_count)
+    ranges = []
+    start = 0
+    for cluster_id in range(cluster_count):
+        size = base + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def shard_for_guild(guild_id, shard_count):
+    """The shard Discord routes a guild to."""
+    return (guild_id >> 22) % shard_count
+
+
+def owns_guild(bot, guild_id):
+    """Whether this process's shards include the guild (always true without sharding)."""
+    shard_count = getattr(bot, "shard_count", None)
+    shard_ids = getattr(bot, "shard_ids", None)
+    if not shard_count or shard_ids is None:
+        return True
+    return shard_for_guild(guild_id, shard_count) in shard_ids
+
+
+async def _send(writer, message):
+    writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+class IPCHub:
+    """Routes requests between connected clusters. Runs inside the launcher."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_IPC_PORT):
+        self.host = host
+        self.port = port
+        self._clusters = {}  # cluster_id -> writer
+        self._pending = {}  # hub nonce -> future
+        self._nonces = itertools.count()
+        self._handlers = {}  # requests answered by the launcher itself
+        self._server = None
+
+    @property
+    def connected(self):
+        return sorted(self._clusters)
+
+    def handler(self, name):
+        """Decorator registering a coroutine that answers requests targeted at the launcher."""
+        def decorator(func):
+            self._handlers[name] = func
+            return func
+        return decorator
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=2 ** 22)
+        logger.info(f"IPC hub listening on {self.host}:{self.port}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clusters.values()):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        cluster_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message.get("op")
+                if op == "identify":
+                    cluster_id = message.get("cluster_id")
+                    if cluster_id is not None:
+                        previous = self._clusters.get(cluster_id)
+                        if previous is not None and previous is not writer:
+                            previous.close()
+                        self._clusters[cluster_id] = writer
+                        logger.info(f"Cluster {cluster_id} connected to IPC.")
+                elif op == "response":
+                    future = self._pending.get(message.get("nonce"))
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                elif op == "request":
+                    asyncio.create_task(self._route(writer, message))
+        except (ConnectionError, json.JSONDecodeError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"IPC connection from cluster {cluster_id} dropped: {e}")
+        finally:
+            if cluster_id is not None and self._clusters.get(cluster_id) is writer:
+                del self._clusters[cluster_id]
+                logger.info(f"Cluster {cluster_id} disconnected from IPC.")
+            writer.close()
+
+    async def _ask(self, cluster_id, name, data, timeout):
+        writer = self._clusters.get(cluster_id)
+        if writer is None:
+            return None
+        nonce = next(self._nonces)
+        future = self._pending[nonce] = asyncio.get_running_loop().create_future()
+        try:
+            await _send(writer, {"op": "request", "nonce": nonce, "name": name, "data": data})
+            reply = await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            return None
+        finally:
+            self._pending.pop(nonce, None)
+        if "error" in reply:
+            return {"error": reply["error"]}
+        return reply.get("data")
+
+    async def request(self, name, data=None, target=None, timeout=5.0):
+        """Ask one cluster (``target``) or all of them; returns ``{cluster_id: result}``."""
+        if target == LAUNCHER:
+            handler = self._handlers.get(name)
+            if handler is None:
+                return {LAUNCHER: {"error": f"Unknown launcher request {name}"}}
+            return {LAUNCHER: await handler(data)}
+        targets = [target] if target is not None else list(self._clusters)
+        results = await asyncio.gather(*(self._ask(cluster_id, name, data, timeout) for cluster_id in targets))
+        return {str(cluster_id): result for cluster_id, result in zip(targets, results) if result is not None}
+
+    async def _route(self, writer, message):
+        try:
+            results = await self.request(message.get("name"), message.get("data"),
+                                         message.get("target"), message.get("timeout", 5.0))
+            reply = {"op": "response", "nonce": message.get("nonce"), "data": results}
+        except Exception as e:
+            reply = {"op": "response", "nonce": message.get("nonce"), "error": str(e)}
+        try:
+            await _send(writer, reply)
+        except ConnectionError:
+            pass
+
+
+class IPCClient:
+    """A cluster's (or a tool's) connection to the launcher's IPC hub."""
+
+    def __init__(self, cluster_id=None, host="127.0.0.1", port=DEFAULT_IPC_PORT):
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self._handlers = {}
+        self._pending = {}
+        self._nonces = itertools.count()
+        self._writer = None
+        self._connected = asyncio.Event()
+        self._task = None
+        self._closing = False
+
+    def handler(self, name):
+        """Decorator registering a coroutine ``func(data)`` that answers requests named ``name``."""
+        def decorator(func):
+            self._handlers[name] = func
+            return func
+        return decorator
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        self._closing = True
+        if self._writer is not None:
+            self._writer.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait_connected(self, timeout=None):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def _run(self):
+        delay = 1.0
+        while not self._closing:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port, limit=2 ** 22)
+            except OSError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+
+            delay = 1.0
+            self._writer = writer
+            try:
+                await _send(writer, {"op": "identify", "cluster_id": self.cluster_id})
+                self._connected.set()
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    if message.get("op") == "request":
+                        asyncio.create_task(self._answer(writer, message))
+                    elif message.get("op") == "response":
+                        future = self._pending.get(message.get("nonce"))
+                        if future is not None and not future.done():
+                            future.set_result(message)
+            except (ConnectionError, json.JSONDecodeError) as e:
+                logger.warning(f"Lost IPC connection: {e}")
+            finally:
+                self._connected.clear()
+                self._writer = None
+                writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("IPC connection lost"))
+            if not self._closing:
+                await asyncio.sleep(delay)
+
+    async def _answer(self, writer, message):
+        handler = self._handlers.get(message.get("name"))
+        reply = {"op": "response", "nonce": message.get("nonce")}
+        if handler is None:
+            reply["error"] = f"Unknown request {message.get('name')}"
+        else:
+            try:
+                reply["data"] = await handler(message.get("data"))
+            except Exception as e:
+                logger.error(f"IPC handler {message.get('name')} failed: {e}")
+                reply["error"] = str(e)
+        try:
+            await _send(writer, reply)
+        except ConnectionError:
+            pass
+
+    async def request(self, name, data=None, target=None, timeout=5.0):
+        """Send a request through the hub; returns ``{cluster_id: result}`` (keys are strings)."""
+        if self._writer is None:
+            raise ConnectionError("Not connected to the IPC hub")
+        nonce = next(self._nonces)
+        future = self._pending[nonce] = asyncio.get_running_loop().create_future()
+        try:
+            await _send(self._writer, {"op": "request", "nonce": nonce, "name": name, "data": data,
+                                       "target": target, "timeout": timeout})
+            reply = await asyncio.wait_for(future, timeout + 1.0)
+        finally:
+            self._pending.pop(nonce, None)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["data"]
+
+
+async def _query(args):
+    client = IPCClient(port=args.port)
+    client.start()
+    try:
+        await client.wait_connected(timeout=5)
+        target = LAUNCHER if args.name == "status" else None
+        results = await client.request(args.name, target=target)
+        print(json.dumps(results, indent=2, sort_keys=True))
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a running cluster launcher over IPC.")
+    parser.add_argument("name", help="request name, e.g. stats, ping or status (launcher)")
+    parser.add_argument("--port", type=int, default=DEFAULT_IPC_PORT)
+    asyncio.run(_query(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
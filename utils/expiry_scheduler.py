@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+
+from utils.write_behind import connect
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expirations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    target_id INTEGER NOT NULL,
+    due_at REAL NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_expirations_target ON expirations (kind, guild_id, target_id);
+CREATE INDEX IF NOT EXISTS idx_expirations_due ON expirations (due_at);
+"""
+
+RETRY_BASE = 30.0  # Seconds before the first retry of a failed expiration; doubles each attempt
+RETRY_MAX = 3600.0
+MAX_ATTEMPTS = 10
+
+
+class Expiration:
+    """Something that has to happen to a target at a given time, e.g. an unmute."""
+
+    __slots__ = ("id", "kind", "guild_id", "target_id", "due_at", "payload", "attempts")
+
+    def __init__(self, id, kind, guild_id, target_id, due_at, payload=None, attempts=0):
+        self.id = id
+        self.kind = kind
+        self.guild_id = guild_id
+        self.target_id = target_id
+        self.due_at = due_at
+        self.payload = payload or {}
+        self.attempts = attempts  # Failed runs so far
+
+    @property
+    def key(self):
+        return (self.kind, self.guild_id, self.target_id)
+
+
+class ExpiryScheduler:
+    """Persistent timers for timed punishments and other delayed actions.
+
+    Pending expirations live in SQLite and in a min-heap ordered by deadline. A single
+    task sleeps until the nearest deadline and then runs every expiration that is due in
+    one batch, so thousands of pending unmutes cost one sleeping task rather than one
+    parked coroutine each. Handlers are registered per ``kind``; an expiration whose kind
+    has no handler is kept until one is registered. A handler that raises is retried with
+    exponential backoff, up to ``MAX_ATTEMPTS`` runs, rather than being dropped.
+
+    ``owns`` is an optional predicate on guild ids. When several clusters share the
+    database, each only loads the expirations of its own guilds and leaves the rest to
+    the cluster that owns them.
+    """
+
+    def __init__(self, path, wait_until_ready=None, owns=None):
+        self.path = path
+        self.wait_until_ready = wait_until_ready
+        self.owns = owns
+        self._handlers = {}
+        self._heap = []
+        self._entries = {}  # id -> Expiration
+        self._by_key = {}  # (kind, guild_id, target_id) -> id
+        self._db = None
+        self._db_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+
+    def register(self, kind, handler):
+        """Register the coroutine function that runs when an expiration of ``kind`` is due."""
+        self._handlers[kind] = handler
+        # Entries of this kind that came due before it had a handler were dropped from the heap
+        for entry in self._entries.values():
+            if entry.kind == kind:
+                heapq.heappush(self._heap, (entry.due_at, entry.id))
+        self._wakeup.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, kind, guild_id, target_id):
+        entry_id = self._by_key.get((kind, guild_id, target_id))
+        return self._entries.get(entry_id) if entry_id is not None else None
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def _connect(self):
+        db = connect(self.path, SCHEMA)
+        # Databases created before retries were tracked lack the column
+        if "attempts" not in {row[1] for row in db.execute("PRAGMA table_info(expirations)")}:
+            db.execute("ALTER TABLE expirations ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            db.commit()
+        return db
+
+    def _load_sync(self):
+        self._db = self._connect()
+        return self._db.execute(
+            "SELECT id, kind, guild_id, target_id, due_at, payload, attempts FROM expirations"
+        ).fetchall()
+
+    async def load(self):
+        """Reload pending expirations from disk and start the timer."""
+        rows = await asyncio.to_thread(self._load_sync)
+        if self.owns is not None:
+            rows = [row for row in rows if self.owns(row[2])]
+        for entry_id, kind, guild_id, target_id, due_at, payload, attempts in rows:
+            entry = Expiration(entry_id, kind, guild_id, target_id, due_at, json.loads(payload), attempts)
+            self._track(entry)
+            self._heap.append((entry.due_at, entry.id))
+        heapq.heapify(self._heap)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        logger.info(f"Loaded {len(rows)} pending expiration(s) from {self.path}.")
+        return len(rows)
+
+    async def close(self):
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._closing = False
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # -- scheduling --------------------------------------------------------
+
+    def _track(self, entry):
+        self._entries[entry.id] = entry
+        self._by_key[entry.key] = entry.id
+
+    def _untrack(self, entry_id):
+        # The heap entry is left behind and skipped when it surfaces
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None and self._by_key.get(entry.key) == entry_id:
+            del self._by_key[entry.key]
+        return entry
+
+    def _insert(self, kind, guild_id, target_id, due_at, payload):
+        with self._db:
+            cursor = self._db.execute(
+                "INSERT OR REPLACE INTO expirations (kind, guild_id, target_id, due_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (kind, guild_id, target_id, due_at, payload),
+            )
+        return cursor.lastrowid
+
+    def _retry(self, entries):
+        with self._db:
+            self._db.executemany(
+                "UPDATE expirations SET due_at = ?, attempts = ? WHERE id = ?",
+                [(entry.due_at, entry.attempts, entry.id) for entry in entries],
+            )
+
+    def _delete(self, entry_ids):
+        with self._db:
+            self._db.executemany("DELETE FROM expirations WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+
+    async def schedule(self, kind, guild_id, target_id, due_at, payload=None):
+        """Schedule (or reschedule) an expiration; a target has at most one pending per kind."""
+        payload = payload or {}
+        async with self._db_lock:
+            entry_id = await asyncio.to_thread(
+                self._insert, kind, guild_id, target_id, due_at, json.dumps(payload)
+            )
+
+        previous = self._by_key.get((kind, guild_id, target_id))
+        if previous is not None:
+            self._untrack(previous)
+        entry = Expiration(entry_id, kind, guild_id, target_id, due_at, payload)
+        self._track(entry)
+        heapq.heappush(self._heap, (entry.due_at, entry.id))
+
+        # Only the timer needs to know if this is now the nearest deadline
+        if self._heap[0][1] == entry_id:
+            self._wakeup.set()
+        return entry
+
+    async def schedule_in(self, kind, guild_id, target_id, seconds, payload=None):
+        return await self.schedule(kind, guild_id, target_id, time.time() + seconds, payload)
+
+    async def cancel(self, kind, guild_id, target_id):
+        """Drop a pending expiration. Returns the cancelled entry, if there was one."""
+        entry_id = self._by_key.get((kind, guild_id, target_id))
+        if entry_id is None:
+            return None
+        entry = self._untrack(entry_id)
+        async with self._db_lock:
+            await asyncio.to_thread(self._delete, [entry_id])
+        return entry
+
+    # -- timer -------------------------------------------------------------
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, entry_id = heapq.heappop(self._heap)
+            entry = self._entries.get(entry_id)
+            if entry is None or entry.kind not in self._handlers:
+                continue
+            self._untrack(entry_id)
+            due.append(entry)
+        return due
+
+    async def _expire(self, entry):
+        """Run an expiration's handler. Returns False if it failed and should be tried again."""
+        try:
+            await self._handlers[entry.kind](entry)
+            return True
+        except Exception as e:
+            entry.attempts += 1
+            if entry.attempts >= MAX_ATTEMPTS:
+                logger.error(f"Giving up on {entry.kind} expiration for {entry.target_id} in {entry.guild_id} "
+                             f"after {entry.attempts} attempts: {e}")
+                return True
+            logger.error(f"Error running {entry.kind} expiration for {entry.target_id} in {entry.guild_id} "
+                         f"(attempt {entry.attempts}, retrying): {e}")
+            return False
+
+    def _requeue(self, entries, now):
+        """Put failed expirations back on the timer, unless they were rescheduled meanwhile."""
+        requeued = []
+        for entry in entries:
+            if entry.key in self._by_key:
+                continue
+            entry.due_at = now + min(RETRY_BASE * 2 ** (entry.attempts - 1), RETRY_MAX)
+            self._track(entry)
+            heapq.heappush(self._heap, (entry.due_at, entry.id))
+            requeued.append(entry)
+        return requeued
+
+    async def _run(self):
+        if self.wait_until_ready is not None:
+            await self.wait_until_ready()
+
+        while not self._closing:
+            self._wakeup.clear()
+            due = self._pop_due(time.time())
+            if due:
+                results = await asyncio.gather(*(self._expire(entry) for entry in due))
+                done = [entry for entry, ok in zip(due, results) if ok]
+                failed = self._requeue([entry for entry, ok in zip(due, results) if not ok], time.time())
+                async with self._db_lock:
+                    try:
+                        if done:
+                            await asyncio.to_thread(self._delete, [entry.id for entry in done])
+                        if failed:
+                            await asyncio.to_thread(self._retry, failed)
+                    except Exception as e:
+                        logger.error(f"Failed to update {len(due)} processed expiration(s): {e}")
+                continue
+
+            timeout = None
+            if self._heap:
+                timeout = max(self._heap[0][0] - time.time(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,635 @@
+"""A fake Discord gateway and REST API for running the bot offline.
+
+Speaks enough of the gateway protocol (HELLO, IDENTIFY, READY, GUILD_CREATE, heartbeats,
+RESUME and member chunk requests) and the REST endpoints used at login for a bot, or a
+whole cluster of them, to connect and serve synthetic guilds. Guilds are spread across
+shards exactly as Discord would, by ``(guild_id >> 22) % shard_count``.
+
+The REST endpoints the cogs call (channels, messages, roles, bans, kicks, timeouts and
+interaction responses) update the fake guilds and dispatch the gateway events Discord
+would send back, e.g. CHANNEL_CREATE after a channel is created. With a ``RateLimiter``
+every response carries Discord-style X-RateLimit headers and exhausted buckets answer
+429, so discord.py's rate limit handling runs as it would in production. ``dispatch``
+injects arbitrary events, which is how benchmarks/loadtest.py drives load into the bot.
+
+Point a bot at it with the ``DISCORD_API_BASE`` and ``DISCORD_GATEWAY_URL`` variables
+that main.py reads, or let ``launcher.py --fake-gateway`` do it. Standalone:
+
+    python -m utils.fake_gateway [--port 8765] [--guilds 50] [--members 200] [--channels 30] [--rate-limit-scale 1]
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import re
+import time
+
+from aiohttp import WSMsgType, web
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 41250
+DISCORD_EPOCH = 1420070400000
+BOT_USER_ID = 1000000000000000001
+APPLICATION_ID = BOT_USER_ID
+
+OP_DISPATCH = 0
+OP_HEARTBEAT = 1
+OP_IDENTIFY = 2
+OP_RESUME = 6
+OP_RECONNECT = 7
+OP_REQUEST_MEMBERS = 8
+OP_HELLO = 10
+OP_HEARTBEAT_ACK = 11
+
+
+def snowflake(sequence, when=None):
+    """Build a snowflake; the low bits vary with ``sequence`` so guilds spread across shards."""
+    when = when or datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    timestamp = int(when.timestamp() * 1000) - DISCORD_EPOCH
+    return ((timestamp + sequence) << 22) | (sequence & 0x3FFFFF)
+
+
+def user_payload(user_id, name, bot=False):
+    return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": None,
+            "avatar": None, "bot": bot, "public_flags": 0}
+
+
+def json_response(data, status=200, headers=None):
+    # discord.py only decodes bodies whose content-type is exactly application/json (no charset)
+    return web.Response(body=json.dumps(data).encode("utf-8"), status=status, headers=headers,
+                        content_type="application/json")
+
+
+def new_snowflake(sequence):
+    """A snowflake for an object created now, e.g. a message or an interaction."""
+    return ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (sequence & 0x3FFFFF)
+
+
+# Approximations of Discord's per-route limits as (method, path, limit, per seconds, applies to body).
+# The path's first group is the route's major parameter, which Discord keys buckets by.
+DISCORD_RATE_LIMITS = (
+    ("POST", r"/channels/(\d+)/messages", 5, 5.0, None),
+    ("PATCH", r"/channels/(\d+)/messages/\d+", 5, 5.0, None),
+    ("PATCH", r"/channels/(\d+)", 2, 600.0, lambda body: "name" in body),  # Renames, on top of the next rule
+    ("PATCH", r"/channels/(\d+)", 10, 10.0, None),
+    ("DELETE", r"/channels/(\d+)", 5, 5.0, None),
+    ("PUT", r"/channels/(\d+)/permissions/\d+", 10, 10.0, None),
+    ("POST", r"/guilds/(\d+)/channels", 10, 10.0, None),
+    ("POST", r"/guilds/(\d+)/roles", 10, 10.0, None),
+    ("PUT", r"/guilds/(\d+)/bans/\d+", 5, 1.0, None),
+    ("POST", r"/guilds/(\d+)/bulk-ban", 1, 5.0, None),
+    ("DELETE", r"/guilds/(\d+)/members/\d+", 5, 1.0, None),
+    ("PATCH", r"/guilds/(\d+)/members/\d+", 10, 10.0, None),
+    ("PUT", r"/guilds/(\d+)/members/\d+/roles/\d+", 10, 10.0, None),
+    ("DELETE", r"/guilds/(\d+)/members/\d+/roles/\d+", 10, 10.0, None),
+    ("POST", r"/webhooks/\d+/([^/]+)", 5, 2.0, None),  # Interaction followups, bucketed per token
+)
+GLOBAL_RATE_LIMIT = 50  # Requests per second across all routes, interaction responses excepted
+
+
+class RateLimiter:
+    """Fixed-window buckets that answer like Discord's: X-RateLimit headers and 429 bodies.
+
+    ``scale`` multiplies every window, so 0.1 makes a run ten times less rate limited
+    without changing the shape of the limits.
+    """
+
+    def __init__(self, rules=DISCORD_RATE_LIMITS, global_limit=GLOBAL_RATE_LIMIT, scale=1.0):
+        self.rules = [(method, re.compile(path), limit, per * scale, applies, f"fake{index:02d}")
+                      for index, (method, path, limit, per, applies) in enumerate(rules)]
+        self.global_limit = global_limit
+        self.global_per = scale
+        self._windows = {}  # (bucket, major) -> [reset_at, remaining]
+        self.limited = {}  # bucket -> 429s sent
+
+    def _take(self, key, limit, per, now):
+        window = self._windows.get(key)
+        if window is None or now >= window[0]:
+            window = self._windows[key] = [now + per, limit]
+        if window[1] <= 0:
+            return window, False
+        window[1] -= 1
+        return window, True
+
+    def check(self, method, path, body):
+        """Return ``(headers, retry_after)``; ``retry_after`` is None if the request may proceed."""
+        now = time.time()
+        if not path.startswith("/interactions/"):
+            window, allowed = self._take(("global", None), self.global_limit, self.global_per, now)
+            if not allowed:
+                self.limited["global"] = self.limited.get("global", 0) + 1
+                return {"X-RateLimit-Global": "true", "X-RateLimit-Scope": "global"}, window[0] - now
+
+        for rule_method, pattern, limit, per, applies, bucket in self.rules:
+            if rule_method != method:
+                continue
+            match = pattern.fullmatch(path)
+            if match is None or (applies is not None and not applies(body)):
+                continue
+            window, allowed = self._take((bucket, match.groups()), limit, per, now)
+            if applies is not None:
+                # Limits that apply to some bodies only are hidden: no headers, just a 429 once exceeded
+                if allowed:
+                    continue
+                self.limited[bucket] = self.limited.get(bucket, 0) + 1
+                return {"X-RateLimit-Scope": "shared"}, window[0] - now
+            headers = {
+                "X-RateLimit-Bucket": bucket,
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": str(window[1]),
+                "X-RateLimit-Reset": f"{window[0]:.3f}",
+                "X-RateLimit-Reset-After": f"{window[0] - now:.3f}",
+            }
+            if allowed:
+                return headers, None
+            self.limited[bucket] = self.limited.get(bucket, 0) + 1
+            headers["X-RateLimit-Scope"] = "user"
+            return headers, window[0] - now
+        return {}, None
+
+
+class FakeGuildData:
+    """Synthetic guilds with members, channels and roles, generated up front."""
+
+    def __init__(self, guild_count=50, members_per_guild=200, channels_per_guild=30):
+        # Guild ids come from their own sequence so consecutive guilds land on consecutive shards
+        self._guild_ids = itertools.count(1)
+        self._ids = itertools.count(1 << 20)
+        self.guilds = [self._guild(n, members_per_guild, channels_per_guild) for n in range(guild_count)]
+
+    def _next_id(self):
+        return snowflake(next(self._ids))
+
+    def _guild(self, n, member_count, channel_count):
+        guild_id = snowflake(next(self._guild_ids))
+        joined_at = "2024-01-01T00:00:00+00:00"
+        members = [{"user": user_payload(BOT_USER_ID, "Bot", bot=True), "roles": [], "joined_at": joined_at,
+                    "deaf": False, "mute": False, "flags": 0}]
+        for m in range(member_count - 1):
+            members.append({"user": user_payload(self._next_id(), f"user{n}-{m}", bot=m % 25 == 0),
+                            "roles": [], "joined_at": joined_at, "deaf": False, "mute": False, "flags": 0})
+
+        channels = []
+        category_id = None
+        for c in range(channel_count):
+            channel_id = self._next_id()
+            if c % 10 == 0:
+                category_id = channel_id
+                channels.append({"id": str(channel_id), "type": 4, "name": f"category-{c // 10}",
+                                 "position": c, "permission_overwrites": []})
+            else:
+                channels.append({"id": str(channel_id), "type": 0, "name": f"channel-{c}", "position": c,
+                                 "permission_overwrites": [], "parent_id": str(category_id), "nsfw": False,
+                                 "topic": None, "rate_limit_per_user": 0, "last_message_id": None})
+
+        roles = [{"id": str(guild_id), "name": "@everyone", "permissions": "1071698660929", "position": 0,
+                  "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0}]
+        return {
+            "id": str(guild_id), "name": f"Fake Guild {n}", "icon": None, "owner_id": members[-1]["user"]["id"],
+            "unavailable": False, "large": member_count > 250, "member_count": len(members),
+            "members": members, "channels": channels, "roles": roles, "threads": [], "emojis": [],
+            "stickers": [], "features": [], "presences": [], "voice_states": [], "stage_instances": [],
+            "guild_scheduled_events": [], "soundboard_sounds": [], "premium_tier": 0,
+            "verification_level": 0, "default_message_notifications": 0, "explicit_content_filter": 0,
+            "mfa_level": 0, "nsfw_level": 0, "system_channel_flags": 0, "preferred_locale": "en-US",
+            "joined_at": joined_at, "afk_timeout": 300, "premium_progress_bar_enabled": False,
+        }
+
+    def for_shard(self, shard_id, shard_count):
+        return [guild for guild in self.guilds if (int(guild["id"]) >> 22) % shard_count == shard_id]
+
+
+class FakeGateway:
+    """aiohttp app serving the fake REST API under /api/v10 and the gateway at /gateway."""
+
+    def __init__(self, data=None, host="127.0.0.1", port=8765, shard_count=1, strip_members=False, latency=0.02,
+                 rate_limiter=None, rest_latency=0.0):
+        self.data = data or FakeGuildData()
+        self.host = host
+        self.port = port
+        self.shard_count = shard_count
+        # Heartbeat ACK delay; an instant ACK can beat discord.py's heartbeat thread recording its send
+        self.latency = latency
+        # Send GUILD_CREATE without members, so clients that want them must chunk
+        self.strip_members = strip_members
+        self.rate_limiter = rate_limiter
+        self.rest_latency = rest_latency  # Simulated round trip added to every REST response
+        self.sessions = {}  # session_id -> (shard_id, shard_count)
+        self.identified = []  # (shard_id, shard_count) of every IDENTIFY received
+        self.requests = []  # (method, path) of every REST request received
+        self.listeners = []  # Called with (method, path, body) for each REST request that isn't rate limited
+        self._session_ids = itertools.count(1)
+        self._object_ids = itertools.count(1)
+        self._connections = {}  # shard_id -> (shard_count, dispatch) of connected shards
+        self._runner = None
+
+        self._guilds = {guild["id"]: guild for guild in self.data.guilds}
+        self._channels = {channel["id"]: guild for guild in self.data.guilds for channel in guild["channels"]}
+        self._members = {}  # guild_id -> {user_id: member}, built on first use
+        self._stale = set()  # Guilds whose member list needs rebuilding from _members after removals
+
+    @property
+    def api_base(self):
+        return f"http://{self.host}:{self.port}/api/v10"
+
+    @property
+    def gateway_url(self):
+        return f"ws://{self.host}:{self.port}/gateway"
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 2 ** 20)
+        app.router.add_get("/gateway", self.handle_gateway)
+        app.router.add_route("*", "/api/v10/{path:.*}", self.handle_rest)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Fake Discord listening on {self.api_base} with {len(self.data.guilds)} guild(s)")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # -- fake state --------------------------------------------------------
+
+    def next_id(self):
+        return new_snowflake(next(self._object_ids))
+
+    def guild(self, guild_id):
+        return self._guilds.get(str(guild_id))
+
+    def members(self, guild_id):
+        guild_id = str(guild_id)
+        members = self._members.get(guild_id)
+        if members is None:
+            members = self._members[guild_id] = {member["user"]["id"]: member for member in self._guilds[guild_id]["members"]}
+        return members
+
+    def member_list(self, guild):
+        """The guild's members; removals only update the index, so the list is rebuilt here."""
+        if guild["id"] in self._stale:
+            guild["members"] = list(self._members[guild["id"]].values())
+            self._stale.discard(guild["id"])
+        return guild["members"]
+
+    def member_payload(self, guild_id, user_id):
+        """A member as sent with messages and interactions, with their permissions resolved."""
+        guild = self.guild(guild_id)
+        member = self.members(guild_id)[str(user_id)]
+        permissions = "8" if member["user"]["id"] == guild["owner_id"] else guild["roles"][0]["permissions"]
+        return dict(member, permissions=permissions)
+
+    def message_payload(self, channel_id, author, content="", guild_id=None, **fields):
+        """A message from ``author`` (a user payload) as Discord would send it."""
+        payload = {
+            "id": str(self.next_id()), "channel_id": str(channel_id), "author": author, "content": content,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(), "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "type": 0, "flags": 0, "components": [],
+        }
+        if guild_id is not None:
+            payload["guild_id"] = str(guild_id)
+            member = self.members(guild_id).get(author["id"])
+            if member is not None:
+                payload["member"] = {key: value for key, value in member.items() if key != "user"}
+        payload.update(fields)
+        return payload
+
+    def component_interaction(self, guild_id, channel_id, user_id, custom_id, message=None):
+        """A button press by a member, on ``message`` or on a bot message holding just that button."""
+        if message is None:
+            button = {"type": 2, "style": 1, "label": "Button", "custom_id": custom_id}
+            message = self.message_payload(channel_id, user_payload(BOT_USER_ID, "Bot", bot=True), guild_id=guild_id,
+                                           components=[{"type": 1, "components": [button]}])
+        interaction_id = self.next_id()
+        return {
+            "id": str(interaction_id), "application_id": str(APPLICATION_ID), "type": 3, "version": 1,
+            "token": f"token-{interaction_id}", "guild_id": str(guild_id), "channel_id": str(channel_id),
+            "channel": {"id": str(channel_id), "type": 0}, "member": self.member_payload(guild_id, user_id),
+            "data": {"custom_id": custom_id, "component_type": 2}, "message": message,
+            "app_permissions": "1071698660929", "locale": "en-US", "guild_locale": "en-US",
+            "attachment_size_limit": 10 * 2 ** 20, "entitlements": [], "authorizing_integration_owners": {},
+            "context": 0,
+        }
+
+    # -- REST --------------------------------------------------------------
+
+    async def _body(self, request):
+        if not request.can_read_body:
+            return {}
+        if request.content_type.startswith("multipart/"):
+            # Uploads carry the JSON part as payload_json; the files themselves are discarded
+            form = await request.post()
+            return json.loads(form.get("payload_json") or "{}")
+        try:
+            return await request.json()
+        except ValueError:
+            return {}
+
+    async def handle_rest(self, request):
+        path = "/" + request.match_info["path"]
+        body = await self._body(request)
+        self.requests.append((request.method, path))
+
+        headers = {}
+        if self.rate_limiter is not None:
+            headers, retry_after = self.rate_limiter.check(request.method, path, body if isinstance(body, dict) else {})
+            if retry_after is not None:
+                headers["Retry-After"] = str(max(int(retry_after + 0.999), 1))
+                # discord.py takes a 429 without Via for a Cloudflare ban and gives up instead of retrying
+                headers["Via"] = "1.1 google"
+                return json_response({"message": "You are being rate limited.", "retry_after": round(retry_after, 3),
+                                      "global": headers.get("X-RateLimit-Global") == "true"}, 429, headers)
+        for listener in self.listeners:
+            listener(request.method, path, body)
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+        response = await self._route(request.method, path, body, request.query)
+        if response is None:
+            response = web.Response(status=204)
+        response.headers.update(headers)
+        return response
+
+    async def _route(self, method, path, body, query):
+        if method == "GET" and path == "/users/@me":
+            return json_response(user_payload(BOT_USER_ID, "Bot", bot=True))
+        if method == "GET" and path in ("/gateway", "/gateway/bot"):
+            return json_response({
+                "url": self.gateway_url, "shards": self.shard_count,
+                "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 16},
+            })
+        if method == "GET" and path == "/oauth2/applications/@me":
+            return json_response({"id": str(APPLICATION_ID), "name": "Bot", "icon": None, "description": "",
+                                  "bot_public": True, "bot_require_code_grant": False, "flags": 0,
+                                  "owner": user_payload(BOT_USER_ID + 1, "owner"), "verify_key": ""})
+        if method == "PUT" and path.endswith("/commands"):
+            return json_response([dict(command, id=str(snowflake(n)), application_id=str(APPLICATION_ID),
+                                       version="1") for n, command in enumerate(body, 1)])
+
+        parts = path.strip("/").split("/")
+        if parts[0] == "channels" and len(parts) >= 2:
+            return await self._channel_route(method, parts, body)
+        if parts[0] == "guilds" and len(parts) >= 3:
+            return await self._guild_route(method, parts, body)
+        if parts[0] == "interactions" and parts[-1] == "callback":
+            return self._interaction_callback(parts[1], body)
+        if parts[0] == "webhooks" and method == "POST" and len(parts) == 3:
+            # Interaction followups; the channel isn't in the path, so it is left unset
+            return json_response(self.message_payload(0, user_payload(BOT_USER_ID, "Bot", bot=True), **_message_fields(body)))
+        # Anything else succeeds with an empty body
+        return None
+
+    async def _channel_route(self, method, parts, body):
+        channel_id = parts[1]
+        guild = self._channels.get(channel_id)
+        if guild is None:
+            return json_response({"message": "Unknown Channel", "code": 10003}, 404)
+        channel = next(channel for channel in guild["channels"] if channel["id"] == channel_id)
+
+        if len(parts) == 2 and method == "PATCH":
+            for key in ("name", "parent_id", "permission_overwrites", "topic", "position"):
+                if key in body:
+                    channel[key] = body[key]
+            await self.dispatch(guild["id"], "CHANNEL_UPDATE", dict(channel, guild_id=guild["id"]))
+            return json_response(dict(channel, guild_id=guild["id"]))
+        if len(parts) == 2 and method == "DELETE":
+            guild["channels"].remove(channel)
+            del self._channels[channel_id]
+            await self.dispatch(guild["id"], "CHANNEL_DELETE", dict(channel, guild_id=guild["id"]))
+            return json_response(dict(channel, guild_id=guild["id"]))
+        if len(parts) == 3 and parts[2] == "messages" and method == "POST":
+            message = self.message_payload(channel_id, user_payload(BOT_USER_ID, "Bot", bot=True), guild_id=guild["id"],
+                                           **_message_fields(body))
+            # Like Discord, the bot's own messages come back over the gateway
+            await self.dispatch(guild["id"], "MESSAGE_CREATE", message)
+            return json_response(message)
+        if len(parts) == 4 and parts[2] == "messages" and method == "PATCH":
+            message = self.message_payload(channel_id, user_payload(BOT_USER_ID, "Bot", bot=True), guild_id=guild["id"],
+                                           **_message_fields(body))
+            message.update(id=parts[3], edited_timestamp=message["timestamp"])
+            return json_response(message)
+        return None
+
+    async def _guild_route(self, method, parts, body):
+        guild = self.guild(parts[1])
+        if guild is None:
+            return json_response({"message": "Unknown Guild", "code": 10004}, 404)
+        guild_id = guild["id"]
+        resource = parts[2]
+
+        if resource == "channels" and method == "POST":
+            channel = {"id": str(self.next_id()), "type": body.get("type", 0), "name": body.get("name", "channel"),
+                       "position": body.get("position") or len(guild["channels"]),
+                       "permission_overwrites": body.get("permission_overwrites", []), "parent_id": body.get("parent_id"),
+                       "nsfw": False, "topic": body.get("topic"), "rate_limit_per_user": 0, "last_message_id": None}
+            guild["channels"].append(channel)
+            self._channels[channel["id"]] = guild
+            await self.dispatch(guild_id, "CHANNEL_CREATE", dict(channel, guild_id=guild_id))
+            return json_response(dict(channel, guild_id=guild_id))
+        if resource == "roles" and method == "POST" and len(parts) == 3:
+            role = {"id": str(self.next_id()), "name": body.get("name", "new role"),
+                    "permissions": str(body.get("permissions", "0")), "position": 1, "color": body.get("color", 0),
+                    "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+            guild["roles"].append(role)
+            await self.dispatch(guild_id, "GUILD_ROLE_CREATE", {"guild_id": guild_id, "role": role})
+            return json_response(role)
+        if resource == "bulk-ban" and method == "POST":
+            user_ids = [str(user_id) for user_id in body.get("user_ids", [])]
+            for user_id in user_ids:
+                await self.remove_member(guild_id, user_id, banned=True)
+            return json_response({"banned_users": user_ids, "failed_users": []})
+        if resource == "bans" and method == "PUT" and len(parts) == 4:
+            await self.remove_member(guild_id, parts[3], banned=True)
+            return None
+        if resource == "members" and len(parts) >= 4:
+            member = self.members(guild_id).get(parts[3])
+            if member is None:
+                return json_response({"message": "Unknown Member", "code": 10007}, 404)
+            if method == "GET" and len(parts) == 4:
+                return json_response(member)
+            if method == "DELETE" and len(parts) == 4:
+                await self.remove_member(guild_id, parts[3])
+                return None
+            if method == "PATCH" and len(parts) == 4:
+                for key in ("nick", "roles", "communication_disabled_until", "mute", "deaf"):
+                    if key in body:
+                        member[key] = body[key]
+            elif len(parts) == 6 and parts[4] == "roles":
+                roles = member.setdefault("roles", [])
+                if method == "PUT" and parts[5] not in roles:
+                    roles.append(parts[5])
+                elif method == "DELETE" and parts[5] in roles:
+                    roles.remove(parts[5])
+            await self.dispatch(guild_id, "GUILD_MEMBER_UPDATE", dict(member, guild_id=guild_id))
+            return json_response(member) if method == "PATCH" else None
+        return None
+
+    async def add_member(self, guild_id, name, bot=False):
+        """Add a member to a guild and announce them with GUILD_MEMBER_ADD, like a join."""
+        guild = self.guild(guild_id)
+        member = {"user": user_payload(self.next_id(), name, bot=bot), "roles": [], "deaf": False, "mute": False,
+                  "joined_at": datetime.datetime.now(datetime.timezone.utc).isoformat(), "flags": 0}
+        self.member_list(guild).append(member)
+        guild["member_count"] += 1
+        self.members(guild_id)[member["user"]["id"]] = member
+        await self.dispatch(guild["id"], "GUILD_MEMBER_ADD", dict(member, guild_id=guild["id"]))
+        return member
+
+    async def remove_member(self, guild_id, user_id, banned=False):
+        """Remove a member (a leave, kick or ban) and send the events Discord would."""
+        guild_id = str(guild_id)
+        user_id = str(user_id)
+        guild = self.guild(guild_id)
+        member = self.members(guild_id).pop(user_id, None)
+        user = member["user"] if member else user_payload(user_id, f"user-{user_id}")
+        if member is not None:
+            self._stale.add(guild_id)
+            guild["member_count"] -= 1
+            await self.dispatch(guild_id, "GUILD_MEMBER_REMOVE", {"guild_id": guild_id, "user": user})
+        if banned:
+            await self.dispatch(guild_id, "GUILD_BAN_ADD", {"guild_id": guild_id, "user": user})
+
+    def _interaction_callback(self, interaction_id, body):
+        data = body.get("data") or {}
+        response_type = body.get("type", 4)
+        resource = {"type": response_type}
+        if response_type in (4, 7) and data:
+            resource["message"] = self.message_payload(0, user_payload(BOT_USER_ID, "Bot", bot=True), **_message_fields(data))
+        return json_response({
+            "interaction": {"id": str(interaction_id), "type": 3, "response_message_loading": response_type == 5,
+                            "response_message_ephemeral": bool(data.get("flags", 0) & 64)},
+            "resource": resource,
+        })
+
+    # -- gateway -----------------------------------------------------------
+
+    async def dispatch(self, guild_id, event, data):
+        """Send an event to the shard that owns ``guild_id``. Returns False if it isn't connected."""
+        for shard_id, (shard_count, send) in list(self._connections.items()):
+            if (int(guild_id) >> 22) % shard_count == shard_id:
+                await send(event, data)
+                return True
+        return False
+
+    async def handle_gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        sequence = itertools.count(1)
+        shard_id = None
+
+        async def dispatch(event, data):
+            if not ws.closed:
+                await ws.send_str(json.dumps({"op": OP_DISPATCH, "t": event, "s": next(sequence), "d": data}))
+
+        await ws.send_str(json.dumps({"op": OP_HELLO, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL}}))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    if message.type in (WSMsgType.ERROR, WSMsgType.CLOSE):
+                        break
+                    continue
+                payload = json.loads(message.data)
+                op = payload.get("op")
+                if op == OP_HEARTBEAT:
+                    asyncio.create_task(self._ack(ws))
+                elif op == OP_IDENTIFY:
+                    shard_id, shard_count = payload["d"].get("shard", [0, 1])
+                    self.identified.append((shard_id, shard_count))
+                    self._connections[shard_id] = (shard_count, dispatch)
+                    session_id = f"fake-{next(self._session_ids)}"
+                    self.sessions[session_id] = (shard_id, shard_count)
+                    guilds = self.data.for_shard(shard_id, shard_count)
+                    await dispatch("READY", {
+                        "v": 10, "user": user_payload(BOT_USER_ID, "Bot", bot=True), "session_id": session_id,
+                        "resume_gateway_url": self.gateway_url, "shard": [shard_id, shard_count],
+                        "guilds": [{"id": guild["id"], "unavailable": True} for guild in guilds],
+                        "application": {"id": str(APPLICATION_ID), "flags": 0},
+                    })
+                    for guild in guilds:
+                        # Like Discord, large guilds arrive without their member list
+                        members = self.member_list(guild)
+                        if self.strip_members or guild["large"]:
+                            members = members[:1]
+                        guild = dict(guild, members=members)
+                        await dispatch("GUILD_CREATE", guild)
+                elif op == OP_RESUME:
+                    shard_id, shard_count = self.sessions.get(payload["d"].get("session_id"), (0, 1))
+                    self._connections[shard_id] = (shard_count, dispatch)
+                    await dispatch("RESUMED", {})
+                elif op == OP_REQUEST_MEMBERS:
+                    await self._send_chunks(payload["d"], dispatch)
+        finally:
+            if shard_id is not None and self._connections.get(shard_id, (None, None))[1] is dispatch:
+                del self._connections[shard_id]
+        return ws
+
+    async def _ack(self, ws):
+        await asyncio.sleep(self.latency)
+        if not ws.closed:
+            await ws.send_str(json.dumps({"op": OP_HEARTBEAT_ACK}))
+
+    async def _send_chunks(self, request, dispatch, chunk_size=1000):
+        guild = self.guild(request["guild_id"])
+        if guild is None:
+            return
+        members = self.member_list(guild)
+        if request.get("user_ids"):
+            user_ids = request["user_ids"] if isinstance(request["user_ids"], list) else [request["user_ids"]]
+            wanted = {str(user_id) for user_id in user_ids}
+            members = [member for member in members if member["user"]["id"] in wanted]
+        elif request.get("query"):
+            query = request["query"].lower()
+            members = [member for member in members if member["user"]["username"].lower().startswith(query)]
+            members = members[:request.get("limit") or None]
+        chunks = [members[start:start + chunk_size] for start in range(0, len(members), chunk_size)] or [[]]
+        for index, chunk in enumerate(chunks):
+            await dispatch("GUILD_MEMBERS_CHUNK", {
+                "guild_id": guild["id"], "members": chunk, "chunk_index": index,
+                "chunk_count": len(chunks), "nonce": request.get("nonce"),
+            })
+
+
+def _message_fields(body):
+    """The parts of a message create/edit body that show up in the resulting message."""
+    return {key: body[key] for key in ("content", "embeds", "components", "flags") if body.get(key) is not None}
+
+
+async def _serve(args):
+    gateway = FakeGateway(FakeGuildData(args.guilds, args.members, args.channels),
+                          port=args.port, shard_count=args.shards,
+                          rate_limiter=RateLimiter(scale=args.rate_limit_scale) if args.rate_limit_scale else None)
+    await gateway.start()
+    print(f"DISCORD_API_BASE={gateway.api_base}")
+    print(f"DISCORD_GATEWAY_URL={gateway.gateway_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await gateway.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Discord gateway and REST API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=30)
+    parser.add_argument("--shards", type=int, default=1, help="shard count reported by /gateway/bot")
+    parser.add_argument("--rate-limit-scale", type=float, default=0,
+                        help="apply Discord-style rate limits with windows scaled by this (default: off)")
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
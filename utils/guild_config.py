@@ -0,0 +1,120 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows; cluster mode there relies on clusters not writing at the same instant
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class GuildConfig:
+    """Small JSON-backed per-guild settings store.
+
+    Values are kept in memory and written back atomically on every change, so reads
+    never touch the disk. A write only replaces the changed guild's entry in the file,
+    under a lock, so clusters sharing the file never overwrite each other's guilds.
+    Inside a running event loop the lock and the write happen in a worker thread, and
+    changes made while one write is in progress go out together in the next; call
+    ``close`` on shutdown to wait for them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = {}
+        self._dirty = set()  # Guilds whose entries still need writing
+        self._write_lock = asyncio.Lock()
+        self._task = None
+        self._load()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return {int(guild_id): values for guild_id, values in raw.items()}
+
+    def _load(self):
+        self._data = self._read()
+
+    @contextmanager
+    def _locked(self, directory):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directory, os.path.basename(self.path) + ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _save(self, entries):
+        """Write ``{guild_id: values or None}`` into the file, leaving other guilds alone."""
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._locked(directory):
+            data = self._read()
+            for guild_id, values in entries.items():
+                if values is not None:
+                    data[guild_id] = values
+                else:
+                    data.pop(guild_id, None)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({str(key): values for key, values in data.items()}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def _snapshot(self, guild_ids):
+        # Copied on the event loop so the worker thread never sees a dict being changed
+        return {guild_id: copy.deepcopy(self._data.get(guild_id)) for guild_id in guild_ids}
+
+    def _changed(self, guild_id):
+        self._dirty.add(guild_id)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts and benchmarks), so just write it now
+            entries, self._dirty = self._snapshot(self._dirty), set()
+            self._save(entries)
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Write every changed guild's entry, off the event loop."""
+        async with self._write_lock:
+            while self._dirty:
+                guild_ids, self._dirty = self._dirty, set()
+                try:
+                    await asyncio.to_thread(self._save, self._snapshot(guild_ids))
+                except Exception as e:
+                    self._dirty |= guild_ids
+                    logger.error(f"Failed to save {self.path} for {len(guild_ids)} guild(s): {e}")
+                    return
+
+    async def close(self):
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def guild_ids(self):
+        return list(self._data)
+
+    def get(self, guild_id, key, default=None):
+        return self._data.get(guild_id, {}).get(key, default)
+
+    def set(self, guild_id, key, value):
+        self._data.setdefault(guild_id, {})[key] = value
+        self._changed(guild_id)
+
+    def remove(self, guild_id, key):
+        if self._data.get(guild_id, {}).pop(key, None) is not None:
+            self._changed(guild_id)
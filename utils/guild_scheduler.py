@@ -0,0 +1,72 @@
+import heapq
+import time
+
+
+class StaggeredScheduler:
+    """Spreads periodic per-guild work evenly across a period.
+
+    Each guild gets a fixed phase inside the period derived from its id, and a min-heap of
+    deadlines hands out at most ``max_per_tick`` guilds per call to ``due``. Guilds that
+    do not fit are simply picked up on the next tick, so the amount of work per tick stays
+    bounded no matter how many guilds the bot is in.
+    """
+
+    def __init__(self, period, max_per_tick=25):
+        self.period = period
+        self.max_per_tick = max_per_tick
+        self._heap = []
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, guild_id):
+        return guild_id in self._deadlines
+
+    def _phase(self, guild_id):
+        # Snowflakes are spread well enough in their low bits to use as a phase offset
+        return (guild_id % 10007) / 10007 * self.period
+
+    def add(self, guild_id, now=None):
+        if guild_id in self._deadlines:
+            return
+        now = time.monotonic() if now is None else now
+        deadline = now - (now % self.period) + self._phase(guild_id)
+        if deadline < now:
+            deadline += self.period
+        self._deadlines[guild_id] = deadline
+        heapq.heappush(self._heap, (deadline, guild_id))
+
+    def remove(self, guild_id):
+        # Stale heap entries are skipped lazily in due()
+        self._deadlines.pop(guild_id, None)
+
+    def sync(self, guild_ids, now=None):
+        """Make the scheduled set match ``guild_ids``."""
+        guild_ids = set(guild_ids)
+        for guild_id in list(self._deadlines):
+            if guild_id not in guild_ids:
+                self.remove(guild_id)
+        for guild_id in guild_ids:
+            self.add(guild_id, now)
+
+    def due(self, now=None):
+        """Pop and reschedule up to ``max_per_tick`` guilds whose deadline has passed."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        while self._heap and len(ready) < self.max_per_tick:
+            deadline, guild_id = self._heap[0]
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            if self._deadlines.get(guild_id) != deadline:
+                continue
+
+            # Keep the guild on its phase; if we fell more than a period behind, skip ahead
+            next_deadline = deadline + self.period
+            if next_deadline <= now:
+                next_deadline += ((now - next_deadline) // self.period + 1) * self.period
+            self._deadlines[guild_id] = next_deadline
+            heapq.heappush(self._heap, (next_deadline, guild_id))
+            ready.append(guild_id)
+        return ready
@@ -0,0 +1,216 @@
+"""The bot's logging pipeline.
+
+Loggers only put records on a queue; a ``QueueListener`` thread formats them and does
+the file writes, so nothing on the event loop blocks on disk. Log files rotate by size
+and by age and rotated files are gzipped. Moderation actions are also written as one
+JSON object per line to their own file. Info and warning call sites that log in a hot
+loop are rate limited per call site, and the number of suppressed records is reported
+once the site's window ends (or when logging stops), so nothing disappears silently.
+Errors are never rate limited.
+"""
+import atexit
+import datetime
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+
+FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates when the file reaches ``max_bytes`` or is ``max_age`` seconds old, then gzips it."""
+
+    def __init__(self, filename, max_bytes=10 * 2 ** 20, max_age=86400, backup_count=14, encoding="utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True)
+        self.max_age = max_age
+        self.opened_at = time.time()
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source, destination):
+        with open(source, "rb") as f_in, gzip.open(destination, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if self.max_age and time.time() - self.opened_at >= self.max_age:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.opened_at = time.time()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including the record's ``audit`` fields if it has them."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "audit", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most ``burst`` records per call site every ``interval`` seconds.
+
+    Call sites are keyed by file and line, which works with f-string messages. Warnings
+    get a larger allowance than info and debug records; errors always pass. ``flush``
+    returns a summary record for every site whose window ended with records suppressed.
+    """
+
+    def __init__(self, burst=10, interval=60.0, warning_burst=30):
+        super().__init__()
+        self.burst = burst
+        self.warning_burst = warning_burst
+        self.interval = interval
+        self._sites = {}  # (pathname, lineno) -> [window start, passed, suppressed, logger name, level]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if getattr(record, "audit", None) is not None or record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        limit = self.warning_burst if record.levelno >= logging.WARNING else self.burst
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                site = self._sites[key] = [now, 0, 0, record.name, record.levelno]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar message(s) suppressed)"
+            if site[1] >= limit:
+                site[2] += 1
+                return False
+            site[1] += 1
+            return True
+
+    def flush(self, force=False):
+        """Summary records for suppressed messages whose window is over, or for all of them if ``force``."""
+        now = time.monotonic()
+        records = []
+        with self._lock:
+            for key, site in list(self._sites.items()):
+                if not force and now - site[0] < self.interval:
+                    continue
+                if site[2]:
+                    records.append(logging.LogRecord(site[3], site[4], key[0], key[1],
+                                                     f"{site[2]} similar message(s) suppressed", None, None))
+                del self._sites[key]
+        return records
+
+
+class SuppressionReporter(threading.Thread):
+    """Puts a rate limit filter's suppression summaries on the queue as windows end."""
+
+    def __init__(self, rate_limit, queue_handler):
+        super().__init__(name="log-suppression-reporter", daemon=True)
+        self.rate_limit = rate_limit
+        self.queue_handler = queue_handler
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.rate_limit.interval / 2):
+            self.report()
+
+    def report(self, force=False):
+        # Enqueued directly, so the summaries themselves are never rate limited
+        for record in self.rate_limit.flush(force):
+            self.queue_handler.enqueue(self.queue_handler.prepare(record))
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        self.report(force=True)
+
+
+class AuditFilter(logging.Filter):
+    """Selects records that carry moderation audit fields."""
+
+    def filter(self, record):
+        return getattr(record, "audit", None) is not None
+
+
+_listener = None
+_reporter = None
+
+
+def setup_logging(directory="logs", filename="ticket_bot.log", audit_filename="moderation.jsonl", level=logging.INFO,
+                  console=True, max_bytes=10 * 2 ** 20, max_age=86400, backup_count=14):
+    """Route every logger through a queue to rotating, compressed files. Safe to call twice."""
+    global _listener, _reporter
+    if _listener is not None:
+        return _listener
+    os.makedirs(directory, exist_ok=True)
+
+    main_file = CompressingRotatingFileHandler(os.path.join(directory, filename), max_bytes, max_age, backup_count)
+    main_file.setFormatter(logging.Formatter(FORMAT))
+
+    audit_file = CompressingRotatingFileHandler(os.path.join(directory, audit_filename), max_bytes, max_age, backup_count)
+    audit_file.setFormatter(JsonFormatter())
+    audit_file.addFilter(AuditFilter())
+
+    handlers = [main_file, audit_file]
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(FORMAT))
+        handlers.append(stream)
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    rate_limit = RateLimitFilter()
+    queue_handler.addFilter(rate_limit)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    _reporter = SuppressionReporter(rate_limit, queue_handler)
+    _reporter.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Report pending suppression counts, flush whatever is queued and stop the writer thread."""
+    global _listener, _reporter
+    if _reporter is not None:
+        _reporter.stop()
+        _reporter = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def audit(logger, message, *, action, actor, target, reason=None, latency=None, **fields):
+    """Log a moderation action both as a readable line and as a structured JSON record."""
+    record = {
+        "action": action,
+        "actor": str(actor) if actor is not None else None,
+        "actor_id": getattr(actor, "id", None),
+        "target": str(target) if target is not None else None,
+        "target_id": getattr(target, "id", target if isinstance(target, int) else None),
+        "reason": reason,
+        "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+    }
+    record.update(fields)
+    logger.info(message, extra={"audit": record})
@@ -0,0 +1,65 @@
+"""Member cache policy and helpers that work whether or not members are cached.
+
+``MEMBER_CACHE=full`` (the default) is discord.py's normal behaviour: every guild is
+chunked at startup and every Member stays in memory. ``MEMBER_CACHE=lean`` keeps the
+members intent, so join/leave events and member counts still arrive, but caches no
+members and skips startup chunking. Statistics then counts bots and monthly joins from
+a one-off uncached chunk per guild, and moderation fetches the members it acts on.
+"""
+import asyncio
+import logging
+import os
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+FULL = "full"
+LEAN = "lean"
+QUERY_BATCH = 100  # Discord's limit on user ids per member request
+
+
+def cache_mode():
+    mode = os.getenv("MEMBER_CACHE", FULL).lower()
+    if mode not in (FULL, LEAN):
+        raise ValueError(f"MEMBER_CACHE must be '{FULL}' or '{LEAN}', not {mode!r}")
+    return mode
+
+
+def member_cache_options(mode=None):
+    """Keyword arguments for the bot constructor that implement a cache mode."""
+    if (mode or cache_mode()) == LEAN:
+        return {"member_cache_flags": discord.MemberCacheFlags.none(), "chunk_guilds_at_startup": False}
+    return {}
+
+
+async def get_members(guild, user_ids):
+    """Resolve ids to members: cached ones directly, the rest with batched gateway queries.
+
+    Ids that aren't members of the guild are missing from the returned dict.
+    """
+    found = {}
+    missing = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member is not None:
+            found[user_id] = member
+        else:
+            missing.append(user_id)
+
+    for start in range(0, len(missing), QUERY_BATCH):
+        batch = missing[start:start + QUERY_BATCH]
+        try:
+            members = await guild.query_members(user_ids=batch, limit=len(batch), cache=False)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out fetching {len(batch)} member(s) in {guild.name}.")
+            continue
+        found.update((member.id, member) for member in members)
+    return found
+
+
+async def all_members(guild):
+    """Every member of the guild, from the cache if it's complete or else an uncached chunk."""
+    if guild.chunked:
+        return guild.members
+    return await guild.chunk(cache=False)
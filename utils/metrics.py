@@ -0,0 +1,259 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Recording a value is a dict lookup plus an increment, so the hooks are cheap enough to
+leave on in production. Everything records into the module-level ``metrics`` registry.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed values (seconds, by convention)."""
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Registry of counters, histograms and gauges keyed by name and label tuple."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.help = {}
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, labels=(), amount=1):
+        series = self.counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + amount
+
+    def total(self, name):
+        """Sum a counter across all of its label sets."""
+        return sum(self.counters.get(name, {}).values())
+
+    def observe(self, name, value, labels=()):
+        series = self.histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram()
+        histogram.observe(value)
+
+    def set_gauge(self, name, value, labels=()):
+        """Set a gauge to a number, or to a callable evaluated at render time."""
+        self.gauges.setdefault(name, {})[labels] = value
+
+    @contextmanager
+    def timer(self, name, labels=()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def render(self):
+        """Render every series in the Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines += self._header(name, "counter")
+            lines += [f"{name}{_format_labels(labels)} {value}" for labels, value in series.items()]
+
+        for name, series in sorted(self.gauges.items()):
+            lines += self._header(name, "gauge")
+            for labels, value in series.items():
+                if callable(value):
+                    try:
+                        value = value()
+                    except Exception:
+                        continue
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name, series in sorted(self.histograms.items()):
+            lines += self._header(name, "histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name, kind):
+        header = []
+        if name in self.help:
+            header.append(f"# HELP {name} {self.help[name]}")
+        header.append(f"# TYPE {name} {kind}")
+        return header
+
+
+metrics = Metrics()
+metrics.describe("discord_rest_requests_total", "REST requests by route template and outcome.")
+metrics.describe("discord_rest_request_seconds", "REST request latency as seen by callers, including rate limit waits.")
+metrics.describe("discord_rest_ratelimits_total", "429 responses discord.py retried, by method.")
+metrics.describe("discord_rest_retry_after_seconds", "Retry-After values received with 429 responses.")
+metrics.describe("discord_command_seconds", "Prefix and application command handling time.")
+metrics.describe("discord_interaction_seconds", "Component interaction handling time.")
+metrics.describe("event_loop_lag_seconds", "How late the event loop woke a sleeping task.")
+metrics.describe("discord_gateway_latency_seconds", "Heartbeat latency per shard.")
+metrics.describe("startup_phase_seconds", "Time spent in each phase of the last startup.")
+metrics.describe("rest_scheduler_jobs_total", "Scheduled REST jobs by priority class and outcome.")
+metrics.describe("rest_scheduler_wait_seconds", "Time scheduled REST jobs waited for a free slot.")
+metrics.describe("rest_scheduler_queued", "Scheduled REST jobs waiting to start, by priority class.")
+metrics.describe("rest_scheduler_in_flight", "Scheduled REST jobs running, by priority class.")
+
+
+def instrument_http(http, registry=metrics):
+    """Wrap an HTTPClient's request method to record per-route latency and outcomes."""
+    if getattr(http, "_metrics_instrumented", False):
+        return
+    original = http.request
+
+    async def request(route, **kwargs):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await original(route, **kwargs)
+        except discord.HTTPException as e:
+            status = str(e.status)
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            # Route paths are templates like /channels/{channel_id}, so cardinality stays bounded
+            route_label = ("route", f"{route.method} {route.path}")
+            registry.observe("discord_rest_request_seconds", time.perf_counter() - start, (route_label,))
+            registry.inc("discord_rest_requests_total", (route_label, ("status", status)))
+
+    http.request = request
+    http._metrics_instrumented = True
+
+
+class RateLimitMetricsHandler(logging.Handler):
+    """Turns discord.py's 429 warnings into metrics."""
+
+    def __init__(self, registry=metrics):
+        super().__init__(level=logging.WARNING)
+        self.registry = registry
+
+    def emit(self, record):
+        message = record.msg if isinstance(record.msg, str) else ""
+        if "rate limit" not in message:
+            return
+        if "Global rate limit" in message:
+            self.registry.inc("discord_rest_ratelimits_total", (("method", "global"),))
+            retry_after = record.args[0] if record.args else None
+        elif len(record.args or ()) >= 3:
+            self.registry.inc("discord_rest_ratelimits_total", (("method", record.args[0]),))
+            retry_after = record.args[2]
+        else:
+            return
+        if isinstance(retry_after, (int, float)):
+            self.registry.observe("discord_rest_retry_after_seconds", float(retry_after))
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag by timing how late a periodic sleep wakes up."""
+
+    def __init__(self, interval=0.5, registry=metrics):
+        self.interval = interval
+        self.registry = registry
+        self.last_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            self.registry.set_gauge("event_loop_lag_last_seconds", lambda: self.last_lag)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(loop.time() - start - self.interval, 0.0)
+            self.registry.observe("event_loop_lag_seconds", self.last_lag)
+
+
+async def start_metrics_server(host, port, registry=metrics):
+    """Serve ``registry.render()`` at /metrics over plain HTTP."""
+
+    async def handle(reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain the headers; the request body is never needed
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = registry.render().encode("utf-8")
+                status = "200 OK"
+            else:
+                body = b"Not Found\n"
+                status = "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
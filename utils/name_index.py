@@ -0,0 +1,195 @@
+"""Per-guild name -> id index for categories, text channels and roles.
+
+``discord.utils.get(guild.categories, name=...)`` walks (and for ``guild.categories``
+first sorts) every channel in the guild. The index answers the same question with two
+dict lookups and is kept current from channel and role events. A guild's entry is
+dropped whenever a new gateway session delivers the guild again, since events may have
+been missed in between. A name that isn't found triggers one rebuild before the lookup
+reports it missing; the miss is then remembered until a channel or role takes that name,
+so repeated lookups of an absent name stay cheap. Everything shares the module-level ``names`` index; call
+``names.attach(bot)`` once per bot before using it.
+"""
+import discord
+
+CATEGORY = "category"
+TEXT = "text"
+ROLE = "role"
+
+_CHANNEL_KINDS = {
+    discord.ChannelType.category: CATEGORY,
+    discord.ChannelType.text: TEXT,
+    discord.ChannelType.news: TEXT,
+}
+
+
+def _channel_kind(channel):
+    return _CHANNEL_KINDS.get(getattr(channel, "type", None))
+
+
+class NameIndex:
+    """Maps (guild, kind, name) to the ids of the objects carrying that name."""
+
+    def __init__(self):
+        self._guilds = {}  # guild_id -> {kind: {name: [ids]}}
+        self._misses = {}  # guild_id -> {(kind, name)} confirmed absent since the last build
+        self._attached = set()  # ids of bots whose events feed the index
+
+    # -- maintenance -------------------------------------------------------
+
+    def build(self, guild):
+        """Index a guild from scratch with one pass over its channels and roles."""
+        kinds = {CATEGORY: {}, TEXT: {}, ROLE: {}}
+        for channel in guild.channels:
+            kind = _channel_kind(channel)
+            if kind is not None:
+                kinds[kind].setdefault(channel.name, []).append(channel.id)
+        for role in guild.roles:
+            kinds[ROLE].setdefault(role.name, []).append(role.id)
+        self._guilds[guild.id] = kinds
+        self._misses.pop(guild.id, None)
+        return kinds
+
+    def discard(self, guild_id):
+        self._guilds.pop(guild_id, None)
+        self._misses.pop(guild_id, None)
+
+    def _add(self, guild_id, kind, name, item_id):
+        kinds = self._guilds.get(guild_id)
+        if kinds is None or kind is None:
+            # Unindexed guilds are built on their first lookup
+            return
+        misses = self._misses.get(guild_id)
+        if misses:
+            misses.discard((kind, name))
+        ids = kinds[kind].setdefault(name, [])
+        if item_id not in ids:
+            ids.append(item_id)
+
+    def _remove(self, guild_id, kind, name, item_id):
+        kinds = self._guilds.get(guild_id)
+        if kinds is None or kind is None:
+            return
+        ids = kinds[kind].get(name)
+        if ids and item_id in ids:
+            ids.remove(item_id)
+            if not ids:
+                del kinds[kind][name]
+
+    def channel_created(self, channel):
+        self._add(channel.guild.id, _channel_kind(channel), channel.name, channel.id)
+
+    def channel_deleted(self, channel):
+        self._remove(channel.guild.id, _channel_kind(channel), channel.name, channel.id)
+
+    def channel_updated(self, before, after):
+        if before.name != after.name or before.type != after.type:
+            self.channel_deleted(before)
+            self.channel_created(after)
+
+    def role_created(self, role):
+        self._add(role.guild.id, ROLE, role.name, role.id)
+
+    def role_deleted(self, role):
+        self._remove(role.guild.id, ROLE, role.name, role.id)
+
+    def role_updated(self, before, after):
+        if before.name != after.name:
+            self.role_deleted(before)
+            self.role_created(after)
+
+    def attach(self, bot):
+        """Keep the index current from ``bot``'s events. Safe to call more than once."""
+        if id(bot) in self._attached:
+            return
+        self._attached.add(id(bot))
+
+        async def on_guild_channel_create(channel):
+            self.channel_created(channel)
+
+        async def on_guild_channel_delete(channel):
+            self.channel_deleted(channel)
+
+        async def on_guild_channel_update(before, after):
+            self.channel_updated(before, after)
+
+        async def on_guild_role_create(role):
+            self.role_created(role)
+
+        async def on_guild_role_delete(role):
+            self.role_deleted(role)
+
+        async def on_guild_role_update(before, after):
+            self.role_updated(before, after)
+
+        async def on_guild_remove(guild):
+            self.discard(guild.id)
+
+        # A new session resends every guild; whatever happened while disconnected wasn't seen
+        async def on_guild_available(guild):
+            self.discard(guild.id)
+
+        async def on_ready():
+            self._guilds.clear()
+            self._misses.clear()
+
+        for listener in (on_guild_channel_create, on_guild_channel_delete, on_guild_channel_update,
+                         on_guild_role_create, on_guild_role_delete, on_guild_role_update, on_guild_remove,
+                         on_guild_available, on_ready):
+            bot.add_listener(listener)
+
+    # -- lookups -----------------------------------------------------------
+
+    def _get(self, guild, kind, item_id):
+        return guild.get_role(item_id) if kind == ROLE else guild.get_channel(item_id)
+
+    def lookup(self, guild, kind, name):
+        """Return the object of ``kind`` named ``name``, or None, like ``discord.utils.get``."""
+        kinds = self._guilds.get(guild.id)
+        fresh = kinds is None
+        if fresh:
+            kinds = self.build(guild)
+        ids = kinds[kind].get(name)
+        if not ids:
+            misses = self._misses.get(guild.id)
+            if not fresh and (misses is None or (kind, name) not in misses):
+                # A missed create or rename would otherwise look like a missing name and cause a duplicate
+                ids = self.build(guild)[kind].get(name)
+            if not ids:
+                self._misses.setdefault(guild.id, set()).add((kind, name))
+                return None
+
+        found = [item for item in (self._get(guild, kind, item_id) for item_id in ids) if item and item.name == name]
+        if len(found) != len(ids):
+            # An event was missed; rebuild rather than serve a stale answer
+            ids = self.build(guild)[kind].get(name, [])
+            found = [item for item in (self._get(guild, kind, item_id) for item_id in ids) if item]
+        if not found:
+            return None
+        # Duplicate names resolve to the first in the guild's own ordering, as a scan would
+        return min(found, key=lambda item: item.position) if len(found) > 1 else found[0]
+
+    def category(self, guild, name):
+        return self.lookup(guild, CATEGORY, name)
+
+    def text_channel(self, guild, name):
+        return self.lookup(guild, TEXT, name)
+
+    def role(self, guild, name):
+        return self.lookup(guild, ROLE, name)
+
+    def resolve(self, guild, kind, name, config, key):
+        """Return the object whose id is stored under ``key`` in ``config``.
+
+        Without a stored id (or if that object is gone) fall back to looking it up by name
+        and remember the id found, so a later rename doesn't lose track of it.
+        """
+        stored = config.get(guild.id, key)
+        item = self._get(guild, kind, stored) if stored else None
+        if item is None:
+            item = self.lookup(guild, kind, name)
+            if item is not None:
+                config.set(guild.id, key, item.id)
+        return item
+
+
+names = NameIndex()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+from utils.rest_scheduler import BACKGROUND, rest
+
+logger = logging.getLogger(__name__)
+
+MUTED_ROLE_NAME = "Muted"
+
+# What the Muted role may not do anywhere in the guild
+MUTED_OVERWRITE = discord.PermissionOverwrite(
+    send_messages=False,
+    send_messages_in_threads=False,
+    create_public_threads=False,
+    create_private_threads=False,
+    add_reactions=False,
+    speak=False,
+)
+
+
+def needs_overwrite(channel, role):
+    """Whether a channel's overwrite for ``role`` differs from MUTED_OVERWRITE."""
+    return channel.overwrites_for(role) != MUTED_OVERWRITE
+
+
+class ProvisioningJob:
+    """Progress of applying the Muted overwrite across one guild."""
+
+    __slots__ = ("guild_id", "role_id", "total", "done", "skipped", "failed", "started_at", "finished_at", "task")
+
+    def __init__(self, guild_id, role_id):
+        self.guild_id = guild_id
+        self.role_id = role_id
+        self.total = 0
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def summary(self):
+        processed = self.done + self.skipped + self.failed
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        state = "running" if self.running else "finished"
+        return (f"{state}: {processed}/{self.total} channels "
+                f"({self.done} updated, {self.skipped} already set, {self.failed} failed) in {elapsed:.0f}s")
+
+
+class OverwriteProvisioner:
+    """Applies the Muted role's channel overwrites in the background.
+
+    Categories are updated first; channels that were synced with their category are then
+    re-synced, which keeps them following the category for future edits, while other
+    channels get the overwrite directly. Channels that already carry the overwrite are
+    skipped, so an interrupted job resumes where it stopped simply by running again. At
+    most ``concurrency`` requests are in flight, sent through the shared REST scheduler at
+    background priority so moderators' own actions go first, and discord.py's per-route
+    buckets handle the rest of the rate limiting.
+    """
+
+    def __init__(self, config, concurrency=4):
+        self.config = config
+        self.concurrency = concurrency
+        self._jobs = {}
+
+    def job(self, guild_id):
+        return self._jobs.get(guild_id)
+
+    def start(self, guild, role):
+        """Start provisioning a guild, or return the job already running for it."""
+        job = self._jobs.get(guild.id)
+        if job is not None and job.running:
+            return job
+
+        job = ProvisioningJob(guild.id, role.id)
+        self._jobs[guild.id] = job
+        self.config.set(guild.id, "muted_provisioning", "pending")
+        job.task = asyncio.create_task(self._run(job, guild, role))
+        return job
+
+    async def apply(self, channel, role):
+        """Give a single channel the Muted overwrite, e.g. right after it is created."""
+        if not needs_overwrite(channel, role):
+            return False
+        await rest.run(BACKGROUND, lambda: channel.set_permissions(role, overwrite=MUTED_OVERWRITE, reason="Muted role setup"),
+                       guild_id=channel.guild.id)
+        return True
+
+    async def _run(self, job, guild, role):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Decide which channels follow their category before any category changes
+        synced = {channel.id for channel in guild.channels
+                  if not isinstance(channel, discord.CategoryChannel) and channel.category and channel.permissions_synced}
+        categories = list(guild.categories)
+        channels = [channel for channel in guild.channels if not isinstance(channel, discord.CategoryChannel)]
+        job.total = len(categories) + len(channels)
+
+        async def provision(channel):
+            async with semaphore:
+                try:
+                    if channel.id in synced and channel.category and not needs_overwrite(channel.category, role):
+                        if not needs_overwrite(channel, role):
+                            job.skipped += 1
+                            return
+                        await rest.run(BACKGROUND, lambda: channel.edit(sync_permissions=True, reason="Muted role setup"),
+                                       guild_id=guild.id)
+                        job.done += 1
+                    elif await self.apply(channel, role):
+                        job.done += 1
+                    else:
+                        job.skipped += 1
+                except discord.NotFound:
+                    job.skipped += 1
+                except discord.HTTPException as e:
+                    job.failed += 1
+                    logger.error(f"Failed to set Muted overwrite on {channel} in {guild.name}: {e}")
+
+        try:
+            await asyncio.gather(*(provision(category) for category in categories))
+            await asyncio.gather(*(provision(channel) for channel in channels))
+        finally:
+            job.finished_at = time.monotonic()
+            if job.failed == 0 and guild.get_role(role.id):
+                self.config.set(guild.id, "muted_provisioning", "done")
+            logger.info(f"Muted role provisioning in {guild.name} {job.summary()}")
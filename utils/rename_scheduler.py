@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+from utils.rest_scheduler import STATS, rest
+
+logger = logging.getLogger(__name__)
+
+# Discord allows roughly two name/topic edits per channel every ten minutes
+RENAME_RATE = 2
+RENAME_PER = 600.0
+
+
+class _ChannelState:
+    __slots__ = ("applied", "channel", "pending", "queued", "job", "tokens", "refilled_at")
+
+    def __init__(self, rate):
+        self.applied = None
+        self.channel = None
+        self.pending = None
+        self.queued = None  # Name handed to the REST scheduler that hasn't gone out yet
+        self.job = None
+        self.tokens = float(rate)
+        self.refilled_at = time.monotonic()
+
+    @property
+    def sending(self):
+        return self.job is not None and not self.job.done()
+
+
+def _key(channel_id):
+    return ("rename", channel_id)
+
+
+class RenameScheduler:
+    """Applies channel renames only when the name changes, within Discord's per-channel rename budget.
+
+    Callers submit the name they want; repeated submissions before an edit goes out are
+    coalesced so only the latest value is sent. Edits go out through the shared REST
+    scheduler at statistics priority, and a rename still waiting there is updated in place
+    rather than followed by another request.
+    """
+
+    def __init__(self, rate=RENAME_RATE, per=RENAME_PER, scheduler=rest):
+        self.rate = rate
+        self.per = per
+        self.scheduler = scheduler
+        self._states = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+
+        self.submitted = 0
+        self.suppressed = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._closing = False
+        for channel_id in list(self._states):
+            self.forget(channel_id)
+
+    @property
+    def queue_depth(self):
+        return sum(1 for state in self._states.values() if state.pending is not None or state.queued is not None)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "tracked_channels": len(self._states),
+            "submitted": self.submitted,
+            "suppressed": self.suppressed,
+            "coalesced": self.coalesced,
+            "applied": self.applied,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+        }
+
+    def forget(self, channel_id):
+        """Drop all state for a channel, e.g. after it was deleted."""
+        self._states.pop(channel_id, None)
+        if self.scheduler.waiting(_key(channel_id)):
+            self.scheduler.cancel(_key(channel_id))
+
+    def submit(self, channel, name):
+        """Request that a channel be renamed. Returns False if the edit was suppressed."""
+        self.submitted += 1
+        state = self._states.get(channel.id)
+        if state is None:
+            state = self._states[channel.id] = _ChannelState(self.rate)
+            state.applied = channel.name
+
+        if state.queued is not None and self.scheduler.waiting(_key(channel.id)):
+            return self._replace_queued(state, channel, name)
+
+        if state.pending is None and name == state.applied:
+            self.suppressed += 1
+            return False
+
+        if state.pending is not None:
+            if name == state.pending:
+                self.suppressed += 1
+                return False
+            self.coalesced += 1
+
+        # The value reverted to what is already live, nothing left to send
+        if name == state.applied:
+            state.pending = None
+            return False
+
+        state.channel = channel
+        state.pending = name
+        self._wakeup.set()
+        return True
+
+    def _replace_queued(self, state, channel, name):
+        """Change the name of a rename that is waiting in the REST scheduler, without spending budget."""
+        if name == state.queued:
+            self.suppressed += 1
+            return False
+        self.coalesced += 1
+        if name == state.applied:
+            # Back to the live name: drop the request and give its budget back
+            self.scheduler.cancel(_key(channel.id))
+            state.queued = None
+            state.tokens = min(float(self.rate), state.tokens + 1)
+            return False
+        state.channel = channel
+        self._send(state, name)
+        return True
+
+    def _refill(self, state, now):
+        elapsed = now - state.refilled_at
+        state.tokens = min(float(self.rate), state.tokens + elapsed * self.rate / self.per)
+        state.refilled_at = now
+
+    async def _run(self):
+        while not self._closing:
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_wake = None
+
+            for state in list(self._states.values()):
+                # One rename per channel at a time, so they land in the order they were asked for
+                if state.pending is None or state.sending:
+                    continue
+                self._refill(state, now)
+                if state.tokens >= 1:
+                    state.tokens -= 1
+                    name, state.pending = state.pending, None
+                    self._send(state, name)
+                else:
+                    wait = (1 - state.tokens) * self.per / self.rate
+                    next_wake = wait if next_wake is None else min(next_wake, wait)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=next_wake)
+            except asyncio.TimeoutError:
+                pass
+
+    def _send(self, state, name):
+        channel = state.channel
+        state.queued = name
+        state.job = self.scheduler.submit(STATS, lambda: self._apply(state, channel, name),
+                                          key=_key(channel.id), guild_id=channel.guild.id)
+        # Whatever was submitted meanwhile can go once this one is done
+        state.job.add_done_callback(lambda _: self._wakeup.set())
+
+    async def _apply(self, state, channel, name):
+        state.queued = None
+        try:
+            await channel.edit(name=name)
+            state.applied = name
+            self.applied += 1
+        except discord.NotFound:
+            self.forget(channel.id)
+        except discord.RateLimited as e:
+            # discord.py won't sleep this long, so give the slot back and wait on our side
+            self._rate_limited(state, name, e.retry_after)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self._rate_limited(state, name)
+            else:
+                self.failed += 1
+                logger.error(f"Failed to rename channel {channel.id} to {name}: {e}")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Unexpected error renaming channel {channel.id} to {name}: {e}")
+
+    def _rate_limited(self, state, name, retry_after=None):
+        # Out of budget on Discord's side, so drain ours and retry the latest value later
+        self.rate_limited += 1
+        state.tokens = 0.0
+        state.refilled_at = time.monotonic()
+        if retry_after:
+            # Go into debt so the next token comes due when Discord's wait is over
+            state.tokens = min(0.0, 1 - retry_after * self.rate / self.per)
+        if state.pending is None:
+            state.pending = name
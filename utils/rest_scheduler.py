@@ -0,0 +1,197 @@
+"""Shared, priority-aware scheduler for outbound REST work.
+
+discord.py sends every request as soon as it is awaited, so a moderator's ban during a raid
+queues in the same global budget as a burst of ticket creates or statistics renames. Cogs
+instead hand REST work to the module-level ``rest`` scheduler as a zero-argument callable
+returning the coroutine to run. At most ``max_in_flight`` jobs run at once, each priority
+class has its own cap, and a free slot always goes to the most important waiting job:
+moderation, then interaction replies, then ticket channel work, then background upkeep such
+as permission provisioning, then cosmetic statistics.
+The caps of the lower classes add up to less than the total, so moderation always finds a
+free slot however busy the rest of the bot is.
+
+Jobs may carry a ``key``. Submitting a job whose key is already waiting replaces that job's
+work and keeps its place in the queue, so superseded requests (a channel renamed twice
+before the first rename went out) are only sent once. Cancel a job through the future
+``submit`` returns, by key with ``cancel``, or for a whole guild with ``cancel_guild``.
+
+Initial interaction responses are not scheduled: they must reach Discord within three
+seconds and go to the interaction's own token rather than the bot's rate limits.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most important first
+MODERATION = 0
+INTERACTION = 1
+TICKETS = 2
+BACKGROUND = 3
+STATS = 4
+CLASS_NAMES = ("moderation", "interaction", "tickets", "background", "stats")
+
+DEFAULT_LIMITS = (8, 4, 3, 2, 1)  # Jobs in flight per class
+MAX_IN_FLIGHT = 12
+
+
+class RestJob:
+    """One unit of scheduled REST work."""
+
+    __slots__ = ("priority", "factory", "key", "guild_id", "future", "task", "queued_at")
+
+    def __init__(self, priority, factory, key, guild_id, future):
+        self.priority = priority
+        self.factory = factory
+        self.key = key
+        self.guild_id = guild_id
+        self.future = future
+        self.task = None
+        self.queued_at = time.monotonic()
+
+    @property
+    def started(self):
+        return self.task is not None
+
+
+class RestScheduler:
+    """Runs submitted REST work by priority class, within per-class and overall concurrency limits."""
+
+    def __init__(self, limits=DEFAULT_LIMITS, max_in_flight=MAX_IN_FLIGHT, registry=metrics):
+        self.limits = list(limits)
+        self.max_in_flight = max_in_flight
+        self.registry = registry
+        self._queues = [deque() for _ in self.limits]
+        self._running = [set() for _ in self.limits]
+        self._keyed = {}  # key -> the job waiting (or running) under that key
+
+        for priority, name in enumerate(CLASS_NAMES[:len(self.limits)]):
+            labels = (("class", name),)
+            registry.set_gauge("rest_scheduler_queued", lambda priority=priority: self.queued(priority), labels)
+            registry.set_gauge("rest_scheduler_in_flight", lambda priority=priority: len(self._running[priority]), labels)
+
+    @property
+    def in_flight(self):
+        return sum(len(running) for running in self._running)
+
+    def queued(self, priority=None):
+        """Jobs waiting to start, in one class or overall."""
+        queues = self._queues if priority is None else (self._queues[priority],)
+        return sum(1 for queue in queues for job in queue if not job.future.done())
+
+    def stats(self):
+        return {
+            name: {"queued": self.queued(priority), "in_flight": len(self._running[priority]), "limit": self.limits[priority]}
+            for priority, name in enumerate(CLASS_NAMES[:len(self.limits)])
+        }
+
+    def _count(self, priority, outcome):
+        self.registry.inc("rest_scheduler_jobs_total", (("class", CLASS_NAMES[priority]), ("outcome", outcome)))
+
+    # -- submitting --------------------------------------------------------
+
+    def submit(self, priority, factory, key=None, guild_id=None):
+        """Schedule ``factory()`` and return a future for its result.
+
+        If a job with the same ``key`` is still waiting, it runs ``factory`` instead and its
+        future is returned; it moves up if the new priority is more important. Cancelling
+        the future cancels the job, whether it is waiting or already running.
+        """
+        if key is not None:
+            if self.waiting(key):
+                job = self._keyed[key]
+                job.factory = factory
+                if priority < job.priority:
+                    self._queues[job.priority].remove(job)
+                    job.priority = priority
+                    self._queues[priority].append(job)
+                self._count(priority, "coalesced")
+                self._dispatch()
+                return job.future
+
+        job = RestJob(priority, factory, key, guild_id, asyncio.get_running_loop().create_future())
+        job.future.add_done_callback(lambda _: self._finished(job))
+        if key is not None:
+            self._keyed[key] = job
+        self._queues[priority].append(job)
+        self._dispatch()
+        return job.future
+
+    async def run(self, priority, factory, key=None, guild_id=None):
+        """Schedule ``factory()`` and wait for its result."""
+        return await self.submit(priority, factory, key, guild_id)
+
+    def waiting(self, key):
+        """Whether the job submitted under ``key`` has yet to start."""
+        job = self._keyed.get(key)
+        return job is not None and not job.started and not job.future.done()
+
+    # -- cancelling --------------------------------------------------------
+
+    def cancel(self, key):
+        """Cancel the job submitted under ``key``. Returns whether there was one."""
+        job = self._keyed.get(key)
+        return job is not None and job.future.cancel()
+
+    def cancel_guild(self, guild_id, priority=None):
+        """Cancel every job for a guild, optionally only in one class. Returns how many were cancelled."""
+        classes = range(len(self.limits)) if priority is None else (priority,)
+        jobs = [job for p in classes for job in (*self._queues[p], *self._running[p]) if job.guild_id == guild_id]
+        return sum(1 for job in jobs if job.future.cancel())
+
+    # -- running -----------------------------------------------------------
+
+    def _next_job(self):
+        for priority, queue in enumerate(self._queues):
+            if len(self._running[priority]) >= self.limits[priority]:
+                continue
+            while queue:
+                job = queue.popleft()
+                if not job.future.done():
+                    return job
+        return None
+
+    def _dispatch(self):
+        while self.in_flight < self.max_in_flight:
+            job = self._next_job()
+            if job is None:
+                return
+            self._running[job.priority].add(job)
+            self.registry.observe("rest_scheduler_wait_seconds", time.monotonic() - job.queued_at,
+                                  (("class", CLASS_NAMES[job.priority]),))
+            job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job):
+        try:
+            result = await job.factory()
+        except asyncio.CancelledError:
+            job.future.cancel()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+    def _finished(self, job):
+        if self._keyed.get(job.key) is job:
+            del self._keyed[job.key]
+        if job.future.cancelled():
+            self._count(job.priority, "cancelled")
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        elif job.future.exception() is not None:
+            self._count(job.priority, "error")
+            logger.debug(f"Scheduled {CLASS_NAMES[job.priority]} request failed: {job.future.exception()}")
+        else:
+            self._count(job.priority, "ok")
+        if job in self._running[job.priority]:
+            self._running[job.priority].discard(job)
+            self._dispatch()
+
+
+rest = RestScheduler()
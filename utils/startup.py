@@ -0,0 +1,78 @@
+"""Startup helpers: per-phase timing and a command tree sync that only runs on changes."""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Wall-clock time spent in each startup phase, counted from ``started``.
+
+    Each ``mark`` closes the phase that has been running since the previous mark, and
+    marking a phase a second time (e.g. on a later READY) is ignored.
+    """
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases = {}
+
+    def mark(self, phase):
+        if phase in self.phases:
+            return False
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+        return True
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        parts = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases.items())
+        return f"Startup took {self.total:.2f}s ({parts})"
+
+
+def command_tree_hash(tree):
+    """Hash of the global command tree's serialized definitions, as sent on sync."""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda command: command["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _read_hash(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("hash")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_hash(path, value):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"hash": value, "synced_at": time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+async def sync_tree_if_changed(tree, path="data/command_tree.json"):
+    """Sync the global command tree only if it differs from the last successful sync.
+
+    Returns True if a sync was sent. The hash is stored after the sync succeeds, so a
+    failed sync is retried on the next start.
+    """
+    current = command_tree_hash(tree)
+    if await asyncio.to_thread(_read_hash, path) == current:
+        logger.info("Command tree unchanged since the last sync; skipping tree.sync().")
+        return False
+    synced = await tree.sync()
+    await asyncio.to_thread(_write_hash, path, current)
+    logger.info(f"Synced {len(synced)} application command(s).")
+    return True
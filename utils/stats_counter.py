@@ -0,0 +1,205 @@
+import datetime
+
+import discord
+
+TICKETS_CATEGORY = "Tickets"
+CLOSED_TICKETS_CATEGORY = "Closed Tickets"
+
+
+def _month_key(when=None):
+    """Return a (year, month) tuple used to bucket join dates."""
+    when = when or datetime.datetime.now(datetime.timezone.utc)
+    return (when.year, when.month)
+
+
+def _ticket_bucket(channel):
+    """Return which ticket counter a channel belongs to, if any."""
+    category = getattr(channel, "category", None)
+    if category is None:
+        return None
+    if category.name == TICKETS_CATEGORY:
+        return "open"
+    if category.name == CLOSED_TICKETS_CATEGORY:
+        return "closed"
+    return None
+
+
+class GuildCounters:
+    """Precomputed statistics for a single guild.
+
+    Members who joined this month are kept as a set of ids, so a leave can be counted
+    correctly from the user id alone when members aren't cached.
+    """
+
+    __slots__ = ("total_members", "total_bots", "joined_ids", "month",
+                 "open_tickets", "closed_tickets", "seeded_at")
+
+    def __init__(self):
+        self.total_members = 0
+        self.total_bots = 0
+        self.joined_ids = set()
+        self.month = _month_key()
+        self.open_tickets = 0
+        self.closed_tickets = 0
+        self.seeded_at = None
+
+    @property
+    def joined_this_month(self):
+        return len(self.joined_ids)
+
+    @property
+    def actual_users(self):
+        return self.total_members - self.total_bots
+
+    @property
+    def active_tickets(self):
+        return self.open_tickets
+
+    @property
+    def total_tickets(self):
+        return self.open_tickets + self.closed_tickets
+
+    def snapshot(self):
+        """Return the counters as a plain dict."""
+        return {
+            "total_members": self.total_members,
+            "actual_users": self.actual_users,
+            "total_bots": self.total_bots,
+            "active_tickets": self.active_tickets,
+            "total_tickets": self.total_tickets,
+            "joined_this_month": self.joined_this_month,
+        }
+
+
+class StatsCounterStore:
+    """Per-guild counters seeded by one full scan and kept current by gateway events."""
+
+    def __init__(self):
+        self._guilds = {}
+
+    def get(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def discard(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def scan(self, guild, members=None):
+        """Build fresh counters for a guild with a single pass over its members and channels.
+
+        ``members`` defaults to the guild's member cache; without one, pass the result of
+        an uncached chunk.
+        """
+        counters = GuildCounters()
+        month = counters.month
+
+        for member in guild.members if members is None else members:
+            counters.total_members += 1
+            if member.bot:
+                counters.total_bots += 1
+            if member.joined_at and _month_key(member.joined_at) == month:
+                counters.joined_ids.add(member.id)
+
+        self._recount_tickets(guild, counters)
+        counters.seeded_at = datetime.datetime.now(datetime.timezone.utc)
+        return counters
+
+    def seed(self, guild, members=None):
+        """Replace the stored counters for a guild with a full scan."""
+        counters = self.scan(guild, members)
+        self._guilds[guild.id] = counters
+        return counters
+
+    def reconcile(self, guild, members=None):
+        """Rescan a guild and return the drift between the stored and scanned counters.
+
+        Without a complete member cache pass the result of an uncached chunk as
+        ``members`` so every counter is re-derived. Without either, only the member total
+        (kept by the gateway) and the ticket counts can be checked.
+        """
+        previous = self._guilds.get(guild.id)
+        if members is None and not guild.chunked:
+            if previous is None:
+                return {}
+            old = previous.snapshot()
+            if guild.member_count is not None:
+                previous.total_members = guild.member_count
+            self._recount_tickets(guild, previous)
+            new = previous.snapshot()
+            return {key: new[key] - old[key] for key in new if new[key] != old[key]}
+
+        counters = self.seed(guild, members)
+        if previous is None or previous.month != counters.month:
+            return {}
+
+        old, new = previous.snapshot(), counters.snapshot()
+        return {key: new[key] - old[key] for key in new if new[key] != old[key]}
+
+    def needs_reseed(self, guild_id):
+        """Whether a guild has no counters yet or they belong to a previous month."""
+        counters = self._guilds.get(guild_id)
+        return counters is None or counters.month != _month_key()
+
+    def member_joined(self, member):
+        counters = self._guilds.get(member.guild.id)
+        if counters is None:
+            return
+        counters.total_members += 1
+        if member.bot:
+            counters.total_bots += 1
+        if member.joined_at and _month_key(member.joined_at) == counters.month:
+            counters.joined_ids.add(member.id)
+
+    def member_removed(self, guild_id, user):
+        """Count a leave from the raw event's user, which works whether or not members are cached."""
+        counters = self._guilds.get(guild_id)
+        if counters is None:
+            return
+        counters.total_members = max(counters.total_members - 1, 0)
+        if user.bot:
+            counters.total_bots = max(counters.total_bots - 1, 0)
+        counters.joined_ids.discard(user.id)
+
+    def _adjust_tickets(self, counters, bucket, delta):
+        if bucket == "open":
+            counters.open_tickets = max(counters.open_tickets + delta, 0)
+        elif bucket == "closed":
+            counters.closed_tickets = max(counters.closed_tickets + delta, 0)
+
+    def channel_created(self, channel):
+        counters = self._guilds.get(channel.guild.id)
+        if counters is not None and isinstance(channel, discord.TextChannel):
+            self._adjust_tickets(counters, _ticket_bucket(channel), 1)
+
+    def channel_deleted(self, channel):
+        counters = self._guilds.get(channel.guild.id)
+        if counters is not None and isinstance(channel, discord.TextChannel):
+            self._adjust_tickets(counters, _ticket_bucket(channel), -1)
+
+    def channel_updated(self, before, after):
+        counters = self._guilds.get(after.guild.id)
+        if counters is None:
+            return
+
+        # Renaming a category moves every channel inside it between buckets,
+        # so recount the ticket categories rather than tracking each child
+        if isinstance(after, discord.CategoryChannel):
+            ticket_names = (TICKETS_CATEGORY, CLOSED_TICKETS_CATEGORY)
+            if before.name != after.name and (before.name in ticket_names or after.name in ticket_names):
+                self._recount_tickets(after.guild, counters)
+            return
+
+        if not isinstance(after, discord.TextChannel):
+            return
+        old_bucket, new_bucket = _ticket_bucket(before), _ticket_bucket(after)
+        if old_bucket != new_bucket:
+            self._adjust_tickets(counters, old_bucket, -1)
+            self._adjust_tickets(counters, new_bucket, 1)
+
+    def _recount_tickets(self, guild, counters):
+        counters.open_tickets = 0
+        counters.closed_tickets = 0
+        for category in guild.categories:
+            if category.name == TICKETS_CATEGORY:
+                counters.open_tickets += len(category.text_channels)
+            elif category.name == CLOSED_TICKETS_CATEGORY:
+                counters.closed_tickets += len(category.text_channels)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+import discord
+
+from utils.name_index import CATEGORY, names
+from utils.rest_scheduler import TICKETS, rest
+
+logger = logging.getLogger(__name__)
+
+POOL_CATEGORY = "Ticket Pool"
+POOL_CHANNEL_NAME = "ticket-pool"
+
+OPENER_OVERWRITE = discord.PermissionOverwrite(read_messages=True, send_messages=True, attach_files=True, embed_links=True)
+STAFF_OVERWRITE = discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
+BOT_OVERWRITE = discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_channels=True, manage_permissions=True)
+HIDDEN_OVERWRITE = discord.PermissionOverwrite(read_messages=False)
+
+
+def ticket_overwrites(guild, opener, staff_roles=()):
+    """Overwrites for a new ticket: hidden from everyone except the opener, staff and the bot."""
+    overwrites = {
+        guild.default_role: HIDDEN_OVERWRITE,
+        guild.me: BOT_OVERWRITE,
+        opener: OPENER_OVERWRITE,
+    }
+    for role in staff_roles:
+        overwrites[role] = STAFF_OVERWRITE
+    return overwrites
+
+
+def closed_overwrites(channel, ticket):
+    """Overwrites for a closed ticket: everyone who was let in by the ticket loses access."""
+    overwrites = dict(channel.overwrites)
+    guild = channel.guild
+    for target in list(overwrites):
+        if target == guild.default_role or target == guild.me:
+            continue
+        if isinstance(target, discord.Role) and target.id != ticket.role_id:
+            # Staff roles keep their access to closed tickets
+            continue
+        overwrites[target] = HIDDEN_OVERWRITE
+    if ticket.opener_id and not any(target.id == ticket.opener_id for target in overwrites):
+        overwrites[discord.Object(id=ticket.opener_id)] = HIDDEN_OVERWRITE
+    return overwrites
+
+
+class TicketProvisioner:
+    """Creates ticket channels with their permission overwrites in a single request.
+
+    When a guild's ``ticket_pool_size`` setting is above zero, that many hidden channels are
+    kept ready in a "Ticket Pool" category. Claiming one is a single edit on that channel's
+    own rate limit bucket instead of a create on the guild-wide channel-create bucket, which
+    matters during ticket storms. The pool is topped up in the background after each claim.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._pools = {}  # guild_id -> list of warm channel ids
+        self._refills = {}  # guild_id -> refill task
+
+    async def provision(self, guild, category, opener, staff_roles=()):
+        """Return a ticket channel for ``opener`` in ``category``, ready to use."""
+        name = f"ticket-{opener.name}"
+        overwrites = ticket_overwrites(guild, opener, staff_roles)
+
+        channel = self._claim(guild)
+        if channel is not None:
+            try:
+                await rest.run(TICKETS, lambda: channel.edit(name=name, category=category, overwrites=overwrites, reason="Ticket opened"),
+                               guild_id=guild.id)
+                self.refill(guild)
+                return channel
+            except discord.NotFound:
+                # Someone deleted the warm channel; fall back to creating one
+                pass
+            except BaseException:
+                # The edit failed or was cancelled, so the channel is still hidden and unused
+                self._pools.setdefault(guild.id, []).append(channel.id)
+                raise
+
+        channel = await rest.run(TICKETS, lambda: guild.create_text_channel(name=name, category=category, overwrites=overwrites, reason="Ticket opened"),
+                                 guild_id=guild.id)
+        self.refill(guild)
+        return channel
+
+    def pool_size(self, guild):
+        return self.config.get(guild.id, "ticket_pool_size", 0)
+
+    def _claim(self, guild):
+        if guild.id not in self._pools and self.pool_size(guild) > 0:
+            self.adopt(guild)
+        pool = self._pools.get(guild.id)
+        while pool:
+            channel = guild.get_channel(pool.pop())
+            if channel is not None:
+                return channel
+        return None
+
+    def _pool_category(self, guild):
+        return names.resolve(guild, CATEGORY, POOL_CATEGORY, self.config, "ticket_pool_category")
+
+    def adopt(self, guild):
+        """Pick up warm channels left over from a previous run."""
+        category = self._pool_category(guild)
+        if category:
+            self._pools[guild.id] = [channel.id for channel in category.text_channels if channel.name == POOL_CHANNEL_NAME]
+
+    def refill(self, guild):
+        """Top the guild's pool back up to its configured size in the background."""
+        if self.pool_size(guild) <= 0:
+            return
+        task = self._refills.get(guild.id)
+        if task is None or task.done():
+            self._refills[guild.id] = asyncio.create_task(self._refill(guild))
+
+    async def _refill(self, guild):
+        if guild.id not in self._pools:
+            self.adopt(guild)
+        pool = self._pools.setdefault(guild.id, [])
+        try:
+            category = self._pool_category(guild)
+            if not category:
+                overwrites = {guild.default_role: HIDDEN_OVERWRITE, guild.me: BOT_OVERWRITE}
+                category = await rest.run(TICKETS, lambda: guild.create_category(POOL_CATEGORY, overwrites=overwrites), guild_id=guild.id)
+                self.config.set(guild.id, "ticket_pool_category", category.id)
+            while len(pool) < self.pool_size(guild):
+                channel = await rest.run(TICKETS, lambda: guild.create_text_channel(POOL_CHANNEL_NAME, category=category, reason="Warm ticket channel"),
+                                         guild_id=guild.id)
+                pool.append(channel.id)
+        except discord.HTTPException as e:
+            logger.error(f"Failed to refill the ticket pool in {guild.name}: {e}")
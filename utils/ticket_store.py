@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+
+from utils.write_behind import WriteBehind, connect
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    opener_id INTEGER NOT NULL,
+    role_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'open',
+    created_at REAL NOT NULL,
+    closed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_guild_opener ON tickets (guild_id, opener_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status);
+"""
+
+COLUMNS = ("channel_id", "guild_id", "opener_id", "role_id", "status", "created_at", "closed_at")
+
+
+class Ticket:
+    """A single ticket channel and who opened it."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, channel_id, guild_id, opener_id, role_id=None, status="open", created_at=None, closed_at=None):
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.opener_id = opener_id
+        self.role_id = role_id
+        self.status = status
+        self.created_at = time.time() if created_at is None else created_at
+        self.closed_at = closed_at
+
+    def as_row(self):
+        return tuple(getattr(self, column) for column in COLUMNS)
+
+
+class TicketStore(WriteBehind):
+    """Ticket state kept in memory for O(1) lookups and persisted to SQLite behind the scenes.
+
+    Mutations update the in-memory indexes immediately and queue the row for a batched
+    write, so callers never wait on the disk. Call ``load`` once at startup to rebuild the
+    indexes and ``close`` on shutdown to flush anything still pending.
+    """
+
+    def __init__(self, path, flush_interval=1.0, flush_threshold=500):
+        super().__init__(flush_interval)
+        self.path = path
+        self.flush_threshold = flush_threshold
+
+        self._by_channel = {}
+        self._open_by_opener = {}
+        self._by_guild = {}
+
+        self._pending = {}  # channel_id -> Ticket whose row still needs writing
+        self._db = None
+        self._db_lock = asyncio.Lock()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def _read_all(self):
+        cursor = self._db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM tickets WHERE status != 'deleted'"
+        )
+        return cursor.fetchall()
+
+    def load_sync(self):
+        """Open the database and rebuild the in-memory indexes with one bulk read."""
+        if self._db is None:
+            self._db = connect(self.path, SCHEMA)
+
+        self._by_channel.clear()
+        self._open_by_opener.clear()
+        self._by_guild.clear()
+        for row in self._read_all():
+            self._index(Ticket(*row))
+        return len(self._by_channel)
+
+    async def load(self):
+        count = await asyncio.to_thread(self.load_sync)
+        self.start()
+        logger.info(f"Loaded {count} ticket(s) from {self.path}.")
+        return count
+
+    async def close(self):
+        await self.stop()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # -- indexes -----------------------------------------------------------
+
+    def _index(self, ticket):
+        self._by_channel[ticket.channel_id] = ticket
+        self._by_guild.setdefault(ticket.guild_id, set()).add(ticket.channel_id)
+        if ticket.status == "open":
+            self._open_by_opener[(ticket.guild_id, ticket.opener_id)] = ticket.channel_id
+
+    def _unindex(self, ticket):
+        self._by_channel.pop(ticket.channel_id, None)
+        guild_tickets = self._by_guild.get(ticket.guild_id)
+        if guild_tickets is not None:
+            guild_tickets.discard(ticket.channel_id)
+            if not guild_tickets:
+                del self._by_guild[ticket.guild_id]
+        key = (ticket.guild_id, ticket.opener_id)
+        if self._open_by_opener.get(key) == ticket.channel_id:
+            del self._open_by_opener[key]
+
+    def get(self, channel_id):
+        return self._by_channel.get(channel_id)
+
+    def _guild_of(self, channel_id):
+        row = self._db.execute("SELECT guild_id FROM tickets WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    async def guild_of(self, channel_id):
+        """Return the guild a ticket belongs to, including deleted tickets kept as history."""
+        ticket = self._by_channel.get(channel_id)
+        if ticket is not None:
+            return ticket.guild_id
+        pending = self._pending.get(channel_id)
+        if pending is not None:
+            return pending.guild_id
+        if self._db is None:
+            return None
+        async with self._db_lock:
+            return await asyncio.to_thread(self._guild_of, channel_id)
+
+    def __contains__(self, channel_id):
+        return channel_id in self._by_channel
+
+    def open_ticket_for(self, guild_id, opener_id):
+        """Return the open ticket a member has in a guild, if any."""
+        channel_id = self._open_by_opener.get((guild_id, opener_id))
+        return self._by_channel.get(channel_id) if channel_id is not None else None
+
+    def guild_tickets(self, guild_id):
+        return [self._by_channel[channel_id] for channel_id in self._by_guild.get(guild_id, ())]
+
+    # -- mutations ---------------------------------------------------------
+
+    def add(self, ticket):
+        self._index(ticket)
+        self._queue(ticket.channel_id, ticket)
+        return ticket
+
+    def close_ticket(self, channel_id):
+        """Mark a ticket closed; it stays indexed by channel but no longer counts as the opener's open ticket."""
+        ticket = self._by_channel.get(channel_id)
+        if ticket is None or ticket.status != "open":
+            return ticket
+        self._unindex(ticket)
+        ticket.status = "closed"
+        ticket.closed_at = time.time()
+        self._index(ticket)
+        self._queue(channel_id, ticket)
+        return ticket
+
+    def delete(self, channel_id):
+        """Drop a ticket from the indexes, keeping its row as history."""
+        ticket = self._by_channel.get(channel_id)
+        if ticket is None:
+            return None
+        self._unindex(ticket)
+        ticket.status = "deleted"
+        ticket.closed_at = ticket.closed_at or time.time()
+        self._queue(channel_id, ticket)
+        return ticket
+
+    def _queue(self, channel_id, ticket):
+        self._pending[channel_id] = ticket
+        if len(self._pending) >= self.flush_threshold:
+            self.request_flush()
+
+    # -- write-behind ------------------------------------------------------
+
+    def _write(self, rows):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._db:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO tickets ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                rows,
+            )
+
+    async def flush(self):
+        """Write every queued change in a single transaction."""
+        if not self._pending or self._db is None:
+            return 0
+        batch, self._pending = self._pending, {}
+        rows = [ticket.as_row() for ticket in batch.values()]
+        async with self._db_lock:
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except Exception as e:
+                # Put the batch back without clobbering anything newer queued meanwhile
+                for channel_id, ticket in batch.items():
+                    self._pending.setdefault(channel_id, ticket)
+                logger.error(f"Failed to persist {len(rows)} ticket change(s): {e}")
+                return 0
+        return len(rows)
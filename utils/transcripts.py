@@ -0,0 +1,402 @@
+"""Ticket transcript storage.
+
+Each ticket channel gets two files in the transcript directory:
+
+- ``ticket-<id>.tlog``: a sequence of gzip members ("segments"), one per flush. Each
+  segment decompresses to length-prefixed JSON records. Because every segment is a
+  complete gzip member, the whole file is also readable with ``gzip.open``.
+- ``ticket-<id>.tidx``: fixed-size index entries ``(message_id, segment_offset,
+  segment_length, record_number)`` in the order records were written, so a single
+  message or a page of messages only needs its own segments decompressed.
+
+Legacy plain-text ``ticket-<id>.txt`` logs can be converted with
+``python -m utils.transcripts migrate <directory>``.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from collections import OrderedDict
+
+from utils.write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+LENGTH = struct.Struct(">I")
+INDEX_ENTRY = struct.Struct(">QQII")
+MESSAGE_ID = struct.Struct(">Q")  # Leading field of an index entry
+COMPRESSION_LEVEL = 6
+
+
+def transcript_paths(directory, channel_id):
+    """Return the (data, index) paths for a channel's transcript."""
+    base = os.path.join(directory, f"ticket-{channel_id}")
+    return base + ".tlog", base + ".tidx"
+
+
+def message_record(message, kind="message"):
+    """Build a transcript record from a discord.Message."""
+    record = {
+        "type": kind,
+        "id": message.id,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "created_at": message.created_at.timestamp(),
+    }
+    if kind != "delete":
+        record["content"] = message.content
+        if message.attachments:
+            record["attachments"] = [attachment.url for attachment in message.attachments]
+    if kind == "edit" and message.edited_at:
+        record["edited_at"] = message.edited_at.timestamp()
+    return record
+
+
+def render_record(record):
+    """Render a record as a single human-readable line."""
+    if record.get("type") == "legacy":
+        return f"{record['author']}: {record['content']}"
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(record["created_at"]))
+    if record["type"] == "delete":
+        return f"[{stamp}] {record['author']}: <message {record['id']} deleted>"
+
+    line = f"[{stamp}] {record['author']}: {record.get('content', '')}"
+    if record["type"] == "edit":
+        line += " (edited)"
+    for url in record.get("attachments", ()):
+        line += f" [attachment: {url}]"
+    return line
+
+
+def encode_segment(payloads):
+    """Compress already-encoded records into one gzip segment."""
+    body = b"".join(LENGTH.pack(len(payload)) + payload for payload in payloads)
+    return gzip.compress(body, compresslevel=COMPRESSION_LEVEL)
+
+
+def decode_segment(data):
+    """Return the records stored in one compressed segment."""
+    body = gzip.decompress(data)
+    payloads = []
+    position = 0
+    while position < len(body):
+        (length,) = LENGTH.unpack_from(body, position)
+        position += LENGTH.size
+        payloads.append(body[position:position + length])
+        position += length
+    # One parse for the whole segment is far cheaper than a json.loads per record
+    return json.loads(b"[" + b",".join(payloads) + b"]")
+
+
+class TranscriptReader:
+    """Random-access reader for a channel's structured transcript."""
+
+    def __init__(self, directory, channel_id):
+        self.data_path, self.index_path = transcript_paths(directory, channel_id)
+        self._index = b""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                raw = f.read()
+            # Ignore a torn trailing entry from an interrupted write
+            self._index = raw[:len(raw) - len(raw) % INDEX_ENTRY.size]
+
+    def __len__(self):
+        return len(self._index) // INDEX_ENTRY.size
+
+    def _entries(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [INDEX_ENTRY.unpack_from(self._index, position * INDEX_ENTRY.size)
+                for position in range(start, stop)]
+
+    def _read_segments(self, entries):
+        """Decompress each distinct segment referenced by ``entries`` once."""
+        segments = {}
+        with open(self.data_path, "rb") as f:
+            for _, offset, length, _ in entries:
+                if offset not in segments:
+                    f.seek(offset)
+                    segments[offset] = list(decode_segment(f.read(length)))
+        return [segments[offset][number] for _, offset, _, number in entries]
+
+    def get(self, message_id):
+        """Return the latest record for a message, or None."""
+        # Search the raw index from the end so the most recent record for the id wins
+        needle = MESSAGE_ID.pack(message_id)
+        end = len(self._index)
+        while True:
+            found = self._index.rfind(needle, 0, end)
+            if found < 0:
+                return None
+            if found % INDEX_ENTRY.size == 0:
+                break
+            end = found + MESSAGE_ID.size - 1
+        position = found // INDEX_ENTRY.size
+        return self._read_segments(self._entries(position, position + 1))[0]
+
+    def page(self, page, per_page=20):
+        """Return records for a 1-based page, oldest first."""
+        start = (page - 1) * per_page
+        return self._read_segments(self._entries(start, start + per_page))
+
+    def page_count(self, per_page=20):
+        return max((len(self) + per_page - 1) // per_page, 1)
+
+    def __iter__(self):
+        """Stream every record in order, one segment at a time."""
+        if not os.path.exists(self.data_path):
+            return
+        if not len(self):
+            return
+        last_offset = None
+        with open(self.data_path, "rb") as f:
+            for _, offset, length, _ in INDEX_ENTRY.iter_unpack(self._index):
+                if offset != last_offset:
+                    last_offset = offset
+                    f.seek(offset)
+                    yield from decode_segment(f.read(length))
+
+    def search(self, query, limit=50):
+        """Return up to ``limit`` records whose content contains ``query`` (case-insensitive)."""
+        query = query.lower()
+        matches = []
+        for record in self:
+            if query in record.get("content", "").lower():
+                matches.append(record)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def export_text(self):
+        return "\n".join(render_record(record) for record in self)
+
+
+class TranscriptWriter(WriteBehind):
+    """Buffers ticket transcript records in memory and writes them to disk in batches.
+
+    Records are queued per channel and flushed when the queue passes ``flush_bytes`` or
+    every ``flush_interval`` seconds; each flush appends compressed segments of at most
+    ``segment_bytes`` (uncompressed) per channel, which bounds the cost of a random read.
+    Flushes run in a worker thread through a bounded LRU pool of open file handles, so busy
+    channels don't reopen their files for every message. When more than
+    ``max_queued_bytes`` are waiting, writers block until a flush has drained the queue
+    instead of letting memory grow without bound.
+    """
+
+    def __init__(self, directory, max_open_files=64, flush_interval=2.0,
+                 flush_bytes=64 * 1024, max_queued_bytes=8 * 1024 * 1024, segment_bytes=32 * 1024):
+        super().__init__(flush_interval)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_open_files = max_open_files
+        self.flush_bytes = flush_bytes
+        self.max_queued_bytes = max_queued_bytes
+
+        self._buffers = {}
+        self._handles = OrderedDict()
+        self._io_lock = asyncio.Lock()
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+        self.queued_bytes = 0
+        self.written_bytes = 0
+        self.flushes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.backpressure_waits = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def reader(self, channel_id):
+        return TranscriptReader(self.directory, channel_id)
+
+    async def close(self):
+        """Flush everything and release all file handles."""
+        await self.stop()
+        async with self._io_lock:
+            await asyncio.to_thread(self._close_handles, list(self._handles))
+
+    def stats(self):
+        return {
+            "queued_bytes": self.queued_bytes,
+            "queued_channels": len(self._buffers),
+            "written_bytes": self.written_bytes,
+            "flushes": self.flushes,
+            "open_handles": len(self._handles),
+            "last_flush_latency_ms": round(self.last_flush_latency * 1000, 2),
+            "max_flush_latency_ms": round(self.max_flush_latency * 1000, 2),
+            "backpressure_waits": self.backpressure_waits,
+        }
+
+    async def write(self, channel_id, record):
+        """Queue a record for a channel's transcript, waiting only if the disk has fallen behind."""
+        while self.queued_bytes >= self.max_queued_bytes:
+            self.backpressure_waits += 1
+            self._drained.clear()
+            self.request_flush()
+            await self._drained.wait()
+
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        self._buffers.setdefault(channel_id, []).append((record.get("id", 0), payload))
+        self.queued_bytes += len(payload)
+        if self.queued_bytes >= self.flush_bytes:
+            self.request_flush()
+
+    async def flush(self, channel_id=None):
+        """Write queued records for one channel, or for every channel, to disk."""
+        if channel_id is None:
+            batch, self._buffers = self._buffers, {}
+        else:
+            records = self._buffers.pop(channel_id, None)
+            batch = {channel_id: records} if records else {}
+        if not batch:
+            return
+
+        sizes = {batch_id: sum(len(payload) for _, payload in records) for batch_id, records in batch.items()}
+        start = time.perf_counter()
+        async with self._io_lock:
+            try:
+                # Channels are removed from the batch as they are written
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                # Put what wasn't written back in front of anything queued since, to retry next flush
+                for failed_id, records in batch.items():
+                    self._buffers[failed_id] = records + self._buffers.get(failed_id, [])
+                await asyncio.to_thread(self._close_handles, list(batch))
+                logger.error(f"Failed to write transcripts for {len(batch)} channel(s), will retry: {e}")
+            finally:
+                written = sum(size for batch_id, size in sizes.items() if batch_id not in batch)
+                self.written_bytes += written
+                self.queued_bytes -= written
+
+        elapsed = time.perf_counter() - start
+        self.flushes += 1
+        self.last_flush_latency = elapsed
+        self.max_flush_latency = max(self.max_flush_latency, elapsed)
+        if self.queued_bytes < self.max_queued_bytes:
+            self._drained.set()
+
+    async def close_channel(self, channel_id):
+        """Flush a channel's transcript and close its files, e.g. when the ticket is closed or deleted."""
+        await self.flush(channel_id)
+        async with self._io_lock:
+            await asyncio.to_thread(self._close_handles, [channel_id])
+
+    def _handle(self, channel_id):
+        handles = self._handles.get(channel_id)
+        if handles is not None:
+            self._handles.move_to_end(channel_id)
+            return handles
+
+        while len(self._handles) >= self.max_open_files:
+            _, oldest = self._handles.popitem(last=False)
+            for handle in oldest:
+                handle.close()
+        data_path, index_path = transcript_paths(self.directory, channel_id)
+        # A torn entry from a crash mid-append would shift every entry written after it
+        if os.path.exists(index_path):
+            size = os.path.getsize(index_path)
+            if size % INDEX_ENTRY.size:
+                os.truncate(index_path, size - size % INDEX_ENTRY.size)
+        handles = (open(data_path, "ab"), open(index_path, "ab"))
+        self._handles[channel_id] = handles
+        return handles
+
+    def _segments(self, records):
+        """Split queued records into chunks of roughly ``segment_bytes``."""
+        chunk, size = [], 0
+        for record in records:
+            chunk.append(record)
+            size += len(record[1])
+            if size >= self.segment_bytes:
+                yield chunk
+                chunk, size = [], 0
+        if chunk:
+            yield chunk
+
+    def _write_batch(self, batch):
+        for channel_id, records in list(batch.items()):
+            data, index = self._handle(channel_id)
+            entries = []
+            for chunk in self._segments(records):
+                segment = encode_segment([payload for _, payload in chunk])
+                offset = data.tell()
+                data.write(segment)
+                entries.extend(
+                    INDEX_ENTRY.pack(message_id, offset, len(segment), number)
+                    for number, (message_id, _) in enumerate(chunk)
+                )
+            data.flush()
+            # The index is written after the data so it never points past the end of the log
+            index.write(b"".join(entries))
+            index.flush()
+            del batch[channel_id]
+
+    def _close_handles(self, channel_ids):
+        for channel_id in channel_ids:
+            for handle in self._handles.pop(channel_id, ()):
+                handle.close()
+
+
+def migrate_text_log(text_path, directory, channel_id, segment_records=200):
+    """Convert a legacy ``author: content`` log into the structured format.
+
+    Legacy lines have no message ids, so each record is keyed by its line number.
+    Returns the number of records written.
+    """
+    data_path, index_path = transcript_paths(directory, channel_id)
+    if os.path.exists(data_path):
+        raise FileExistsError(f"{data_path} already exists")
+
+    created_at = os.path.getmtime(text_path)
+    with open(text_path, "r", encoding="utf-8", errors="replace") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+
+    with open(data_path, "wb") as data, open(index_path, "wb") as index:
+        for start in range(0, len(lines), segment_records):
+            chunk = lines[start:start + segment_records]
+            payloads = []
+            for line in chunk:
+                author, _, content = line.partition(": ")
+                record = {"type": "legacy", "author": author, "content": content, "created_at": created_at}
+                payloads.append(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+            segment = encode_segment(payloads)
+            offset = data.tell()
+            data.write(segment)
+            index.write(b"".join(
+                INDEX_ENTRY.pack(start + number + 1, offset, len(segment), number)
+                for number in range(len(chunk))
+            ))
+    return len(lines)
+
+
+def migrate_directory(directory, remove=False):
+    """Migrate every ``ticket-<id>.txt`` in ``directory``. Returns (files, records)."""
+    files = records = 0
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("ticket-") and name.endswith(".txt")):
+            continue
+        channel_id = name[len("ticket-"):-len(".txt")]
+        if not channel_id.isdigit():
+            continue
+        text_path = os.path.join(directory, name)
+        try:
+            records += migrate_text_log(text_path, directory, int(channel_id))
+        except FileExistsError:
+            logger.warning(f"Skipping {name}: a structured transcript already exists.")
+            continue
+        files += 1
+        if remove:
+            os.remove(text_path)
+    return files, records
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "migrate":
+        print("usage: python -m utils.transcripts migrate <directory> [--remove]")
+        sys.exit(1)
+    migrated_files, migrated_records = migrate_directory(sys.argv[2], remove="--remove" in sys.argv)
+    print(f"Migrated {migrated_records} line(s) from {migrated_files} legacy log(s).")
@@ -0,0 +1,61 @@
+"""Shared plumbing for stores that keep state in memory and persist it in the background.
+
+``WriteBehind`` owns the background flush task: subclasses queue changes, call
+``request_flush`` once enough are waiting, and implement ``flush`` to write whatever is
+queued. ``connect`` opens the SQLite databases those stores persist to.
+"""
+import asyncio
+import os
+import sqlite3
+
+
+def connect(path, schema):
+    """Open (creating if needed) a SQLite database in WAL mode and apply ``schema``."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(schema)
+    return db
+
+
+class WriteBehind:
+    """Runs ``flush`` every ``flush_interval`` seconds, or sooner when a flush is requested."""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._flush_requested = asyncio.Event()
+        self._task = None
+        self._closing = False
+
+    async def flush(self):
+        raise NotImplementedError
+
+    def request_flush(self):
+        self._flush_requested.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the background task and flush anything still queued."""
+        # Let the loop finish its current pass rather than cancelling it mid-write
+        if self._task is not None:
+            self._closing = True
+            self._flush_requested.set()
+            await self._task
+            self._task = None
+            self._closing = False
+        await self.flush()
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()